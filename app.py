@@ -1,13 +1,10 @@
 import streamlit as st
-import pandas as pd
-from PIL import Image
-from io import StringIO, BytesIO
-import random
+from io import BytesIO
 from datetime import datetime, date, timedelta
-import matplotlib.pyplot as plt
-import numpy as np
-import json
 import time # For simulating API calls/loading
+import os
+from skinova import engine
+from skinova import UserStore, DailyChecklist, COMPLIANCE_WINDOW_DAYS, DEFAULT_CATALOG_PATH, CONFLICT_ENGINE, RoutineCache, ThreadStore, JobQueue, JobRejected, ResultCache, ViewMaterializer, METRICS
 
 # --- 1. GLOBAL CONFIGURATION & HYPER-POLISHED UI SETUP ---
 
@@ -203,6 +200,17 @@ st.markdown(f"""
 
 # --- 2. GLOBAL STATE MANAGEMENT & HYPER-DATA MODELS (Massive Expansion) ---
 
+# 2.0. Durable User Store (SQLite in WAL mode, shared by every session on the box)
+USER_DB_PATH = os.environ.get('SKINOVA_DB_PATH', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'skinova_users.db'))
+
+@st.cache_resource
+def get_user_store():
+    """Process-wide user store, seeded with the demo guest account."""
+    store = UserStore(USER_DB_PATH)
+    store.create_user('guest_user', 'guest', skin_score=70,
+                      score_log=[{'date': (date.today() - timedelta(days=30)).isoformat(), 'score': 70, 'delta': '+0'}])
+    return store
+
 # Global Application State Initialization
 if 'logged_in' not in st.session_state:
     st.session_state['logged_in'] = False
@@ -210,27 +218,6 @@ if 'current_page' not in st.session_state:
     st.session_state['current_page'] = 'Login/Signup'
 if 'onboarding_complete' not in st.session_state:
     st.session_state['onboarding_complete'] = False
-if 'user_db' not in st.session_state:
-    # Hyper-Database Structure (Expanded to hold complex user history and consultation data)
-    st.session_state['user_db'] = {
-        'guest_user': {
-            'username': 'guest_user',
-            'password': 'guest',
-            'profile': {},
-            'onboarding_complete': False,
-            'history': {
-                'score_log': [{'date': (date.today() - timedelta(days=30)).isoformat(), 'score': 70, 'delta': '+0'}], 
-                'compliance_log': [], 
-                'analytics_reports': [], 
-                'routine_history': []
-            },
-            'current_routine': [],
-            'skin_score': 70,
-            'routine_streak': 0,
-            'last_checkin_date': None,
-            'consultation_history': [] # For Consult an Expert feature
-        }
-    }
 if 'current_user' not in st.session_state:
     st.session_state['current_user'] = 'guest_user'
 if 'current_routine_completed' not in st.session_state:
@@ -238,45 +225,18 @@ if 'current_routine_completed' not in st.session_state:
 
 # --- HYPER-DETAILED MOCK DATA MODELS ---
 
-# 2.1. Active Ingredient Profile Matrix (Expanded Conflicts and Delivery Systems)
-ACTIVE_INGREDIENT_PROFILES = {
-    "Hyaluronic Acid (HA)": {"function": "Hydration", "concerns": ["Dryness"], "conflict": [], "system": "Vehicle-Aqueous", "notes": "Multi-molecular weights used for deeper penetration."},
-    "Niacinamide (Vitamin B3)": {"function": "Barrier, Oil Control", "concerns": ["Acne", "Redness"], "conflict": ["High concentration Vitamin C (use 30 min apart)"], "system": "Vehicle-Emulsion", "notes": "Minimizes pores and reduces inflammation."},
-    "L-Ascorbic Acid (Vitamin C)": {"function": "Antioxidant, Brightening", "concerns": ["Pigmentation", "Aging"], "conflict": ["AHA/BHA (alternate), Benzoyl Peroxide (NEVER)"], "system": "Vehicle-LowPHSerum", "notes": "Crucial for morning routine. Highly unstable."},
-    "Retinol (0.5% Encapsulated)": {"function": "Cell Turnover, Anti-Aging", "concerns": ["Aging", "Acne"], "conflict": ["AHA/BHA (Skin Cycling ONLY)", "Benzoyl Peroxide (NEVER)"], "system": "Vehicle-Oil", "notes": "Night use only. Encapsulation reduces irritation."},
-    "Salicylic Acid (BHA 2%)": {"function": "Exfoliation (Oil-soluble)", "concerns": ["Acne", "Blackheads"], "conflict": ["Retinoids (alternate nights)"], "system": "Vehicle-Toner", "notes": "Deeply cleanses pores. Targets oil/clogged pores."},
-    "Glycolic Acid (AHA 10%)": {"function": "Exfoliation (Water-soluble)", "concerns": ["Dullness", "Texture"], "conflict": ["Retinoids (alternate nights)"], "system": "Vehicle-Gel", "notes": "Increases sun sensitivity. Night use only."},
-    "Benzoyl Peroxide (BP 5%)": {"function": "Acne Treatment", "concerns": ["Acne (Inflammatory)"], "conflict": ["Retinoids", "Vitamin C"], "system": "Vehicle-SpotTreatment", "notes": "Spot treatment. Mandatory patch test."},
-    "Azelaic Acid (10%)": {"function": "Redness, Acne, Pigmentation", "concerns": ["Rosacea", "PIH"], "conflict": [], "system": "Vehicle-Cream", "notes": "Gentle, multi-tasking active. Can be used with Retinoids (if tolerant)."},
-    "Ceramides (NP, AP, EOP)": {"function": "Barrier Repair", "concerns": ["Dryness", "Sensitive"], "conflict": [], "system": "Vehicle-Moisturizer", "notes": "Mimics skin's natural lipids for deep repair."}
-}
+# 2.1. Product Catalog (read from a .jsonl/.csv/.parquet file; ingredient matrix lives in skinova.data)
+CATALOG_PATH = os.environ.get('SKINOVA_CATALOG_PATH', DEFAULT_CATALOG_PATH)
 
-# 2.2. Hyper-Product Catalog (Massively Expanded and Detailed for Marketplace)
-MOCK_PRODUCTS = [
-    {"id": 1001, "name": "Ceramide-Rich Hydrating Cleanser", "category": "Cleanser", "active_ing": ["Ceramides", "Glycerin"], "concern_match": ["Dryness", "Sensitive"], "budget": "Mid", "price": 1400, "rating": 4.8, "volume": "250ml", "type": "Cream"},
-    {"id": 1002, "name": "5% L-Ascorbic Acid Day Serum", "category": "Active Serum", "active_ing": ["L-Ascorbic Acid", "Ferulic Acid"], "concern_match": ["Dullness", "Aging"], "budget": "High", "price": 4800, "rating": 4.9, "volume": "30ml", "type": "Oil-Free"},
-    {"id": 1003, "name": "Advanced Barrier Repair Cream", "category": "Moisturizer", "active_ing": ["Ceramides", "Cholesterol", "Peptides"], "concern_match": ["All"], "budget": "High", "price": 3200, "rating": 4.7, "volume": "50g", "type": "Rich Balm"},
-    {"id": 1004, "name": "0.3% Micro-Encapsulated Retinol", "category": "Active Night", "active_ing": ["Retinol"], "concern_match": ["Aging", "Acne"], "budget": "Mid", "price": 2800, "rating": 4.6, "volume": "30ml", "type": "Suspension"},
-    {"id": 1005, "name": "Mineral Zinc Oxide SPF 50+", "category": "Sunscreen", "active_ing": ["Zinc Oxide"], "concern_match": ["Sensitive", "Pigmentation"], "budget": "Mid", "price": 1950, "rating": 4.9, "volume": "60ml", "type": "Tinted"},
-    {"id": 1006, "name": "2% Salicylic Acid Acne Toner", "category": "Exfoliant", "active_ing": ["Salicylic Acid"], "concern_match": ["Acne", "Oiliness"], "budget": "Low", "price": 1100, "rating": 4.5, "volume": "150ml", "type": "Liquid"},
-    {"id": 1007, "name": "10% Azelaic Acid Suspension", "category": "Active Serum", "active_ing": ["Azelaic Acid"], "concern_match": ["Rosacea", "Redness", "PIH"], "budget": "Low", "price": 950, "rating": 4.4, "volume": "30ml", "type": "Cream"},
-    {"id": 1008, "name": "Squalane Oil Cleanser", "category": "Oil Cleanser", "active_ing": ["Squalane", "Polyglyceryl Oleate"], "concern_match": ["All"], "budget": "Mid", "price": 1600, "rating": 4.7, "volume": "100ml", "type": "Oil"},
-    {"id": 1009, "name": "10% Glycolic Acid Overnight Gel", "category": "Exfoliant", "active_ing": ["Glycolic Acid"], "concern_match": ["Texture", "Dullness", "Aging"], "budget": "High", "price": 2500, "rating": 4.3, "volume": "50ml", "type": "Gel"},
-    {"id": 1010, "name": "Hyaluronic Acid Layering Mist", "category": "Hydration", "active_ing": ["HA", "Niacinamide"], "concern_match": ["Dryness", "Barrier"], "budget": "Low", "price": 800, "rating": 4.6, "volume": "100ml", "type": "Mist"},
-    # Adding 40 more detailed mock products (placeholder content for 5000 lines)
-    *[
-        {"id": 1011 + i, "name": f"Product Alpha {i}", "category": random.choice(["Cleanser", "Moisturizer", "Serum", "Sunscreen", "Exfoliant"]),
-         "active_ing": [random.choice(list(ACTIVE_INGREDIENT_PROFILES.keys()))],
-         "concern_match": [random.choice(["Acne", "Aging", "Dryness", "Sensitive", "Pigmentation"])],
-         "budget": random.choice(["Low", "Mid", "High"]),
-         "price": random.randint(500, 6000),
-         "rating": round(random.uniform(4.0, 5.0), 1),
-         "volume": f"{random.randint(30, 200)}ml", "type": random.choice(["Gel", "Cream", "Oil", "Serum"])
-        } for i in range(40)
-    ]
-]
-# Create DataFrame for easy querying in Marketplace
-PRODUCT_DF = pd.DataFrame(MOCK_PRODUCTS)
+@st.cache_resource
+def get_catalog():
+    """
+    Process-wide product catalog, loaded from CATALOG_PATH on first use and shared
+    read-only by every session, so reruns never rebuild or copy it.
+    skinova.catalog pulls in numpy/pandas, so pages that never touch products don't load them.
+    """
+    from skinova import load_catalog
+    return load_catalog(CATALOG_PATH)
 
 # 2.3. Academy Content (Expanded Modules)
 ACADEMY_CURRICULUM = {
@@ -301,8 +261,8 @@ ACADEMY_CURRICULUM = {
     ]
 }
 
-# 2.4. Community Forum Mock Data (Expanded Threads)
-FORUM_THREADS = [
+# 2.4. Community Forum Seed Threads (loaded into the shared ThreadStore once per process)
+FORUM_SEED_THREADS = [
     {"id": 1, "title": "Retinol Purge: Normal or Too Strong? (0.3% Encapsulated)", "user": "AcneFighter23", "date": "2025-10-01", "replies": 15, "tags": ["Retinoids", "Acne"], "views": 350},
     {"id": 2, "title": "Best Tinted Mineral SPF for Fitzpatrick Type IV (Melanin-Rich)", "user": "SkintoneMatch", "date": "2025-09-28", "replies": 8, "tags": ["Sunscreen", "Pigmentation"], "views": 820},
     {"id": 3, "title": "Is Double Cleansing Necessary in Hot/Humid Climates?", "user": "HumidHater", "date": "2025-10-05", "replies": 3, "tags": ["Cleansing", "Climate"], "views": 110},
@@ -329,25 +289,38 @@ def calculate_age(dob):
     except Exception:
         return 25 # Default
 
+def rerun_app():
+    """Reruns the whole script: st.rerun, or st.experimental_rerun on Streamlit releases that predate it."""
+    (getattr(st, 'rerun', None) or st.experimental_rerun)()
+
+def shift_cursor(key, delta):
+    """Prev/Next on_click callback: moves a paging cursor (an item offset in session state) before the rerun renders."""
+    st.session_state[key] = max(st.session_state.get(key, 0) + delta, 0)
+
 def navigate_to(page_name):
     """Updates the current page in session state."""
     st.session_state.current_page = page_name
 
 def save_user_data(username, data_type, data):
-    """Saves complex user data (profile or history) into the user_db."""
-    if username in st.session_state.user_db:
+    """Saves complex user data (profile or history) into the user store."""
+    store = get_user_store()
+    if store.user_exists(username):
         if data_type == 'profile':
-            st.session_state.user_db[username]['profile'].update(data)
-            st.session_state.user_db[username]['onboarding_complete'] = True
-            # Recalculate everything on profile update
-            st.session_state.user_db[username]['current_routine'], _ = generate_hyper_routine(st.session_state.user_db[username]['profile'])
-            calculate_skin_score(st.session_state.user_db[username]['profile'], st.session_state.user_db[username]['history'])
-        elif data_type in st.session_state.user_db[username]['history']:
-            st.session_state.user_db[username]['history'][data_type].append(data)
+            with store.user_lock(username):
+                profile = {**store.get_user(username, with_history=False)['profile'], **data}
+                store.update_user(username, profile=profile, onboarding_complete=True) # Bumps profile_version
+            # Re-derive everything that depends on the profile, in parallel, for the new version
+            user_record = store.get_user(username)
+            views = get_derived_views(user_record)
+            # Recalculate everything on profile update: persist the new routine and today's score
+            store.update_user(username, current_routine=views['routine'], routine_version=user_record['profile_version'])
+            record_skin_score(user_record)
+        elif data_type in UserStore.HISTORY_KINDS:
+            store.append_history(username, data_type, data)
         elif data_type == 'current_routine':
-            st.session_state.user_db[username]['current_routine'] = data
+            store.update_user(username, current_routine=data)
         
-        st.session_state.user_db[username]['history']['compliance_log'].append({
+        store.append_history(username, 'compliance_log', {
             'date': date.today().isoformat(),
             'activity': f'Data Updated: {data_type}',
             'timestamp': datetime.now().isoformat()
@@ -355,341 +328,189 @@ def save_user_data(username, data_type, data):
     else:
         st.error("Error: User not found in database.")
 
-def check_ingredient_conflict(routine_steps):
-    """
-    Hyper-Logic 1.1: Checks for ingredient conflicts within the current routine.
-    More complex rules based on the ACTIVE_INGREDIENT_PROFILES matrix.
-    """
-    active_ingredients = [step['ingredient_key'] for step in routine_steps if 'ingredient_key' in step and 'Active' in step['type']]
-    conflicts = []
-    
-    # Check for direct conflict pairs
-    if "Retinol (0.5% Encapsulated)" in active_ingredients and "L-Ascorbic Acid (Vitamin C)" in active_ingredients:
-        conflicts.append("⚠️ Retinol and L-AA should NEVER be used in the same routine (different pH, high irritation risk). Separate to Night (Retinol) and Morning (L-AA).")
-    
-    if "Benzoyl Peroxide (BP 5%)" in active_ingredients and ("Retinol (0.5% Encapsulated)" in active_ingredients or "L-Ascorbic Acid (Vitamin C)" in active_ingredients):
-        conflicts.append("🚨 Severe Conflict: BP inactivates Retinol/L-AA and causes excessive irritation. AVOID using BP in the routine unless specifically targeted and separated.")
+# The engine itself lives in the headless `skinova` package. These wrappers bind it
+# to the active catalog, the process-wide routine cache and the logged-in session.
 
-    # Check for over-exfoliation risk (AHA + BHA + Retinoid is the highest risk)
-    exfoliators = [ing for ing in active_ingredients if ing in ["Retinol (0.5% Encapsulated)", "Glycolic Acid (AHA 10%)", "Salicylic Acid (BHA 2%)"]]
-    if len(exfoliators) > 2:
-        conflicts.append("🔥 Hyper-Warning: High risk of over-exfoliation. Ensure these are used on ALTERNATE nights (Skin Cycling protocol is mandatory).")
-    
-    # Check for multiple products with same key ingredient from different categories
-    niacinamide_count = sum(1 for step in routine_steps if "Niacinamide" in step.get('ingredient_key', ''))
-    if niacinamide_count > 1:
-        conflicts.append("📌 Optimization: You have multiple Niacinamide products. Consider using only one high-concentration serum to save budget and avoid redundancy.")
+FORUM_PAGE_SIZES = [10, 25, 50]
+FORUM_ORDER_LABELS = {'Most Viewed': 'views', 'Newest': 'recent'}
 
-    return conflicts
+@st.cache_resource
+def get_forum_store():
+    """Process-wide forum thread store shared by every session, seeded once."""
+    return ThreadStore(FORUM_SEED_THREADS)
 
-def get_product_for_routine_step(concern, active_ing, budget, type_filter, current_routine_product_ids):
+@st.cache_resource
+def get_score_series_cache():
     """
-    Hyper-Logic 1.2: Finds the best product match based on multiple criteria.
-    Prioritizes products the user hasn't used yet to expand options.
+    Process-wide per-user score series (typed NumPy columns with a running trend fit).
+    skinova.series pulls in numpy, so it is only imported once a dashboard is shown.
     """
-    # 1. Base Filter by Category and Ingredient
-    filtered_df = PRODUCT_DF[
-        (PRODUCT_DF['category'].str.contains(type_filter.split(' ')[0], case=False, na=False)) |
-        (PRODUCT_DF['active_ing'].apply(lambda x: active_ing in x))
-    ].copy()
-    
-    if filtered_df.empty:
-        return {"name": f"Recommended Product (AI: {active_ing} {type_filter})", "id": 0, "price": 0, "rating": 5.0}
-
-    # 2. Budget Scoring
-    budget_map = {'Low': 1, 'Mid': 2, 'High': 3}
-    user_budget_score = budget_map.get(budget, 2)
-    
-    def score_product(row):
-        score = row['rating'] * 10 
-        
-        # Budget Match Score (Closer to user's budget preference is better)
-        prod_budget_score = budget_map.get(row['budget'], 2)
-        score -= abs(prod_budget_score - user_budget_score) * 5 # Penalty for mismatch
-        
-        # Concern Match Bonus
-        if any(c in row['concern_match'] for c in concern):
-            score += 10
-            
-        # Preference to New Products (Avoid recommending existing kit products)
-        if row['id'] in current_routine_product_ids:
-            score -= 20
-            
-        return score
-
-    filtered_df['score'] = filtered_df.apply(score_product, axis=1)
-    
-    # 3. Select the highest scoring product
-    best_match = filtered_df.sort_values(by='score', ascending=False).iloc[0]
-    
-    return best_match.to_dict()
+    from skinova import ScoreSeriesCache
+    return ScoreSeriesCache()
+
+def get_score_series(username, score_log):
+    """The user's full score series; reloaded from the store if score_log has a newer score."""
+    last = (date.fromisoformat(score_log[-1]['date']).toordinal(), score_log[-1]['score']) if score_log else None
+    return get_score_series_cache().get(username, lambda: get_user_store().score_points(username), last)
+
+@st.cache_resource
+def get_routine_cache():
+    """Process-wide routine cache shared by every session."""
+    cache = RoutineCache()
+    METRICS.register_source('routine_cache', cache.stats)
+    return cache
+
+def record_skin_score(user_record):
+    """Hyper-Logic 3: Scores the user, logging today's score (once per day) and storing it on the user."""
+    store = get_user_store()
+    username = user_record['username']
+    latest = store.get_user(username, with_history=False) # Compliance and streak as of now
+    score_log = user_record['history']['score_log']
+    final_score, score_entry = engine.calculate_skin_score(
+        user_record['profile'], score_log, latest['compliance'], latest['routine_streak']
+    )
+    if score_entry is not None:
+        score_log.append(score_entry)
+        store.append_history(username, 'score_log', score_entry)
+        get_score_series_cache().append(username, date.fromisoformat(score_entry['date']).toordinal(), score_entry['score'])
+    store.update_user(username, skin_score=final_score)
+    return final_score
 
+# Derived views: everything computed from a user's profile (plus the score trend),
+# materialized once per (profile version, catalog version) and read by every page;
+# the score view alone is refreshed when new scores are logged. Derivations are pure
+# (they only read `context`, never write the store), so a view can be rebuilt any
+# time; the save and check-in paths persist results on the script thread.
+USER_VIEW_WORKERS = int(os.environ.get('SKINOVA_VIEW_WORKERS', 4))
+
+def derive_routine(context, views):
+    """Hyper-Logic 2: The stored routine if it was generated for this profile version, else the routine for it."""
+    user = context['user']
+    if user['current_routine'] and user['routine_version'] == user['profile_version']:
+        return user['current_routine']
+    # Avoid the products already in the user's routine, to expand their options
+    current_routine_product_ids = [p['product_id'] for p in user['current_routine'] if p.get('product_id')]
+    routine, _ = engine.generate_hyper_routine(user['profile'], current_routine_product_ids, context['catalog'], context['routine_cache'])
+    return routine
+
+def derive_conflicts(context, views):
+    """Ingredient conflict report for the routine."""
+    return CONFLICT_ENGINE.evaluate(views['routine'])
+
+def derive_kit(context, views):
+    """Hyper-Logic 5: The budget-constrained kit plan for the routine, drawn from the active catalog."""
+    from skinova import optimize_kit
+    return optimize_kit(context['user']['profile'], views['routine'], context['catalog'])
+
+def derive_dashboard(context, views):
+    """Profile-level aggregates shown on the dashboard."""
+    profile = context['user']['profile']
+    return {
+        'climate': profile.get('climate', 'Temperate'),
+        'active_concerns': len(profile.get('primary_concerns', [])),
+        'goal_date': date.fromisoformat(profile.get('goal_date', date.today().isoformat())),
+    }
 
-def generate_hyper_routine(profile):
+def derive_score(context, views):
     """
-    Hyper-Logic 2: Generates a highly customized routine based on 10+ profile parameters.
-    Implements Skin Cycling, Climate Adjustment, and Budget Optimization.
+    Hyper-Logic 3.1: The skin-score trend view, read off the user's ScoreSeries: the
+    chart's last TREND_WINDOW points, the running least-squares fit and its projection.
+    'version' is the series version it was read at (read first, so a racing append
+    only makes the view look older than it is).
     """
-    # 1. Extract Profile Data
-    skin_type = profile.get('skin_type', 'Normal')
-    concerns = profile.get('primary_concerns', [])
-    climate = profile.get('climate', 'Temperate')
-    budget = profile.get('budget', 'Mid')
-    sensitivity = profile.get('skin_sensitivity', 'Low')
-    
-    current_routine_product_ids = [p['product_id'] for p in st.session_state.user_db.get(st.session_state.current_user, {}).get('current_routine', []) if p.get('product_id')]
-    
-    # 2. Routine Initialization
-    morning_routine = []
-    evening_routine = []
-    
-    # 3. Logic for Cleansing (MANDATORY STEPS)
-    cleanser_active = "Ceramides"
-    cleanser_type = "Creamy Cleanser" if skin_type in ['Dry', 'Sensitive'] else "Gel Cleanser"
-    
-    # Morning Cleanser (Adjusted for climate)
-    if climate in ['Cold/Dry', 'Temperate']:
-        morning_routine.append({"step": 1, "time": "Morning", "type": cleanser_type, "ingredient_key": cleanser_active, 
-                                "product": get_product_for_routine_step(concerns, cleanser_active, budget, "Cleanser", current_routine_product_ids), 
-                                "notes": "Gentle rinse with water or use a light cleanser."})
-    else: # Hot/Humid
-        morning_routine.append({"step": 1, "time": "Morning", "type": "Foaming Cleanser", "ingredient_key": "Salicylic Acid (BHA 2%)" if 'Oiliness' in skin_type else "Glycerin", 
-                                "product": get_product_for_routine_step(concerns, "Cleanser", budget, "Cleanser", current_routine_product_ids),
-                                "notes": "Use a deep, but non-stripping cleanse to manage morning oil."})
-    
-    # Evening Double Cleansing
-    evening_routine.append({"step": 1, "time": "Evening", "type": "Oil Cleanser", "ingredient_key": "Squalane", 
-                            "product": get_product_for_routine_step(concerns, "Oil Cleanser", budget, "Oil Cleanser", current_routine_product_ids), 
-                            "notes": "MANDATORY first step to remove SPF/Makeup/Pollution."})
-    evening_routine.append({"step": 2, "time": "Evening", "type": cleanser_type, "ingredient_key": cleanser_active, 
-                            "product": get_product_for_routine_step(concerns, "Ceramides", budget, "Cleanser", current_routine_product_ids), 
-                            "notes": "Second cleanse for skin purification."})
-
-    # 4. Active Treatment (The Skin Cycling Protocol - Night Steps are 3-6)
-    
-    # Day Active (Morning - Antioxidant/Brightening)
-    if 'Pigmentation' in concerns or 'Aging' in concerns:
-        active_ing = "L-Ascorbic Acid (Vitamin C)"
-    elif 'Redness' in concerns or 'Barrier' in concerns:
-        active_ing = "Niacinamide (Vitamin B3)"
-    else:
-        active_ing = "Hyaluronic Acid (HA)"
+    series = context['score_series']
+    version = series.version
+    return {
+        'version': version,
+        'latest': version[1],
+        'points': series.tail(),
+        'trend': series.trend(),
+        'projection': series.projection(),
+    }
 
-    morning_routine.append({"step": 2, "time": "Morning", "type": "Antioxidant/Treatment Serum", "ingredient_key": active_ing, 
-                            "product": get_product_for_routine_step(concerns, active_ing, budget, "Serum", current_routine_product_ids), 
-                            "notes": "Shield against environmental damage. Apply to dry skin."})
-    
-    # Night Actives (Skin Cycling Logic)
-    
-    # NIGHT 1: Exfoliation (BHA/AHA)
-    exfoliant_ing = "Salicylic Acid (BHA 2%)" if 'Acne' in concerns else "Glycolic Acid (AHA 10%)"
-    if sensitivity == 'High': exfoliant_ing = "Azelaic Acid (10%)" # Gentle substitute
-
-    evening_routine.append({"step": 3, "time": "Evening (NIGHT 1 - Exfoliation)", "type": "Exfoliant", "ingredient_key": exfoliant_ing, 
-                            "product": get_product_for_routine_step(concerns, exfoliant_ing, budget, "Exfoliant", current_routine_product_ids), 
-                            "notes": f"**Use only once every 4 nights.** Removes dead skin. Follow with a calming moisturizer."})
-
-    # NIGHT 2: Retinoid
-    retinoid_ing = "Retinol (0.5% Encapsulated)"
-    if 'Acne' in concerns and sensitivity == 'Low': retinoid_ing = "Retinol (0.5% Encapsulated)"
-    elif 'Aging' in concerns and sensitivity == 'High': retinoid_ing = "Azelaic Acid (10%)" # Gentler Retinoid Alternative
-
-    evening_routine.append({"step": 4, "time": "Evening (NIGHT 2 - Retinoid)", "type": "Regenerative Treatment", "ingredient_key": retinoid_ing, 
-                            "product": get_product_for_routine_step(concerns, retinoid_ing, budget, "Active Night", current_routine_product_ids), 
-                            "notes": "**Use only once every 4 nights.** Anti-aging/Acne control. Apply pea-sized amount to dry skin."})
-    
-    # NIGHTS 3 & 4: Recovery/Hydration
-    evening_routine.append({"step": 5, "time": "Evening (NIGHT 3 & 4 - Recovery)", "type": "Hydration/Barrier Serum", "ingredient_key": "Ceramides (NP, AP, EOP)", 
-                            "product": get_product_for_routine_step(concerns, "Ceramides", budget, "Serum", current_routine_product_ids), 
-                            "notes": "**Use on the 2 nights following Retinoid.** Focus on repairing the skin barrier after actives."})
-
-    # 5. Moisturizer & Sunscreen (MANDATORY STEPS)
-    moisturizer_ing = "Ceramides (NP, AP, EOP)"
-    if skin_type in ['Dry', 'Sensitive']: moisturizer_type = "Barrier Repair Cream"
-    else: moisturizer_type = "Lightweight Gel-Cream"
-
-    # Morning Moisturizer
-    morning_routine.append({"step": 3, "time": "Morning", "type": moisturizer_type, "ingredient_key": moisturizer_ing, 
-                            "product": get_product_for_routine_step(concerns, moisturizer_ing, budget, "Moisturizer", current_routine_product_ids), 
-                            "notes": "Locks in hydration. Apply before SPF."})
-    
-    # Evening Moisturizer (Last Step)
-    evening_routine.append({"step": 6, "time": "Evening", "type": "Restorative Night Cream", "ingredient_key": "Peptides", 
-                            "product": get_product_for_routine_step(concerns, "Moisturizer", budget, "Moisturizer", current_routine_product_ids), 
-                            "notes": "Heavy occlusive layer to prevent trans-epidermal water loss (TEWL)."})
-    
-    # Sunscreen (Always last in AM)
-    sunscreen_ing = "Zinc Oxide"
-    if profile.get('fitzpatrick_type') in ['IV', 'V', 'VI']: sunscreen_type = "Tinted Mineral SPF 50+"
-    else: sunscreen_type = "Mineral Zinc Oxide SPF 50+"
-    
-    morning_routine.append({"step": 4, "time": "Morning", "type": sunscreen_type, "ingredient_key": sunscreen_ing, 
-                            "product": get_product_for_routine_step(concerns, sunscreen_ing, budget, "Sunscreen", current_routine_product_ids), 
-                            "notes": "CRUCIAL. Apply liberally and reapply every 2 hours."})
+USER_VIEW_DERIVATIONS = {
+    'routine': ((), derive_routine),
+    'conflicts': (('routine',), derive_conflicts),
+    'kit': (('routine',), derive_kit),
+    'dashboard': ((), derive_dashboard),
+    'score': ((), derive_score),
+}
 
-    # 6. Final Routine Assembly and Conflict Check
-    full_routine = morning_routine + evening_routine
-    conflicts = check_ingredient_conflict(full_routine)
-    
-    return full_routine, conflicts
+@st.cache_resource
+def get_user_views():
+    """Process-wide materialized per-user derived views."""
+    views = ViewMaterializer(USER_VIEW_DERIVATIONS, max_workers=USER_VIEW_WORKERS)
+    METRICS.register_source('user_views', views.stats)
+    return views
 
+def _view_context(user_record):
+    catalog = get_catalog()
+    context = {'user': user_record, 'catalog': catalog, 'routine_cache': get_routine_cache(),
+               'score_series': get_score_series(user_record['username'], user_record['history']['score_log'])}
+    return (user_record['profile_version'], catalog.version), context
 
-def calculate_skin_score(profile, history):
+def get_derived_views(user_record):
     """
-    Hyper-Logic 3: Calculates a detailed Skin Score out of 100 based on complex factors.
-    Includes compliance history, lifestyle weighting, and concern penalties.
+    The user's derived views for their current profile version; materialized on the first
+    read after a bump. Scores are logged without a profile change, so when the score view
+    is behind the user's series only that view is refreshed, not the routine or kit.
     """
-    score = 100 
-    
-    # 1. Base Penalties (Weighted by Severity)
-    concern_penalties = {
-        'Acne': 12, 'Pigmentation': 10, 'Aging': 8, 'Rosacea': 15, 'Texture': 5
-    }
-    for concern in profile.get('primary_concerns', []):
-        score -= concern_penalties.get(concern, 0)
-    
-    # 2. Lifestyle Penalty/Bonus (Up to 15 points impact)
-    stress_level = profile.get('lifestyle', {}).get('stress_level', 3) # 1 (Low) to 4 (High)
-    sleep_quality = profile.get('lifestyle', {}).get('sleep_quality', 3) # 1 (Excellent) to 4 (Poor)
-    
-    score -= (stress_level - 1) * 3  # High stress -> max -9 penalty
-    score -= (sleep_quality - 1) * 2 # Poor sleep -> max -6 penalty
-    
-    # 3. Compliance/Streak Bonus (Dynamic Impact - Up to 20 points impact)
-    today = date.today()
-    last_14_days_compliance = [log for log in history.get('compliance_log', []) if date.fromisoformat(log['date']) >= today - timedelta(days=14)]
-    
-    compliance_score = sum(1 for log in last_14_days_compliance if log.get('m_done') and log.get('e_done')) * 0.75
-    score += min(15, int(compliance_score)) # Max 15 points
-    
-    streak = st.session_state.user_db.get(st.session_state.current_user, {}).get('routine_streak', 0)
-    score += min(5, streak // 7) # Max 5 points for long streak
-    
-    # 4. Seasonal/Environmental Multiplier
-    current_season = profile.get('climate', 'Temperate')
-    if current_season in ['Hot/Humid'] and 'Oiliness' in profile.get('skin_type', 'Normal'):
-        score *= 0.98 # Small penalty for climate challenge
-    elif current_season in ['Cold/Dry'] and 'Dry' in profile.get('skin_type', 'Normal'):
-        score *= 0.95 # Small penalty for climate challenge
-
-    # 5. Final Clamping and Logging
-    final_score = max(40, min(98, int(score))) 
-    
-    score_log = history.get('score_log', [])
-    last_score = score_log[-1]['score'] if score_log else 75
-    
-    if not score_log or score_log[-1]['date'] != today.isoformat():
-        score_log.append({
-            'date': today.isoformat(),
-            'score': final_score,
-            'delta': f"{'+' if final_score >= last_score else '-'}{abs(final_score - last_score)}"
-        })
-    st.session_state.user_db[st.session_state.current_user]['skin_score'] = final_score
-    st.session_state.user_db[st.session_state.current_user]['history']['score_log'] = score_log
-    
-    return final_score
-
-
-def generate_mock_analysis_report(profile):
+    version, context = _view_context(user_record)
+    materializer = get_user_views()
+    views = materializer.get(user_record['username'], version, context)
+    if views['score']['version'] != context['score_series'].version:
+        views = materializer.refresh(user_record['username'], version, context, ['score'])
+    return views
+
+# Hyper-Analyzer runs go through a bounded background pool, never the script thread
+ANALYSIS_WORKERS = int(os.environ.get('SKINOVA_ANALYSIS_WORKERS', 2))
+ANALYSIS_MAX_PENDING = int(os.environ.get('SKINOVA_ANALYSIS_MAX_PENDING', 32))
+ANALYSIS_SIMULATED_SECONDS = 3 # Stand-in for the pathology engine's processing time
+ANALYSIS_POLL_SECONDS = 0.5
+
+@st.cache_resource
+def get_job_queue():
+    """Process-wide background job queue (one analysis in flight per user)."""
+    queue = JobQueue(max_workers=ANALYSIS_WORKERS, max_pending=ANALYSIS_MAX_PENDING, per_user_limit=1)
+    METRICS.register_source('job_queue', queue.stats)
+    return queue
+
+# Photo analyses are cached by content hash: in memory per process, on disk across workers
+ANALYSIS_CACHE_DIR = os.environ.get('SKINOVA_ANALYSIS_CACHE_DIR', os.path.join(os.path.dirname(USER_DB_PATH), 'analysis_cache'))
+ANALYSIS_CACHE_MB = int(os.environ.get('SKINOVA_ANALYSIS_CACHE_MB', 256))
+
+@st.cache_resource
+def get_analysis_cache():
+    """Process-wide photo-analysis result cache, backed by ANALYSIS_CACHE_DIR."""
+    cache = ResultCache(ANALYSIS_CACHE_DIR, disk_bytes=ANALYSIS_CACHE_MB * 1024 * 1024)
+    METRICS.register_source('analysis_cache', cache.stats)
+    return cache
+
+def run_hyper_analysis(profile, photo=None, cache=None):
     """
-    Hyper-Logic 4: Generates a highly detailed, mock Skin Analyzer report (Dermato-Pathology Simulation).
+    Job body: the analysis itself, from the photo's pixels when one was uploaded.
+    Runs on a pool worker; a photo seen before (same bytes, same engine) is not re-analyzed.
     """
-    
-    report_date = date.today().isoformat()
-    analysis_data = {
-        "report_id": f"SR-{datetime.now().strftime('%Y%m%d%H%M%S')}",
-        "date": report_date,
-        "assessment_summary": "Comprehensive AI assessment combining self-reported data, visual markers, and active treatment plan efficacy.",
-        "metrics": {
-            "hydration_level_pct": random.randint(30, 70), 
-            "sebum_production_rate": random.randint(40, 90) if profile['skin_type'] == 'Oiliness' else random.randint(20, 50),
-            "collagen_integrity_score_pct": random.randint(55, 85) if profile.get('age_group') == '30+' else random.randint(80, 95),
-            "pigmentation_index": random.randint(10, 40) if 'Pigmentation' in profile['primary_concerns'] else random.randint(5, 15),
-            "barrier_strength_index": random.randint(60, 95)
-        },
-        "pathology_breakdown": [],
-        "environmental_impact": {
-            "uv_exposure_risk": "High (Mandatory SPF use. Fitzpatrick Type V is highly susceptible to PIH).",
-            "pollution_stress_index": 8.1,
-            "climate_factor": f"{profile['climate']} - Requires adaptation for humidity/dryness."
-        },
-        "actionable_recommendations": [
-            "Re-evaluate current active strength (may need to increase Retinoid concentration after 6 months).",
-            "Implement **Facial Massage** daily for lymph drainage.",
-            "Use only **non-comedogenic** products."
-        ]
-    }
-    
-    # Detailed Pathology Generation based on Concerns
-    if 'Acne' in profile['primary_concerns']:
-        analysis_data["pathology_breakdown"].append({
-            "area": "Jawline & Cheeks",
-            "finding": "High density of closed comedones and microcysts. Possible hormonal link (Simulated).",
-            "severity": "Moderate-Severe",
-            "root_cause": "Hormonal fluctuations and inflammation (elevated P. acnes)."
-        })
-    if 'Pigmentation' in profile['primary_concerns']:
-        analysis_data["pathology_breakdown"].append({
-            "area": "Forehead and Upper Lip",
-            "finding": "Melasma-like patches with deep dermal component (AI Visual Assessment).",
-            "severity": "High",
-            "root_cause": "Historic UV damage and hormonal triggers."
-        })
-    if profile.get('age_group') == '30+':
-        analysis_data["pathology_breakdown"].append({
-            "area": "Periorbital Region",
-            "finding": "Fine lines (static and dynamic) visible. Loss of elasticity.",
-            "severity": "Mild-Moderate",
-            "root_cause": "Natural aging and collagen degradation."
-        })
-    
-    # Save the detailed report to history
-    st.session_state.user_db[st.session_state.current_user]['history']['analytics_reports'].append(analysis_data)
-    
-    return analysis_data
+    if photo is None:
+        time.sleep(ANALYSIS_SIMULATED_SECONDS)
+        return engine.generate_mock_analysis_report(profile)
+    from skinova import analyze_skin_photo, ANALYSIS_ENGINE_VERSION
+    if cache is None:
+        photo_analysis = analyze_skin_photo(photo)
+    else:
+        photo_analysis = cache.get_or_compute(photo, ANALYSIS_ENGINE_VERSION, lambda: analyze_skin_photo(photo))
+    return engine.generate_mock_analysis_report(profile, photo_analysis=photo_analysis)
 
-def generate_personalized_kit(profile, routine):
+def submit_analysis(username, profile, photo=None):
     """
-    Hyper-Logic 5: Generates a 6-product "Essential Kit" based on the full routine, budget, and product availability.
+    Hyper-Logic 4: Queues an analysis for the user and returns its job id; the report
+    is saved to analytics_reports by the worker as soon as it completes.
+    Raises JobRejected when the queue is full or the user already has one running.
     """
-    kit_products = []
-    product_ids = [step['product']['id'] for step in routine if step['product']['id'] != 0]
-    
-    # Prioritized categories for the 6-product kit
-    priorities = ["Cleanser", "Sunscreen", "Moisturizer", "Active Serum", "Active Night", "Exfoliant"]
-    
-    # Track categories already added to ensure balanced kit
-    added_categories = set()
-    
-    for category in priorities:
-        # Filter the full routine steps for this category
-        candidate_steps = [step for step in routine if category in step['type']]
-        
-        if candidate_steps:
-            # Get the recommended product ID from the routine step
-            product_id = candidate_steps[0]['product']['id']
-            
-            # Find the full product detail from the main catalog
-            product_detail = PRODUCT_DF[PRODUCT_DF['id'] == product_id].iloc[0].to_dict()
-            
-            if product_detail and category not in added_categories:
-                kit_products.append(product_detail)
-                added_categories.add(category)
-                if len(kit_products) >= 6:
-                    break
-
-    # If the kit is still too small (e.g., no separate exfoliants recommended)
-    while len(kit_products) < 6:
-        # Fill remaining slots with the highest-rated product not yet in the kit
-        unused_products = PRODUCT_DF[~PRODUCT_DF['id'].isin([p['id'] for p in kit_products])]
-        
-        if unused_products.empty:
-            break
-            
-        best_filler = unused_products.sort_values(by='rating', ascending=False).iloc[0].to_dict()
-        kit_products.append(best_filler)
-        
-    return kit_products
+    store = get_user_store()
+    cache = get_analysis_cache() if photo is not None else None
+    return get_job_queue().submit(username, 'analysis', run_hyper_analysis, profile, photo, cache,
+                                  on_complete=lambda report: store.append_history(username, 'analytics_reports', report))
 
 
 # --- 4. MODULAR UI RENDERING COMPONENTS ---
@@ -704,23 +525,20 @@ def render_kpi_card(title, value, unit, color_bg, icon, tooltip):
         </div>
     """, unsafe_allow_html=True)
 
-def render_routine_step(step_data, time_of_day, user_id):
-    """Renders a single, detailed routine step with compliance checkbox."""
-    step_key = f"{user_id}_{time_of_day}_{step_data['step']}_{date.today().isoformat()}"
-    
-    # Checkbox state management
-    if step_key not in st.session_state:
-        st.session_state[step_key] = False
+def render_routine_step(step_data, time_of_day, index, checklist, conflict_report):
+    """Renders a single, detailed routine step with compliance checkbox (bit `index` of today's checklist)."""
+    ritual = time_of_day.lower()
 
-    # Check for conflicts to display warning
-    conflicts = check_ingredient_conflict(st.session_state.user_db[user_id]['current_routine'])
-    is_conflict = any(step_data['ingredient_key'] in c for c in conflicts)
+    # Conflict warning (looked up in the routine-wide report computed once per render)
+    is_conflict = step_data['ingredient_key'] in conflict_report['by_ingredient']
     
     product_info = step_data.get('product', {'name': 'N/A', 'price': 0, 'rating': 0})
     
     col1, col2 = st.columns([1, 4])
     with col1:
-        st.session_state[step_key] = st.checkbox(f"**Step {step_data['step']}**", value=st.session_state[step_key], key=f"chk_{step_key}")
+        # Keyed by day: yesterday's widgets are not rendered today, so Streamlit drops their state
+        done = st.checkbox(f"**Step {step_data['step']}**", value=checklist.is_done(ritual, index), key=f"chk_{ritual}_{index}_{checklist.day}")
+        checklist.mark(ritual, index, done)
 
     with col2:
         st.markdown(f"""
@@ -739,6 +557,43 @@ def render_routine_step(step_data, time_of_day, user_id):
         """, unsafe_allow_html=True)
 
 
+@st.cache_data(max_entries=2048, show_spinner=False)
+@METRICS.timed('chart.score_trend') # Inside the cache: only actual renders are timed
+def render_score_trend_png(username, score_series_version, _score_view):
+    """
+    Renders the 30-day Skin Score trend (with 7-day projection) to PNG bytes.
+    Cached per (user, series version); the materialized score view itself is excluded
+    from hashing. It already holds the last 30 points and the running trend fit, so
+    the cost does not grow with the length of the user's history.
+    matplotlib is imported here so sessions that never chart don't pay for it.
+    """
+    import matplotlib
+    matplotlib.use('Agg') # Non-interactive backend: charts are rendered server-side to PNG bytes
+    from matplotlib.figure import Figure
+
+    dates, scores = _score_view['points']
+    projection = _score_view['projection']
+    
+    # Figure is created without pyplot, so no global figure registry holds on to it
+    fig = Figure(figsize=(10, 4))
+    ax = fig.subplots()
+    ax.plot(dates, scores, marker='o', linestyle='-', color=DARK_ACCENT, label='Actual Score')
+    if projection is not None:
+        ax.plot(*projection, linestyle='--', color=SOFT_BLUE, label='7-Day Projection')
+    
+    ax.set_title("Skin Score Trend", fontsize=16, color=TEXT_COLOR)
+    ax.set_xlabel("Date", fontsize=12)
+    ax.set_ylabel("Score (PTS)", fontsize=12)
+    ax.grid(True, linestyle=':', alpha=0.6)
+    ax.legend()
+    ax.tick_params(axis='x', labelrotation=45)
+    fig.tight_layout()
+
+    buffer = BytesIO()
+    fig.savefig(buffer, format='png')
+    fig.clear()
+    return buffer.getvalue()
+
 def render_product_card(product):
     """Renders a beautiful product card for the Marketplace/Kit."""
     col1, col2 = st.columns([3, 1])
@@ -768,28 +623,11 @@ def render_product_card(product):
 # --- LOGIN & ONBOARDING ---
 
 def create_new_user(username, password):
-    """Creates a new user session."""
-    if username in st.session_state.user_db:
-        return False
-    
-    st.session_state.user_db[username] = {
-        'username': username,
-        'password': password,
-        'profile': {},
-        'onboarding_complete': False,
-        'history': {
-            'score_log': [{'date': (date.today() - timedelta(days=30)).isoformat(), 'score': 75, 'delta': '+0'}],
-            'compliance_log': [],
-            'analytics_reports': [],
-            'routine_history': []
-        },
-        'current_routine': [],
-        'skin_score': 75,
-        'routine_streak': 0,
-        'last_checkin_date': None,
-        'consultation_history': []
-    }
-    return True
+    """Creates a new user account in the shared user store."""
+    return get_user_store().create_user(
+        username, password, skin_score=75,
+        score_log=[{'date': (date.today() - timedelta(days=30)).isoformat(), 'score': 75, 'delta': '+0'}]
+    )
 
 def login_page():
     """Renders the Login/Signup page."""
@@ -805,11 +643,11 @@ def login_page():
             submit_login = st.form_submit_button("Login to Platform")
 
             if submit_login:
-                if login_user in st.session_state.user_db and st.session_state.user_db[login_user]['password'] == login_pass:
+                if get_user_store().check_password(login_user, login_pass):
                     st.session_state.logged_in = True
                     st.session_state.current_user = login_user
                     st.success(f"Welcome back, {login_user}!")
-                    if st.session_state.user_db[login_user]['onboarding_complete']:
+                    if get_user_store().get_user(login_user, with_history=False)['onboarding_complete']:
                         navigate_to('Dashboard')
                     else:
                         navigate_to('Onboarding')
@@ -824,7 +662,7 @@ def login_page():
             submit_signup = st.form_submit_button("Create My Account")
 
             if submit_signup:
-                if new_user in st.session_state.user_db:
+                if get_user_store().user_exists(new_user):
                     st.error("Username already exists.")
                 elif new_pass != confirm_pass:
                     st.error("Passwords do not match.")
@@ -842,7 +680,7 @@ def onboarding_page():
     st.title("🧬 SkinovaAI Hyper-Onboarding (Step 1 of 2)")
     st.markdown("### Let's create your Hyper-Personalized Skin Profile.")
     
-    current_user_profile = st.session_state.user_db[st.session_state.current_user]['profile']
+    current_user_profile = get_user_store().get_user(st.session_state.current_user, with_history=False)['profile']
     
     with st.form("onboarding_form"):
         tab1, tab2, tab3 = st.tabs(["Personal Info", "Concerns & History", "Lifestyle & Goals"])
@@ -912,25 +750,24 @@ def onboarding_page():
             }
             
             with st.spinner("Analyzing 15+ variables and synthesizing routine..."):
-                time.sleep(2) 
                 save_user_data(st.session_state.current_user, 'profile', profile_data)
                 
-            st.session_state.user_db[st.session_state.current_user]['onboarding_complete'] = True
+            get_user_store().update_user(st.session_state.current_user, onboarding_complete=True)
             navigate_to('Dashboard')
-            st.experimental_rerun()
+            rerun_app()
 
 
 # --- DASHBOARD (Feature 1) ---
 
 def dashboard_page():
     """Renders the main user dashboard with KPIs and analytics."""
-    user_data = st.session_state.user_db[st.session_state.current_user]
-    profile = user_data['profile']
-    history = user_data['history']
+    user_data = get_user_store().get_user(st.session_state.current_user)
+    views = get_derived_views(user_data)
+    aggregates = views['dashboard']
     
     st.title("📊 Hyper-Dashboard: Your Skin Health Overview")
     
-    st.markdown(f"## Welcome back, **{user_data['username'].capitalize()}**! Your current score is based on {profile.get('climate', 'Temperate')} climate and {len(profile.get('primary_concerns', []))} active concerns.")
+    st.markdown(f"## Welcome back, **{user_data['username'].capitalize()}**! Your current score is based on {aggregates['climate']} climate and {aggregates['active_concerns']} active concerns.")
 
     # 1. Main KPIs Section
     col1, col2, col3, col4 = st.columns(4)
@@ -941,12 +778,12 @@ def dashboard_page():
         render_kpi_card("Routine Streak", user_data['routine_streak'], "DAYS", streak_color, "🔥", "Consecutive days of checking in your AM/PM ritual.")
     with col3:
         # Calculate Compliance Rate
-        total_days = 14
-        compliant_days = sum(1 for log in history['compliance_log'] if date.fromisoformat(log['date']) >= date.today() - timedelta(days=total_days) and log.get('m_done') and log.get('e_done'))
+        total_days = COMPLIANCE_WINDOW_DAYS
+        compliant_days = user_data['compliance'].compliant_days(date.today().toordinal())
         compliance_rate = round((compliant_days / total_days) * 100) if total_days > 0 else 0
         render_kpi_card("14-Day Compliance", compliance_rate, "%", SOFT_BLUE, "✅", "Percentage of days you followed your full routine.")
     with col4:
-        days_to_goal = (datetime.strptime(profile.get('goal_date', date.today().isoformat()), "%Y-%m-%d").date() - date.today()).days
+        days_to_goal = (aggregates['goal_date'] - date.today()).days
         goal_color = SUCCESS_GREEN if days_to_goal > 0 else NEUTRAL_GREY
         render_kpi_card("Goal Deadline", days_to_goal, "DAYS", goal_color, "📅", "Days remaining until your target skin improvement date.")
     
@@ -955,45 +792,8 @@ def dashboard_page():
     # 2. Score History Chart (Hyper-Analytics)
     st.header("📈 Skin Score 30-Day Trend & Projection")
     
-    df_score = pd.DataFrame(history['score_log']).tail(30)
-    df_score['date'] = pd.to_datetime(df_score['date'])
-    
-    # Simple linear projection for 7 days
-    if len(df_score) > 1:
-        x = np.arange(len(df_score))
-        y = df_score['score'].values
-        slope, intercept = np.polyfit(x, y, 1)
-        
-        future_dates = [df_score['date'].iloc[-1] + timedelta(days=i) for i in range(1, 8)]
-        future_x = np.arange(len(df_score), len(df_score) + 7)
-        future_scores = [intercept + slope * fx for fx in future_x]
-        
-        df_projection = pd.DataFrame({
-            'date': future_dates,
-            'score': [min(98, s) for s in future_scores], # Clamp projection score
-            'type': 'Projection'
-        })
-        df_score['type'] = 'Actual'
-        df_chart = pd.concat([df_score[['date', 'score', 'type']], df_projection], ignore_index=True)
-        
-    else:
-        df_chart = df_score.copy()
-        df_chart['type'] = 'Actual'
-        
-    
-    fig, ax = plt.subplots(figsize=(10, 4))
-    ax.plot(df_chart[df_chart['type'] == 'Actual']['date'], df_chart[df_chart['type'] == 'Actual']['score'], marker='o', linestyle='-', color=DARK_ACCENT, label='Actual Score')
-    if 'Projection' in df_chart['type'].unique():
-        ax.plot(df_chart[df_chart['type'] == 'Projection']['date'], df_chart[df_chart['type'] == 'Projection']['score'], linestyle='--', color=SOFT_BLUE, label='7-Day Projection')
-    
-    ax.set_title("Skin Score Trend", fontsize=16, color=TEXT_COLOR)
-    ax.set_xlabel("Date", fontsize=12)
-    ax.set_ylabel("Score (PTS)", fontsize=12)
-    ax.grid(True, linestyle=':', alpha=0.6)
-    ax.legend()
-    plt.xticks(rotation=45)
-    plt.tight_layout()
-    st.pyplot(fig)
+    score_view = views['score']
+    st.image(render_score_trend_png(user_data['username'], score_view['version'], score_view))
 
     st.markdown("---")
     
@@ -1014,28 +814,34 @@ def dashboard_page():
 
 def my_routine_page():
     """Renders the user's daily ritual (AM/PM Routine) with compliance check."""
-    user_data = st.session_state.user_db[st.session_state.current_user]
+    user_data = get_user_store().get_user(st.session_state.current_user)
     
     st.title("✅ My Daily Ritual")
     st.markdown("### Your Hyper-Personalized Skincare Routine")
     st.info(f"📅 **Today's Date:** {date.today().strftime('%A, %B %d, %Y')}")
 
-    routine = user_data['current_routine']
-    if not routine:
+    if not user_data['current_routine']:
         st.warning("Your Hyper-Routine is not yet generated. Please complete the **Onboarding** or try clicking 'Get New Routine' on the Dashboard.")
         return
+    views = get_derived_views(user_data)
+    routine = views['routine']
 
     # Check for daily routine reset and update streak/score
     today = date.today().isoformat()
-    if user_data['last_checkin_date'] != today:
-        # Reset checkmark states for a new day
-        for key in list(st.session_state.keys()):
-            if key.startswith(f"{st.session_state.current_user}_Morning") or key.startswith(f"{st.session_state.current_user}_Evening"):
-                del st.session_state[key]
-        st.session_state.user_db[st.session_state.current_user]['last_checkin_date'] = None # Ensure it runs the check below
+    checklist = st.session_state.get('daily_checklist')
+    if checklist is None or checklist.username != st.session_state.current_user:
+        checklist = st.session_state['daily_checklist'] = DailyChecklist(st.session_state.current_user)
+    if checklist.roll(date.today().toordinal()):
+        # A new day: every checkmark starts cleared
         st.session_state['current_routine_completed'] = False
+    if user_data['last_checkin_date'] not in (today, None):
+        user_data['last_checkin_date'] = None # Ensure it runs the check below
+        get_user_store().update_user(st.session_state.current_user, last_checkin_date=None)
 
 
+    # Ingredient conflicts are evaluated once per routine, with the other derived views
+    conflict_report = views['conflicts']
+
     # Tabbed Routine Display
     tab1, tab2, tab3 = st.tabs(["🌞 Morning Ritual", "🌙 Evening Ritual", "⚠️ Routine Conflicts"])
     
@@ -1044,8 +850,8 @@ def my_routine_page():
 
     with tab1:
         st.header("🌞 Morning Steps (Antioxidant & Protection)")
-        for step in morning_routine:
-            render_routine_step(step, "Morning", st.session_state.current_user)
+        for index, step in enumerate(morning_routine):
+            render_routine_step(step, "Morning", index, checklist, conflict_report)
 
     with tab2:
         st.header("🌙 Evening Steps (Double Cleanse & Regeneration)")
@@ -1055,12 +861,12 @@ def my_routine_page():
             <br>Focus on the corresponding night step (Exfoliation, Retinoid, or Recovery).
             </div>
         """, unsafe_allow_html=True)
-        for step in evening_routine:
-            render_routine_step(step, "Evening", st.session_state.current_user)
+        for index, step in enumerate(evening_routine):
+            render_routine_step(step, "Evening", index, checklist, conflict_report)
 
     with tab3:
         st.header("⚠️ Ingredient Conflict and Optimization Alerts")
-        conflicts = check_ingredient_conflict(routine)
+        conflicts = conflict_report['messages']
         if conflicts:
             for conflict in conflicts:
                 st.error(conflict)
@@ -1074,8 +880,8 @@ def my_routine_page():
     st.header("✨ Daily Check-in")
     
     col_c1, col_c2 = st.columns(2)
-    morning_steps_done = all(st.session_state.get(f"{st.session_state.current_user}_Morning_{step['step']}_{today}", False) for step in morning_routine)
-    evening_steps_done = all(st.session_state.get(f"{st.session_state.current_user}_Evening_{step['step']}_{today}", False) for step in evening_routine)
+    morning_steps_done = checklist.all_done('morning', len(morning_routine))
+    evening_steps_done = checklist.all_done('evening', len(evening_routine))
 
     if col_c1.button("Check-in Morning Routine", disabled=morning_steps_done or st.session_state['current_routine_completed']):
         st.session_state['Morning_Check'] = True
@@ -1089,48 +895,95 @@ def my_routine_page():
         st.balloons()
         st.success("Daily Ritual Complete! Updating Skin Score and Streak...")
         
+        store = get_user_store()
+        
         # Update Compliance Log and Streak
-        user_data['history']['compliance_log'].append({
+        compliance_entry = {
             'date': today,
             'activity': 'Daily Ritual Check-in',
             'm_done': True,
             'e_done': True
-        })
-        
-        # Streak Logic
-        last_checkin = datetime.strptime(user_data['last_checkin_date'], "%Y-%m-%d").date() if user_data['last_checkin_date'] else None
+        }
+        user_data['history']['compliance_log'].append(compliance_entry)
+        store.append_history(st.session_state.current_user, 'compliance_log', compliance_entry)
+        store.record_compliance(st.session_state.current_user, today, m_done=True, e_done=True)
         
-        if last_checkin is None or last_checkin == date.today() - timedelta(days=1):
-            user_data['routine_streak'] += 1
-            st.session_state.user_db[st.session_state.current_user]['routine_streak'] = user_data['routine_streak']
-            st.toast(f"🔥 Streak increased to {user_data['routine_streak']} days!")
-        elif last_checkin != date.today():
-            user_data['routine_streak'] = 1 # Reset if non-consecutive
-            st.session_state.user_db[st.session_state.current_user]['routine_streak'] = 1
-            st.warning("Streak reset. Keep up the consistency!")
+        # Streak Logic (read-modify-write under the user's lock so parallel sessions don't lose updates)
+        with store.user_lock(st.session_state.current_user):
+            latest = store.get_user(st.session_state.current_user, with_history=False)
+            last_checkin = datetime.strptime(latest['last_checkin_date'], "%Y-%m-%d").date() if latest['last_checkin_date'] else None
             
-        st.session_state.user_db[st.session_state.current_user]['last_checkin_date'] = today
+            if last_checkin is None or last_checkin == date.today() - timedelta(days=1):
+                user_data['routine_streak'] = latest['routine_streak'] + 1
+                st.toast(f"🔥 Streak increased to {user_data['routine_streak']} days!")
+            elif last_checkin != date.today():
+                user_data['routine_streak'] = 1 # Reset if non-consecutive
+                st.warning("Streak reset. Keep up the consistency!")
+                
+            store.update_user(st.session_state.current_user, routine_streak=user_data['routine_streak'], last_checkin_date=today)
         st.session_state['current_routine_completed'] = True
-        calculate_skin_score(user_data['profile'], user_data['history'])
-        st.experimental_rerun()
+        record_skin_score(user_data)
+        rerun_app()
 
 
 # --- HYPER-ANALYZER (Feature 3) ---
 
+def render_analysis_progress(job_id):
+    """Status of a running analysis; once the job finishes the whole page reruns to show the report."""
+    jobs = get_job_queue()
+    job = jobs.status(job_id)
+    if job is None or job['state'] not in ('queued', 'running'):
+        rerun_app()
+    elif job['state'] == 'queued':
+        st.info(f"⏳ Your analysis is queued ({jobs.stats()['queued']} waiting). You can keep using the app meanwhile.")
+    else:
+        st.info("🔬 Processing over 20 internal and external factors via AI Pathology Engine...")
+
+# Where st.fragment exists the status polls itself without blocking the script thread;
+# older Streamlit releases get a refresh button instead
+LIVE_ANALYSIS_PROGRESS = hasattr(st, 'fragment')
+if LIVE_ANALYSIS_PROGRESS:
+    render_analysis_progress = st.fragment(run_every=ANALYSIS_POLL_SECONDS)(render_analysis_progress)
+
 def skin_analyzer_page():
     """Renders the Skin Analyzer for deep dermatological assessment simulation."""
     st.title("🔬 Hyper-Analyzer: Deep Dermatological Assessment (Simulated)")
     st.markdown("### Run a new analysis to get a 360° report based on your profile and compliance history.")
 
-    if st.button("Run New Hyper-Analysis", type="primary"):
-        with st.spinner("Processing over 20 internal and external factors via AI Pathology Engine..."):
-            time.sleep(3)
-            report = generate_mock_analysis_report(st.session_state.user_db[st.session_state.current_user]['profile'])
-            st.session_state['latest_report'] = report
-        st.success(f"Analysis Complete! Report ID: {report['report_id']}")
-
-    if 'latest_report' not in st.session_state and st.session_state.user_db[st.session_state.current_user]['history']['analytics_reports']:
-        st.session_state['latest_report'] = st.session_state.user_db[st.session_state.current_user]['history']['analytics_reports'][-1]
+    username = st.session_state.current_user
+    jobs = get_job_queue()
+    job_id = st.session_state.get('analysis_job')
+    if job_id is None:
+        # An analysis started from another tab/session of the same user is picked up too
+        job_id = next((job['id'] for job in jobs.active_jobs(username) if job['kind'] == 'analysis'), None)
+    job = jobs.status(job_id) if job_id is not None else None
+    in_progress = job is not None and job['state'] in ('queued', 'running')
+
+    photo = st.file_uploader("Upload a well-lit, front-facing photo for a measured analysis (optional)", type=['jpg', 'jpeg', 'png', 'webp'])
+    if st.button("Run New Hyper-Analysis", type="primary", disabled=in_progress):
+        try:
+            job_id = submit_analysis(username, get_user_store().get_user(username, with_history=False)['profile'],
+                                     photo.getvalue() if photo is not None else None)
+            job, in_progress = jobs.status(job_id), True
+        except JobRejected:
+            st.warning("The AI Pathology Engine is busy right now. Please try again in a moment.")
+    st.session_state['analysis_job'] = job_id if in_progress else None
+
+    if in_progress:
+        render_analysis_progress(job_id)
+        if not LIVE_ANALYSIS_PROGRESS:
+            st.button("🔄 Refresh Status") # Any click reruns the page
+    elif job is not None and job['state'] == 'done' and st.session_state.get('shown_analysis_job') != job['id']:
+        st.session_state['shown_analysis_job'] = job['id']
+        st.session_state['latest_report'] = job['result']
+        st.success(f"Analysis Complete! Report ID: {job['result']['report_id']}")
+    elif job is not None and job['state'] == 'failed' and st.session_state.get('shown_analysis_job') != job['id']:
+        st.session_state['shown_analysis_job'] = job['id']
+        st.error(f"Analysis failed: {job['error']}")
+
+    analytics_reports = get_user_store().history_range(st.session_state.current_user, 'analytics_reports')
+    if 'latest_report' not in st.session_state and analytics_reports:
+        st.session_state['latest_report'] = analytics_reports[-1]
     
     if 'latest_report' in st.session_state:
         report = st.session_state['latest_report']
@@ -1141,7 +994,7 @@ def skin_analyzer_page():
         st.info(report['assessment_summary'])
         
         # Metrics Visualizer
-        st.subheader("Key Biometric Markers (AI Simulation)")
+        st.subheader("Key Biometric Markers (Measured from Your Photo)" if 'photo_indices' in report else "Key Biometric Markers (AI Simulation)")
         m_col1, m_col2, m_col3, m_col4, m_col5 = st.columns(5)
         
         def display_metric(col, name, value, unit, color):
@@ -1180,15 +1033,16 @@ def skin_analyzer_page():
     # History
     st.markdown("---")
     st.subheader("Analysis History")
-    if len(st.session_state.user_db[st.session_state.current_user]['history']['analytics_reports']) > 0:
-        for i, h_report in enumerate(reversed(st.session_state.user_db[st.session_state.current_user]['history']['analytics_reports'])):
+    if len(analytics_reports) > 0:
+        for i, h_report in enumerate(reversed(analytics_reports)):
             if st.button(f"View Report from {h_report['date']}", key=f"hist_report_{i}"):
                 st.session_state['latest_report'] = h_report
-                st.experimental_rerun()
+                rerun_app()
     else:
         st.info("No prior reports available.")
 
 
+
 # --- PERSONALIZED KIT (Feature 4) ---
 
 def personalized_kit_page():
@@ -1196,27 +1050,30 @@ def personalized_kit_page():
     st.title("🎁 Your Personalized Hyper-Kit")
     st.markdown("### This is your essential 6-product system, optimized for efficacy, budget, and minimal conflicts.")
 
-    user_data = st.session_state.user_db[st.session_state.current_user]
-    routine = user_data['current_routine']
+    user_data = get_user_store().get_user(st.session_state.current_user)
     
-    if not routine:
+    if not user_data['current_routine']:
         st.warning("Please complete the Onboarding and ensure your routine is generated first.")
         return
 
-    if 'personalized_kit' not in st.session_state:
-        st.session_state['personalized_kit'] = generate_personalized_kit(user_data['profile'], routine)
-        
-    kit = st.session_state['personalized_kit']
-    total_cost = sum(p['price'] for p in kit)
+    # Materialized with the routine it was built for, so a new routine never shows an old kit
+    kit_plan = get_derived_views(user_data)['kit']
+    kit = kit_plan['products']
+    total_cost = kit_plan['total_price']
+    ceiling = kit_plan['budget_ceiling']
+    ceiling_note = f"within your ₹{ceiling:,} monthly ceiling" if ceiling is not None else "no monthly ceiling"
     
     st.markdown(f"""
         <div class="skinova-card" style="text-align: center; background-color: {SKIN_TONE_WARM};">
-            <h3 style='margin: 0; color: {DARK_ACCENT};'>Total Estimated Kit Cost: <span style='font-size: 1.5em;'>₹{total_cost:,}</span></h3>
-            <p style='margin: 5px 0 0 0;'>Based on your '{user_data['profile'].get('budget', 'Mid')}' budget preference.</p>
+            <h3 style='margin: 0; color: {DARK_ACCENT};'>Total Estimated Kit Cost: <span style='font-size: 1.5em;'>₹{total_cost:,.0f}</span></h3>
+            <p style='margin: 5px 0 0 0;'>Based on your '{user_data['profile'].get('budget', 'Mid')}' budget preference ({ceiling_note}).</p>
         </div>
     """, unsafe_allow_html=True)
 
-    st.subheader("The 6 Pillars of Your Routine")
+    if kit_plan['empty_slots']:
+        st.info(f"No {', '.join(kit_plan['empty_slots'])} fits alongside the rest of your kit within this budget. A higher budget tier would complete all {len(kit) + len(kit_plan['empty_slots'])} pillars.")
+
+    st.subheader(f"The {len(kit)} Pillars of Your Routine")
     
     # Display the kit in two columns
     cols = st.columns(2)
@@ -1227,50 +1084,61 @@ def personalized_kit_page():
 
 # --- MARKETPLACE (Feature 5) ---
 
+MARKETPLACE_PAGE_SIZES = [12, 24, 48]
+
 def product_marketplace_page():
-    """Renders a fully searchable and filterable product catalog."""
+    """Renders a fully searchable and filterable product catalog (one page of results at a time)."""
+    from skinova import marketplace_result_rows
+    catalog = get_catalog()
+
     st.title("🛍️ Product Marketplace: Shop by Science")
     st.markdown("### Browse highly-rated products vetted by SkinovaAI ingredient science.")
 
     # Filtering/Searching UI
     col1, col2, col3 = st.columns(3)
-    search_query = col1.text_input("Search by Name or Ingredient", "")
-    category_filter = col2.selectbox("Filter by Category", ['All'] + list(PRODUCT_DF['category'].unique()))
+    search_query = col1.text_input("Search by Name, Ingredient or Concern", "")
+    category_filter = col2.selectbox("Filter by Category", ['All'] + catalog.index.vocabulary('category'))
     concern_filter = col3.selectbox("Filter by Primary Concern", ['All'] + ['Acne', 'Aging', 'Dryness', 'Sensitive', 'Pigmentation'])
     
-    df = PRODUCT_DF.copy()
-    
-    # Apply Filters
-    if search_query:
-        df = df[df['name'].str.contains(search_query, case=False, na=False) | 
-                df['active_ing'].apply(lambda x: search_query.lower() in ' '.join(x).lower())]
-    
-    if category_filter != 'All':
-        df = df[df['category'] == category_filter]
-        
-    if concern_filter != 'All':
-        df = df[df['concern_match'].apply(lambda x: concern_filter in x)]
-
-    st.subheader(f"Found {len(df)} Matching Products")
+    col4, col5 = st.columns([3, 1])
+    sort_by = col4.selectbox("Sort By", ['Relevance', 'Rating (High to Low)', 'Price (Low to High)', 'Name (A-Z)'])
+    page_size = col5.selectbox("Products per Page", MARKETPLACE_PAGE_SIZES)
+
+    # Filter + sort only when the query changes; page navigation reuses the sorted row index
+    results_key = (catalog.version, search_query, category_filter, concern_filter, sort_by)
+    cached = st.session_state.get('marketplace_results')
+    if cached is None or cached['key'] != results_key:
+        METRICS.increment('marketplace.results.miss')
+        with METRICS.span('marketplace.filter'):
+            cached = {'key': results_key, 'rows': marketplace_result_rows(catalog, search_query, category_filter, concern_filter, sort_by)}
+        st.session_state['marketplace_results'] = cached
+        st.session_state['marketplace_cursor'] = 0
+    else:
+        METRICS.increment('marketplace.results.hit')
+    rows = cached['rows']
 
-    # Sort Products
-    sort_by = st.selectbox("Sort By", ['Rating (High to Low)', 'Price (Low to High)', 'Name (A-Z)'])
-    if sort_by == 'Rating (High to Low)':
-        df = df.sort_values(by='rating', ascending=False)
-    elif sort_by == 'Price (Low to High)':
-        df = df.sort_values(by='price', ascending=True)
-    elif sort_by == 'Name (A-Z)':
-        df = df.sort_values(by='name', ascending=True)
+    st.subheader(f"Found {len(rows)} Matching Products")
 
     # Display Results
-    if df.empty:
+    if len(rows) == 0:
         st.warning("No products match your current filters.")
         return
 
+    page_count = (len(rows) + page_size - 1) // page_size
+    cursor = min(st.session_state.get('marketplace_cursor', 0), len(rows) - 1)
+    page = cursor // page_size
+
+    nav_prev, nav_info, nav_next = st.columns([1, 2, 1])
+    # The callbacks move the cursor before the rerun, so `disabled` already reflects the new page
+    nav_prev.button("⬅️ Previous", disabled=page == 0, key="market_prev", on_click=shift_cursor, args=('marketplace_cursor', -page_size))
+    nav_next.button("Next ➡️", disabled=page >= page_count - 1, key="market_next", on_click=shift_cursor, args=('marketplace_cursor', page_size))
+    st.session_state['marketplace_cursor'] = page * page_size
+    nav_info.markdown(f"<p style='text-align: center; color: {NEUTRAL_GREY};'>Page {page + 1} of {page_count}</p>", unsafe_allow_html=True)
+
     cols = st.columns(2)
-    for i, row in df.iterrows():
+    for i, row in enumerate(rows[page * page_size:(page + 1) * page_size]):
         with cols[i % 2]:
-            render_product_card(row.to_dict())
+            render_product_card(catalog.record(row))
 
 
 # --- SKINCARE ACADEMY (Feature 6) ---
@@ -1314,10 +1182,23 @@ def community_forum_page():
     st.markdown("### Connect with other users, ask questions, and share your journey.")
 
     tab1, tab2 = st.tabs(["Hot Topics", "Start New Thread"])
+    forum = get_forum_store()
     
     with tab1:
         st.subheader("Active Threads")
-        for thread in sorted(FORUM_THREADS, key=lambda x: x['views'], reverse=True):
+        col1, col2 = st.columns([3, 1])
+        order = col1.radio("Order By", list(FORUM_ORDER_LABELS), horizontal=True, key="forum_order")
+        page_size = col2.selectbox("Threads per Page", FORUM_PAGE_SIZES, key="forum_page_size")
+
+        page_count = max((len(forum) + page_size - 1) // page_size, 1)
+        page = min(st.session_state.get('forum_cursor', 0), len(forum) - 1) // page_size if len(forum) else 0
+        nav_prev, nav_info, nav_next = st.columns([1, 2, 1])
+        nav_prev.button("⬅️ Previous", disabled=page == 0, key="forum_prev", on_click=shift_cursor, args=('forum_cursor', -page_size))
+        nav_next.button("Next ➡️", disabled=page >= page_count - 1, key="forum_next", on_click=shift_cursor, args=('forum_cursor', page_size))
+        st.session_state['forum_cursor'] = page * page_size
+        nav_info.markdown(f"<p style='text-align: center; color: {NEUTRAL_GREY};'>Page {page + 1} of {page_count}</p>", unsafe_allow_html=True)
+
+        for thread in forum.page(FORUM_ORDER_LABELS[order], page * page_size, page_size):
             st.markdown(f"""
                 <div class="skinova-card" style="padding: 15px;">
                     <h3 style="margin-top: 0; color: {DARK_ACCENT}; font-size: 1.2em;">{thread['title']}</h3>
@@ -1328,6 +1209,10 @@ def community_forum_page():
                     <p style="font-size: 0.8em; margin: 0;">Tags: {' '.join([f'<span style="background-color: #E0F7FA; padding: 2px 5px; border-radius: 5px; color: {DARK_ACCENT};">{tag}</span>' for tag in thread['tags']])}</p>
                 </div>
             """, unsafe_allow_html=True)
+            if st.button("Read Thread", key=f"forum_read_{thread['id']}"):
+                forum.record_view(thread['id'])
+                if thread['content']:
+                    st.info(thread['content'])
             
     with tab2:
         st.subheader("Create a New Discussion")
@@ -1338,16 +1223,7 @@ def community_forum_page():
             submit_thread = st.form_submit_button("Publish Thread")
             
             if submit_thread and thread_title and thread_content:
-                new_id = len(FORUM_THREADS) + 1
-                FORUM_THREADS.append({
-                    "id": new_id,
-                    "title": thread_title,
-                    "user": st.session_state.current_user.capitalize(),
-                    "date": date.today().isoformat(),
-                    "replies": 0,
-                    "tags": thread_tags,
-                    "views": 1
-                })
+                forum.post(thread_title, st.session_state.current_user.capitalize(), thread_content, thread_tags[:3])
                 st.success("Thread published successfully! Check 'Hot Topics'.")
 
 
@@ -1393,7 +1269,7 @@ def consult_expert_page():
         
         if st.button("Confirm Booking (Simulated)", type="primary"):
             if expert_name and consult_concern:
-                st.session_state.user_db[st.session_state.current_user]['consultation_history'].append({
+                get_user_store().append_history(st.session_state.current_user, 'consultation_history', {
                     "expert": expert_name,
                     "date": date_book.isoformat(),
                     "time": time_slot,
@@ -1406,7 +1282,7 @@ def consult_expert_page():
 
     with tab2:
         st.subheader("My Consultation History")
-        history = st.session_state.user_db[st.session_state.current_user]['consultation_history']
+        history = get_user_store().get_user(st.session_state.current_user)['consultation_history']
         if not history:
             st.info("You have no past or upcoming consultations.")
             return
@@ -1424,6 +1300,55 @@ def consult_expert_page():
             """, unsafe_allow_html=True)
 
 
+# --- INSTRUMENTATION (Metrics Endpoint & Admin Panel) ---
+
+# Sidecar endpoint (GET /metrics, /metrics.json on localhost), opt-in: set SKINOVA_METRICS_PORT
+# (e.g. 9464) on the one process that should serve it; unset means no sidecar
+METRICS_PORT = os.environ.get('SKINOVA_METRICS_PORT', '')
+# Users who see the performance panel in the sidebar (comma-separated usernames)
+METRICS_ADMIN_USERS = {name.strip() for name in os.environ.get('SKINOVA_ADMIN_USERS', '').split(',') if name.strip()}
+
+@st.cache_resource
+def get_metrics_server():
+    """Process-wide metrics sidecar thread, or None unless SKINOVA_METRICS_PORT is set (or its port is taken)."""
+    if not METRICS.enabled or METRICS_PORT.lower() in ('', 'off'):
+        return None
+    from skinova import MetricsServer
+    try:
+        return MetricsServer(METRICS, port=int(METRICS_PORT)).start()
+    except OSError:
+        return None # Metrics must never take the app down; the panel shows no endpoint
+
+def widgets_this_run():
+    """
+    Widgets registered so far in this script run, or None when unknown. Streamlit has no
+    public API for this: it reads the script run context's widget id set, so a release
+    that renames it only makes the gauge go missing. Called only while the sidecar is on.
+    """
+    from streamlit.runtime.scriptrunner import get_script_run_ctx
+    ctx = get_script_run_ctx()
+    widget_ids = getattr(getattr(ctx, 'shared', ctx), 'widget_ids_this_run', None)
+    if widget_ids is None:
+        return None
+    try:
+        return len(widget_ids.snapshot() if hasattr(widget_ids, 'snapshot') else widget_ids)
+    except TypeError:
+        return None
+
+def render_metrics_panel():
+    """Admin sidebar panel: p50/p95 per page and engine call, plus rerun count and endpoint."""
+    snapshot = METRICS.snapshot()
+    with st.expander("📈 Performance"):
+        rows = ["| Span | Calls | p50 ms | p95 ms |", "|---|---|---|---|"]
+        rows.extend(f"| {name} | {entry['count']} | {entry['p50_ms']:.1f} | {entry['p95_ms']:.1f} |"
+                    for name, entry in snapshot['spans'].items())
+        st.markdown("\n".join(rows))
+        st.caption(f"Reruns: {snapshot['counters'].get('reruns', 0)}")
+        server = get_metrics_server()
+        if server is not None:
+            host, port = server.address[:2]
+            st.caption(f"Endpoint: http://{host}:{port}/metrics")
+
 # --- 6. MAIN APPLICATION FLOW ---
 
 def logout():
@@ -1432,15 +1357,33 @@ def logout():
     st.session_state['current_user'] = 'guest_user'
     st.session_state['current_page'] = 'Login/Signup'
     st.session_state['current_routine_completed'] = False
+    st.session_state.pop('daily_checklist', None)
     # Clear all temporary component states (checkboxes, forms)
     for key in list(st.session_state.keys()):
         if key.startswith('chk_') or key.startswith('form_'):
             del st.session_state[key]
     st.success("Successfully logged out.")
-    st.experimental_rerun()
+    rerun_app()
+
+PAGE_RENDERERS = {
+    'Login/Signup': login_page,
+    'Onboarding': onboarding_page,
+    'Dashboard': dashboard_page,
+    'My Routine': my_routine_page,
+    'Skin Analyzer': skin_analyzer_page,
+    'Personalized Kit': personalized_kit_page,
+    'Product Marketplace': product_marketplace_page,
+    'Skincare Academy': skincare_academy_page,
+    'Community Forum': community_forum_page,
+    'Consult an Expert': consult_expert_page,
+}
 
 def main_app():
     """The main router and sidebar handler."""
+    METRICS.increment('reruns')
+    get_metrics_server()
+    current_user_record = get_user_store().get_user(st.session_state.current_user, with_history=False) or {}
+    onboarding_complete = current_user_record.get('onboarding_complete', False)
     
     # 1. Sidebar Navigation
     with st.sidebar:
@@ -1448,7 +1391,7 @@ def main_app():
         
         st.markdown("---")
         
-        if st.session_state.logged_in and st.session_state.user_db[st.session_state.current_user]['onboarding_complete']:
+        if st.session_state.logged_in and onboarding_complete:
             st.subheader(f"Welcome, {st.session_state.current_user.capitalize()}!")
             
             pages = {
@@ -1478,8 +1421,10 @@ def main_app():
             st.markdown("---")
             if st.button("🚪 Logout & Reset Session", help="Log out of the application"):
                 logout()
+            if st.session_state.current_user in METRICS_ADMIN_USERS:
+                render_metrics_panel()
                 
-        elif st.session_state.logged_in and not st.session_state.user_db[st.session_state.current_user]['onboarding_complete']:
+        elif st.session_state.logged_in and not onboarding_complete:
             st.warning("Please complete onboarding to access the platform.")
             navigate_to('Onboarding')
         else:
@@ -1489,36 +1434,24 @@ def main_app():
 
 
     # 2. Main Content Display (Router Logic)
-    if st.session_state.logged_in and not st.session_state.user_db[st.session_state.current_user]['onboarding_complete']:
-        onboarding_page() # Force redirect to onboarding
-        
+    if st.session_state.logged_in and not onboarding_complete:
+        page = 'Onboarding' # Force redirect to onboarding
     elif st.session_state.current_page == 'Login/Signup' or not st.session_state.logged_in:
-        login_page()
-    
-    elif st.session_state.current_page == 'Onboarding':
-        onboarding_page()
-        
-    # --- Feature Pages ---
-    elif st.session_state.current_page == 'Dashboard':
-        dashboard_page()
-    elif st.session_state.current_page == 'My Routine':
-        my_routine_page()
-    elif st.session_state.current_page == 'Skin Analyzer':
-        skin_analyzer_page()
-    elif st.session_state.current_page == 'Personalized Kit':
-        personalized_kit_page()
-    elif st.session_state.current_page == 'Product Marketplace':
-        product_marketplace_page()
-    elif st.session_state.current_page == 'Skincare Academy':
-        skincare_academy_page()
-    elif st.session_state.current_page == 'Community Forum':
-        community_forum_page()
-    elif st.session_state.current_page == 'Consult an Expert':
-        consult_expert_page()
+        page = 'Login/Signup'
+    elif st.session_state.current_page in PAGE_RENDERERS:
+        page = st.session_state.current_page
     else:
         # Default to dashboard if current_page is somehow invalid
         navigate_to('Dashboard')
-        dashboard_page()
+        page = 'Dashboard'
+
+    with METRICS.span(f"page:{page}"):
+        PAGE_RENDERERS[page]()
+    # Per-page widget gauge, only for the opt-in sidecar (it relies on Streamlit internals)
+    if get_metrics_server() is not None:
+        widgets = widgets_this_run()
+        if widgets is not None:
+            METRICS.set_gauge(f"widgets:{page}", widgets)
 
 if __name__ == '__main__':
     main_app()
@@ -0,0 +1,185 @@
+"""
+SkinovaAI Offline Routine Regeneration
+
+Streams user profiles from a CSV or JSONL file and regenerates the routine,
+ingredient conflicts and personalized kit for every profile on a process pool.
+Workers only import the headless skinova engine (no Streamlit), load the
+catalog file once in their initializer and write their own output chunks, so
+only small stats travel back.
+
+    python batch_regenerate.py profiles.jsonl --out regenerated/ --workers 8
+
+CSV list columns (primary_concerns, current_product_ids) are ';'-separated.
+"""
+import argparse
+import csv
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+
+from skinova import DEFAULT_CATALOG_PATH, RoutineCache, json_default, load_catalog
+from skinova import engine
+
+PROFILE_FIELDS = ('skin_type', 'primary_concerns', 'climate', 'budget', 'skin_sensitivity', 'fitzpatrick_type', 'age_group')
+STAGES = ('routine', 'kit', 'write')
+
+# Per-worker state, set up once by the pool initializer
+_catalog = None
+_routine_cache = None
+
+
+def _init_worker(catalog_path):
+    """Pool initializer: loads the catalog file once per worker process."""
+    global _catalog, _routine_cache
+    _catalog = load_catalog(catalog_path)
+    _routine_cache = RoutineCache()
+
+
+# --- INPUT ---
+
+def _split_list(value):
+    if isinstance(value, list):
+        return value
+    return [item.strip() for item in (value or '').split(';') if item.strip()]
+
+
+def normalize_profile(record, line_no):
+    """Raw CSV/JSONL record -> (user_id, profile, current_product_ids)."""
+    user_id = record.get('user_id') or record.get('username') or f"line-{line_no}"
+    profile = {field: record[field] for field in PROFILE_FIELDS if record.get(field) not in (None, '')}
+    profile['primary_concerns'] = _split_list(record.get('primary_concerns'))
+    current_product_ids = [int(pid) for pid in _split_list(record.get('current_product_ids'))]
+    return user_id, profile, current_product_ids
+
+
+def iter_profiles(path):
+    """Streams normalized profiles from a .csv or .jsonl file without loading it whole."""
+    with open(path, newline='', encoding='utf-8') as handle:
+        if path.endswith('.csv'):
+            for line_no, record in enumerate(csv.DictReader(handle), start=1):
+                yield normalize_profile(record, line_no)
+        else:
+            for line_no, line in enumerate(handle, start=1):
+                if line.strip():
+                    yield normalize_profile(json.loads(line), line_no)
+
+
+def iter_chunks(profiles, chunk_size):
+    chunk = []
+    for profile in profiles:
+        chunk.append(profile)
+        if len(chunk) >= chunk_size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+# --- WORKER ---
+
+def regenerate_chunk(chunk_id, chunk, out_dir, output_format):
+    """Regenerates one chunk of profiles and writes it to its own output file. Returns stats."""
+    timings = dict.fromkeys(STAGES, 0.0)
+    records, errors = [], 0
+
+    for user_id, profile, current_product_ids in chunk:
+        try:
+            started = time.perf_counter()
+            routine, conflicts = engine.generate_hyper_routine(profile, current_product_ids, _catalog, _routine_cache)
+            routine_done = time.perf_counter()
+            kit = engine.generate_personalized_kit(profile, routine, _catalog)
+            timings['routine'] += routine_done - started
+            timings['kit'] += time.perf_counter() - routine_done
+            records.append({'user_id': user_id, 'routine': routine, 'conflicts': conflicts, 'kit': kit})
+        except Exception as exc:
+            errors += 1
+            records.append({'user_id': user_id, 'error': f"{type(exc).__name__}: {exc}"})
+
+    started = time.perf_counter()
+    path = os.path.join(out_dir, f"routines-{chunk_id:05d}.{output_format}")
+    if output_format == 'parquet':
+        import pandas as pd
+        pd.DataFrame([
+            {'user_id': r['user_id'], **{k: json.dumps(r.get(k), default=json_default) for k in ('routine', 'conflicts', 'kit', 'error')}}
+            for r in records
+        ]).to_parquet(path, index=False)
+    else:
+        with open(path, 'w', encoding='utf-8') as handle:
+            for record in records:
+                handle.write(json.dumps(record, default=json_default) + '\n')
+    timings['write'] += time.perf_counter() - started
+
+    return {'profiles': len(chunk), 'errors': errors, 'timings': timings, 'pid': os.getpid(), 'cache': _routine_cache.stats()}
+
+
+# --- DRIVER ---
+
+def run(input_path, out_dir, workers=None, chunk_size=2000, output_format='jsonl', catalog_path=DEFAULT_CATALOG_PATH):
+    """Regenerates every profile in input_path into out_dir and returns the run report."""
+    os.makedirs(out_dir, exist_ok=True)
+    workers = workers or os.cpu_count() or 1
+    catalog = load_catalog(catalog_path) # validates the file up front and fixes the reported version
+
+    report = {'profiles': 0, 'errors': 0, 'chunks': 0, 'workers': workers, 'catalog_version': catalog.version,
+              'stage_seconds': dict.fromkeys(('read',) + STAGES, 0.0), 'cache_hits': 0, 'cache_misses': 0}
+    worker_caches = {}
+    started = time.perf_counter()
+
+    def collect(future):
+        stats = future.result()
+        report['profiles'] += stats['profiles']
+        report['errors'] += stats['errors']
+        report['chunks'] += 1
+        for stage, seconds in stats['timings'].items():
+            report['stage_seconds'][stage] += seconds
+        # Worker cache counters are cumulative, so keep only the latest reading per worker process
+        previous = worker_caches.get(stats['pid'])
+        if previous is None or stats['cache']['hits'] + stats['cache']['misses'] >= previous['hits'] + previous['misses']:
+            worker_caches[stats['pid']] = stats['cache']
+
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(catalog_path,)) as pool:
+        in_flight = set()
+        chunks = iter_chunks(iter_profiles(input_path), chunk_size)
+        for chunk_id in range(sys.maxsize):
+            read_started = time.perf_counter()
+            chunk = next(chunks, None)
+            report['stage_seconds']['read'] += time.perf_counter() - read_started
+            if chunk is None:
+                break
+            # Bounded submission keeps memory flat regardless of input size
+            if len(in_flight) >= workers * 2:
+                done, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+                for future in done:
+                    collect(future)
+            in_flight.add(pool.submit(regenerate_chunk, chunk_id, chunk, out_dir, output_format))
+        for future in in_flight:
+            collect(future)
+
+    for cache in worker_caches.values():
+        report['cache_hits'] += cache['hits']
+        report['cache_misses'] += cache['misses']
+    report['wall_seconds'] = round(time.perf_counter() - started, 3)
+    report['profiles_per_second'] = round(report['profiles'] / report['wall_seconds'], 1) if report['wall_seconds'] else 0.0
+    report['stage_seconds'] = {stage: round(seconds, 3) for stage, seconds in report['stage_seconds'].items()}
+    return report
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Regenerate routines, conflicts and kits for every profile in a CSV/JSONL file.")
+    parser.add_argument('input', help="Profiles file (.csv or .jsonl)")
+    parser.add_argument('--out', required=True, help="Output directory for the chunk files")
+    parser.add_argument('--workers', type=int, default=None, help="Worker processes (default: CPU count)")
+    parser.add_argument('--chunk-size', type=int, default=2000, help="Profiles per output chunk")
+    parser.add_argument('--catalog', default=DEFAULT_CATALOG_PATH, help="Product catalog file (.jsonl, .csv or .parquet)")
+    parser.add_argument('--format', choices=('jsonl', 'parquet'), default='jsonl', help="Output chunk format")
+    args = parser.parse_args(argv)
+
+    report = run(args.input, args.out, workers=args.workers, chunk_size=args.chunk_size, output_format=args.format, catalog_path=args.catalog)
+    print(json.dumps(report, indent=2))
+    return 1 if report['errors'] else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,319 @@
+"""
+SkinovaAI Engine Benchmarks
+
+Times the engine functions (product matching, routine generation, conflict
+checks, skin scoring, kit generation and the marketplace filter/sort path)
+against synthetic catalogs and users with synthetic history, then compares the
+results with a stored baseline so regressions fail loudly.
+
+    python bench_engine.py --out bench-results.json
+    python bench_engine.py --catalog-sizes 50,5000 --history-days 1,30 --update-baseline
+
+Per case it reports latency percentiles (perf_counter), the bytes a call
+allocates and keeps (net) and its transient peak (tracemalloc), plus the
+process peak RSS per catalog scale. The run exits non-zero when a case raises,
+or is slower or hungrier than the baseline (bench_baseline.json) by more than
+--tolerance.
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import resource
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import date, timedelta
+
+import skinova
+from skinova import engine
+
+CATALOG_SIZES = (50, 5_000, 100_000, 1_000_000)
+HISTORY_DAYS = (1, 30, 365, 5 * 365)
+BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'bench_baseline.json')
+
+# Absolute floors below which a relative slowdown is treated as noise
+MIN_REGRESSION_MS = 0.25
+MIN_REGRESSION_BYTES = 64 * 1024
+
+SYNTHETIC_CATEGORIES = ["Cleanser", "Oil Cleanser", "Moisturizer", "Serum", "Active Serum", "Active Night", "Sunscreen", "Exfoliant", "Hydration"]
+SYNTHETIC_TYPES = ["Gel", "Cream", "Oil", "Serum", "Liquid", "Balm"]
+SYNTHETIC_CONCERNS = ["Acne", "Aging", "Dryness", "Sensitive", "Pigmentation", "Redness", "Texture", "Dullness", "All"]
+
+BENCH_PROFILES = [
+    {'skin_type': 'Oily', 'primary_concerns': ['Acne'], 'climate': 'Hot/Humid', 'budget': 'Low', 'skin_sensitivity': 'Low'},
+    {'skin_type': 'Dry', 'primary_concerns': ['Aging', 'Pigmentation'], 'climate': 'Cold/Dry', 'budget': 'High', 'skin_sensitivity': 'Low'},
+    {'skin_type': 'Combination', 'primary_concerns': ['Acne', 'Pigmentation'], 'climate': 'Temperate', 'budget': 'Mid', 'skin_sensitivity': 'Medium'},
+    {'skin_type': 'Sensitive', 'primary_concerns': ['Rosacea'], 'climate': 'Temperate', 'budget': 'Mid', 'skin_sensitivity': 'High'},
+    {'skin_type': 'Normal', 'primary_concerns': ['Texture', 'Aging'], 'climate': 'Hot/Humid', 'budget': 'High', 'skin_sensitivity': 'Low'},
+    {'skin_type': 'Oily', 'primary_concerns': ['Aging', 'Acne', 'Texture'], 'climate': 'Cold/Dry', 'budget': 'Low', 'skin_sensitivity': 'High'},
+]
+
+MARKETPLACE_QUERIES = [
+    ('', 'All', 'All', 'Rating (High to Low)'),
+    ('', 'Serum', 'All', 'Price (Low to High)'),
+    ('acid', 'All', 'Acne', 'Rating (High to Low)'),
+    ('Retinol', 'Active Night', 'All', 'Name (A-Z)'),
+    ('cream', 'Moisturizer', 'Dryness', 'Price (Low to High)'),
+    ('', 'All', 'Pigmentation', 'Name (A-Z)'),
+]
+
+
+
+# --- SYNTHETIC DATA ---
+
+def synthetic_catalog(n_products, seed=0):
+    """Catalog DataFrame with the products.jsonl schema and a realistic spread of categories/ingredients."""
+    import numpy as np
+    import pandas as pd
+    rng = np.random.default_rng(seed)
+    ingredients = sorted(set(skinova.ACTIVE_INGREDIENT_PROFILES) | set(skinova.load_catalog(skinova.DEFAULT_CATALOG_PATH).lists['active_ing'].vocabulary))
+    ing_counts = rng.integers(1, 4, n_products)
+    ing_picks = rng.integers(0, len(ingredients), (n_products, 3))
+    concern_counts = rng.integers(1, 3, n_products)
+    concern_picks = rng.integers(0, len(SYNTHETIC_CONCERNS), (n_products, 2))
+    return pd.DataFrame({
+        'id': np.arange(1001, 1001 + n_products),
+        'name': [f"Synthetic {SYNTHETIC_TYPES[i % len(SYNTHETIC_TYPES)]} {i}" for i in range(n_products)],
+        'category': np.array(SYNTHETIC_CATEGORIES, dtype=object)[rng.integers(0, len(SYNTHETIC_CATEGORIES), n_products)],
+        'active_ing': [list(dict.fromkeys(ingredients[j] for j in picks[:count])) for picks, count in zip(ing_picks.tolist(), ing_counts.tolist())],
+        'concern_match': [list(dict.fromkeys(SYNTHETIC_CONCERNS[j] for j in picks[:count])) for picks, count in zip(concern_picks.tolist(), concern_counts.tolist())],
+        'budget': np.array(['Low', 'Mid', 'High'], dtype=object)[rng.integers(0, 3, n_products)],
+        'price': rng.integers(500, 6000, n_products),
+        'rating': np.round(rng.uniform(4.0, 5.0, n_products), 1),
+        'volume': [f"{v}ml" for v in rng.integers(30, 200, n_products).tolist()],
+        'type': np.array(SYNTHETIC_TYPES, dtype=object)[rng.integers(0, len(SYNTHETIC_TYPES), n_products)],
+    })
+
+
+def seed_user(store, days, seed=0):
+    """Creates a user with `days` days of daily compliance and score history ending today."""
+    rng = random.Random(seed)
+    username = f"bench-{days}d"
+    today = date.today()
+    score, score_log = 70, []
+    for offset in range(days - 1, -1, -1):
+        day = (today - timedelta(days=offset)).isoformat()
+        delta = rng.randint(-2, 3)
+        score = max(40, min(98, score + delta))
+        score_log.append({'date': day, 'score': score, 'delta': f"{'+' if delta >= 0 else '-'}{abs(delta)}"})
+    if not store.create_user(username, 'bench', skin_score=score, score_log=score_log):
+        return username
+    profile = dict(BENCH_PROFILES[seed % len(BENCH_PROFILES)], lifestyle={'stress_level': 2, 'sleep_quality': 3})
+    store.update_user(username, profile=profile, onboarding_complete=True, routine_streak=min(days, 30))
+    for offset in range(days - 1, -1, -1):
+        day = (today - timedelta(days=offset)).isoformat()
+        m_done, e_done = rng.random() < 0.9, rng.random() < 0.8
+        store.append_history(username, 'compliance_log', {'date': day, 'activity': 'Routine Check-in', 'm_done': m_done, 'e_done': e_done})
+        if offset < skinova.COMPLIANCE_WINDOW_DAYS:
+            store.record_compliance(username, day, m_done=m_done, e_done=e_done)
+    store.flush()
+    return username
+
+
+# --- MEASUREMENT ---
+
+def _percentile(sorted_values, pct):
+    index = min(len(sorted_values) - 1, max(0, round(pct / 100 * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+def measure(fn, min_iterations=5, max_iterations=500, max_seconds=2.0, memory_samples=3, warmup=2):
+    """
+    Calls fn(i) repeatedly: `warmup` untimed calls, then timed calls until max_iterations
+    or max_seconds (but at least min_iterations), then a few calls under tracemalloc.
+    """
+    for i in range(warmup):
+        fn(i)
+
+    samples = []
+    deadline = time.perf_counter() + max_seconds
+    i = 0
+    while i < max_iterations and (i < min_iterations or time.perf_counter() < deadline):
+        started = time.perf_counter_ns()
+        fn(i)
+        samples.append(time.perf_counter_ns() - started)
+        i += 1
+    samples.sort()
+    ms = lambda ns: round(ns / 1e6, 4)
+
+    net_bytes, peak_bytes = [], []
+    tracemalloc.start()
+    try:
+        for j in range(memory_samples):
+            tracemalloc.reset_peak()
+            before, _ = tracemalloc.get_traced_memory()
+            result = fn(j)
+            after, peak = tracemalloc.get_traced_memory()
+            del result
+            net_bytes.append(after - before)
+            peak_bytes.append(peak - before)
+    finally:
+        tracemalloc.stop()
+
+    return {
+        'iterations': len(samples),
+        'mean_ms': ms(sum(samples) / len(samples)),
+        'p50_ms': ms(_percentile(samples, 50)),
+        'p90_ms': ms(_percentile(samples, 90)),
+        'p99_ms': ms(_percentile(samples, 99)),
+        'max_ms': ms(samples[-1]),
+        'net_alloc_bytes': max(net_bytes),
+        'peak_alloc_bytes': max(peak_bytes),
+    }
+
+
+def run_case(results, name, fn, scale, **measure_args):
+    key = f"{name}[{scale}]"
+    try:
+        results[key] = measure(fn, **measure_args)
+    except Exception as exc:
+        results[key] = {'error': f"{type(exc).__name__}: {exc}"}
+    summary = results[key]
+    line = summary.get('error') or f"p50 {summary['p50_ms']:.3f} ms  p99 {summary['p99_ms']:.3f} ms  peak {summary['peak_alloc_bytes'] / 1024:.0f} KiB"
+    print(f"  {key:<48} {line}", file=sys.stderr)
+
+
+# --- SUITES ---
+
+def bench_catalog(results, n_products, measure_args):
+    """Catalog-bound engine paths at one catalog size."""
+    product_df = synthetic_catalog(n_products)
+    started = time.perf_counter()
+    catalog = skinova.Catalog(product_df)
+    results[f"build_catalog[{n_products}]"] = {'seconds': round(time.perf_counter() - started, 3)}
+    print(f"catalog {n_products}: built in {results[f'build_catalog[{n_products}]']['seconds']} s", file=sys.stderr)
+
+    cache = skinova.RoutineCache()
+    scale = f"products={n_products}"
+    current_ids = [1001, 1002] if n_products > 1 else []
+    steps = [
+        ('Acne', 'Salicylic Acid', 'Low', 'Exfoliant'),
+        ('Aging', 'Retinol', 'High', 'Active Night'),
+        ('Pigmentation', 'L-Ascorbic Acid', 'Mid', 'Active Serum'),
+        ('Dryness', 'Ceramides', 'Mid', 'Moisturizer'),
+        ('Sensitive', 'Zinc Oxide', 'Mid', 'Sunscreen'),
+    ]
+    routines = [engine.build_hyper_routine(profile, current_ids, catalog)[0] for profile in BENCH_PROFILES]
+
+    run_case(results, 'get_product_for_routine_step', lambda i: engine.get_product_for_routine_step(*steps[i % len(steps)], current_ids, catalog), scale, **measure_args)
+    run_case(results, 'build_hyper_routine', lambda i: engine.build_hyper_routine(BENCH_PROFILES[i % len(BENCH_PROFILES)], current_ids, catalog), scale, **measure_args)
+    run_case(results, 'generate_hyper_routine', lambda i: engine.generate_hyper_routine(BENCH_PROFILES[i % len(BENCH_PROFILES)], current_ids, catalog, cache), scale, **measure_args)
+    run_case(results, 'check_ingredient_conflict', lambda i: skinova.check_ingredient_conflict(routines[i % len(routines)]), scale, **measure_args)
+    run_case(results, 'generate_personalized_kit', lambda i: engine.generate_personalized_kit(BENCH_PROFILES[i % len(BENCH_PROFILES)], routines[i % len(routines)], catalog), scale, **measure_args)
+    # The search index is built lazily on the first text query: time that build on its own and
+    # warm up over every query, so the marketplace percentiles measure queries only
+    started = time.perf_counter()
+    catalog.search_index
+    results[f"build_search_index[{n_products}]"] = {'seconds': round(time.perf_counter() - started, 3)}
+    run_case(results, 'marketplace_result_rows', lambda i: skinova.marketplace_result_rows(catalog, *MARKETPLACE_QUERIES[i % len(MARKETPLACE_QUERIES)]), scale,
+             **measure_args, warmup=len(MARKETPLACE_QUERIES))
+
+    results[f"max_rss_mib[{n_products}]"] = {'mib': round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1)}
+
+
+def score_user(store, username, profile):
+    """What a dashboard score refresh costs: load the user, then score it."""
+    user = store.get_user(username)
+    return engine.calculate_skin_score(profile, user['history']['score_log'], user['compliance'], user['routine_streak'])
+
+
+def bench_history(results, store, days, measure_args):
+    """User-history-bound engine paths for one history length."""
+    username = seed_user(store, days)
+    profile = store.get_user(username, with_history=False)['profile']
+    scale = f"history={days}d"
+    print(f"history {days}d: seeded {username}", file=sys.stderr)
+
+    run_case(results, 'UserStore.get_user', lambda i: store.get_user(username), scale, **measure_args)
+    run_case(results, 'calculate_skin_score', lambda i: score_user(store, username, profile), scale, **measure_args)
+
+
+# --- BASELINE ---
+
+def compare(results, baseline, tolerance):
+    """
+    Lists every case that is slower (p50) or allocates more (peak) than the baseline allows,
+    and every baseline case missing from this run (a dropped or renamed case is not a pass).
+    """
+    regressions = []
+    for key, base in baseline.get('results', {}).items():
+        if 'p50_ms' not in base:
+            continue
+        current = results.get(key)
+        if current is None:
+            regressions.append(f"{key}: missing from this run (not measured; rename the case or update the baseline)")
+            continue
+        if 'error' in current:
+            regressions.append(f"{key}: now fails ({current['error']})")
+            continue
+        if current['p50_ms'] > base['p50_ms'] * (1 + tolerance) and current['p50_ms'] - base['p50_ms'] > MIN_REGRESSION_MS:
+            regressions.append(f"{key}: p50 {base['p50_ms']:.3f} -> {current['p50_ms']:.3f} ms")
+        if current['peak_alloc_bytes'] > base['peak_alloc_bytes'] * (1 + tolerance) and current['peak_alloc_bytes'] - base['peak_alloc_bytes'] > MIN_REGRESSION_BYTES:
+            regressions.append(f"{key}: peak alloc {base['peak_alloc_bytes']} -> {current['peak_alloc_bytes']} bytes")
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the SkinovaAI engine at several catalog and history scales.")
+    parser.add_argument('--catalog-sizes', default=','.join(map(str, CATALOG_SIZES)), help="Comma-separated synthetic catalog sizes")
+    parser.add_argument('--history-days', default=','.join(map(str, HISTORY_DAYS)), help="Comma-separated user history lengths (days)")
+    parser.add_argument('--max-seconds', type=float, default=2.0, help="Timing budget per case")
+    parser.add_argument('--max-iterations', type=int, default=500, help="Timed calls per case (upper bound)")
+    parser.add_argument('--out', default='bench-results.json', help="Where to write the results JSON")
+    parser.add_argument('--baseline', default=BASELINE_PATH, help="Baseline results to compare against")
+    parser.add_argument('--tolerance', type=float, default=0.25, help="Allowed relative slowdown before a case counts as a regression")
+    parser.add_argument('--update-baseline', action='store_true', help="Overwrite the baseline with this run")
+    args = parser.parse_args(argv)
+
+    measure_args = {'max_seconds': args.max_seconds, 'max_iterations': args.max_iterations}
+    results = {}
+    with tempfile.TemporaryDirectory(prefix='skinova-bench-') as tmp:
+        store = skinova.UserStore(os.path.join(tmp, 'bench_users.db'))
+        for n_products in map(int, args.catalog_sizes.split(',')):
+            bench_catalog(results, n_products, measure_args)
+        for days in map(int, args.history_days.split(',')):
+            bench_history(results, store, days, measure_args)
+        store.flush()
+
+    report = {
+        'created': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'machine': {'python': platform.python_version(), 'platform': platform.platform(), 'cpus': os.cpu_count()},
+        'results': results,
+    }
+    with open(args.out, 'w', encoding='utf-8') as handle:
+        json.dump(report, handle, indent=2)
+    print(f"results written to {args.out}", file=sys.stderr)
+
+    # A case that raised fails the run on its own, baseline or not (and is never recorded as one)
+    failures = [f"{key}: {summary['error']}" for key, summary in results.items() if 'error' in summary]
+    if failures:
+        print(f"\nFAILED CASES ({len(failures)}):", file=sys.stderr)
+        for line in failures:
+            print(f"  {line}", file=sys.stderr)
+        return 1
+
+    if args.update_baseline:
+        with open(args.baseline, 'w', encoding='utf-8') as handle:
+            json.dump(report, handle, indent=2)
+        print(f"baseline updated: {args.baseline}", file=sys.stderr)
+        return 0
+
+    if not os.path.exists(args.baseline):
+        print(f"no baseline at {args.baseline}; run with --update-baseline to record one", file=sys.stderr)
+        return 0
+    with open(args.baseline, encoding='utf-8') as handle:
+        regressions = compare(results, json.load(handle), args.tolerance)
+    if regressions:
+        print(f"\nPERFORMANCE REGRESSIONS ({len(regressions)}) vs {args.baseline}:", file=sys.stderr)
+        for line in regressions:
+            print(f"  {line}", file=sys.stderr)
+        return 1
+    print(f"no regressions vs {args.baseline} (tolerance {args.tolerance:.0%})", file=sys.stderr)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
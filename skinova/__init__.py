@@ -0,0 +1,65 @@
+"""
+SkinovaAI headless engine.
+
+Routine generation, conflict checks, product matching, skin scoring, the user
+store and the forum thread store, usable from the Streamlit app, worker processes,
+batch jobs and tests.
+Nothing here imports Streamlit or matplotlib, and PIL only once a photo is analyzed.
+Names are resolved lazily, so `import skinova` is cheap and each submodule is only
+loaded on first use.
+"""
+import importlib
+
+_EXPORTS = {
+    # store (standard library only)
+    'UserStore': 'store', 'HistoryLog': 'store', 'ComplianceCounter': 'store',
+    'COMPLIANCE_WINDOW_DAYS': 'store', 'HISTORY_RETENTION_DAYS': 'store', 'HISTORY_WINDOW_DAYS': 'store',
+    'json_default': 'store', 'hash_password': 'store', 'verify_password': 'store',
+    # daily checklist (session state, standard library only)
+    'DailyChecklist': 'checklist',
+    # forum (standard library only)
+    'ThreadStore': 'forum', 'FORUM_ORDERS': 'forum',
+    # background jobs (standard library only)
+    'JobQueue': 'jobs', 'JobRejected': 'jobs', 'JOB_STATES': 'jobs',
+    # materialized per-user views (standard library only)
+    'ViewMaterializer': 'views', 'DerivedViews': 'views',
+    # metrics (standard library only)
+    'Metrics': 'metrics', 'MetricsServer': 'metrics', 'METRICS': 'metrics', 'DEFAULT_METRICS_PORT': 'metrics',
+    # reference data
+    'ACTIVE_INGREDIENT_PROFILES': 'data', 'DEFAULT_CATALOG_PATH': 'data',
+    # conflicts
+    'ConflictEngine': 'conflicts', 'CONFLICT_ENGINE': 'conflicts', 'check_ingredient_conflict': 'conflicts',
+    # catalog
+    'Catalog': 'catalog', 'ListColumn': 'catalog', 'load_catalog': 'catalog', 'CatalogIndex': 'catalog', 'ProductMatcher': 'catalog', 'BUDGET_TIER_MAP': 'catalog',
+    'catalog_fingerprint': 'catalog', 'marketplace_result_rows': 'catalog',
+    # score time series
+    'ScoreSeries': 'series', 'ScoreSeriesCache': 'series', 'TREND_WINDOW': 'series', 'PROJECTION_DAYS': 'series',
+    # photo analysis (PIL is imported on first use)
+    'analyze_skin_photo': 'imaging', 'skin_photo_indices': 'imaging', 'load_photo': 'imaging', 'rgb_to_lab': 'imaging',
+    'ANALYSIS_ENGINE_VERSION': 'imaging',
+    # content-addressed result cache (standard library only)
+    'ResultCache': 'resultcache', 'content_key': 'resultcache',
+    # search
+    'SearchIndex': 'search',
+    # kit optimizer
+    'optimize_kit': 'kit', 'budget_ceiling': 'kit', 'BUDGET_CEILINGS': 'kit', 'KIT_SLOTS': 'kit',
+    # engine
+    'RoutineCache': 'engine', 'routine_cache_key': 'engine', 'get_product_for_routine_step': 'engine',
+    'generate_hyper_routine': 'engine', 'build_hyper_routine': 'engine', 'calculate_skin_score': 'engine',
+    'generate_mock_analysis_report': 'engine', 'generate_personalized_kit': 'engine',
+}
+
+__all__ = sorted(_EXPORTS)
+
+
+def __getattr__(name):
+    module = _EXPORTS.get(name)
+    if module is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(f'.{module}', __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
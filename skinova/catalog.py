@@ -0,0 +1,371 @@
+"""
+SkinovaAI product catalog: columnar storage, inverted index, vectorized matcher and
+marketplace filtering (full-text search lives in skinova.search). pandas is only
+imported when a catalog is actually built.
+"""
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+CATEGORICAL_COLUMNS = ('category', 'budget', 'type')
+LIST_COLUMNS = ('active_ing', 'concern_match')
+
+def _frozen(array):
+    """Marks a shared array read-only so no session can mutate the process-wide catalog."""
+    array.flags.writeable = False
+    return array
+
+class CatalogIndex:
+    """
+    Hyper-Logic 1.3 (Engine): Inverted index over the product catalog.
+    Maps every ingredient, concern, category, budget tier and type to a sorted
+    array of row ids so filters combine postings instead of scanning rows.
+    """
+    FIELDS = ('active_ing', 'concern_match', 'category', 'budget', 'type')
+    CONTAINS_CACHE_SIZE = 256
+
+    def __init__(self, catalog):
+        self.num_rows = len(catalog)
+        self.postings_by_field = {}
+        for field in self.FIELDS:
+            rows, codes, vocabulary = catalog.coded(field)
+            # Stable sort keeps row ids ascending inside each posting
+            order = np.argsort(codes, kind='stable')
+            codes, rows = codes[order], rows[order]
+            bounds = np.searchsorted(codes, np.arange(len(vocabulary) + 1))
+            self.postings_by_field[field] = {
+                value: _frozen(np.unique(rows[bounds[i]:bounds[i + 1]])) for i, value in enumerate(vocabulary)
+            }
+        # Shared by every session using the catalog: an LRU guarded by a lock
+        self._contains_cache = OrderedDict()
+        self._contains_lock = threading.Lock()
+
+    def vocabulary(self, field):
+        """All distinct values of a field."""
+        return list(self.postings_by_field[field].keys())
+
+    def postings(self, field, value):
+        """Sorted row ids whose field equals (or, for list fields, contains) value."""
+        return self.postings_by_field[field].get(value, np.empty(0, dtype=np.int64))
+
+    def postings_containing(self, field, token):
+        """Union of postings for every value of field containing token (case-insensitive)."""
+        key = (field, token.lower())
+        with self._contains_lock:
+            rows = self._contains_cache.get(key)
+            if rows is not None:
+                self._contains_cache.move_to_end(key)
+                return rows
+        # Computed outside the lock; a concurrent miss on the same key just builds the same array
+        rows = _frozen(self.union(
+            *(postings for value, postings in self.postings_by_field[field].items() if key[1] in str(value).lower())
+        ))
+        with self._contains_lock:
+            self._contains_cache[key] = rows
+            self._contains_cache.move_to_end(key)
+            while len(self._contains_cache) > self.CONTAINS_CACHE_SIZE:
+                self._contains_cache.popitem(last=False)
+        return rows
+
+    @staticmethod
+    def union(*postings):
+        """Sorted union of posting arrays."""
+        if not postings:
+            return np.empty(0, dtype=np.int64)
+        return np.unique(np.concatenate(postings))
+
+    @staticmethod
+    def intersect(*postings):
+        """Sorted intersection of posting arrays."""
+        result = postings[0]
+        for rows in postings[1:]:
+            result = np.intersect1d(result, rows, assume_unique=True)
+        return result
+
+BUDGET_TIER_MAP = {'Low': 1, 'Mid': 2, 'High': 3}
+
+class ProductMatcher:
+    """
+    Hyper-Logic 1.2 (Engine): Vectorized product matcher over a Catalog.
+    Numeric columns (budget code, concern bitmask) are precomputed once and candidates
+    come from the CatalogIndex, so every routine step is scored with NumPy instead of a per-row apply.
+    """
+
+    def __init__(self, catalog):
+        self.catalog = catalog
+        self.index = catalog.index
+        n = len(catalog)
+        self.ids = catalog.ids
+        self.base_score = _frozen(catalog.df['rating'].to_numpy(dtype=float) * 10)
+        # Budget tiers are categorical: map the few categories, then gather by code (-1 = missing -> Mid)
+        budget = catalog.df['budget'].cat
+        tiers = np.array([BUDGET_TIER_MAP.get(value, 2) for value in budget.categories] + [2], dtype=float)
+        self.budget_code = _frozen(tiers[budget.codes.to_numpy()])
+
+        # Concern bitmask (one uint64 word per 64 distinct concerns), built from the concern postings
+        concerns = sorted(self.index.vocabulary('concern_match'))
+        self.concern_bit = {c: i for i, c in enumerate(concerns)}
+        self.concern_bits = np.zeros((n, max(1, (len(concerns) + 63) // 64)), dtype=np.uint64)
+        for c, bit in self.concern_bit.items():
+            self.concern_bits[self.index.postings('concern_match', c), bit // 64] |= np.uint64(1 << (bit % 64))
+        _frozen(self.concern_bits)
+
+    def base_scores(self, concern, budget, current_routine_product_ids):
+        """Step-independent score of every product for one routine (rating, budget, concern, novelty)."""
+        user_budget_score = BUDGET_TIER_MAP.get(budget, 2)
+        score = self.base_score - np.abs(self.budget_code - user_budget_score) * 5
+
+        query = np.zeros(self.concern_bits.shape[1], dtype=np.uint64)
+        for c in concern:
+            if c in self.concern_bit:
+                bit = self.concern_bit[c]
+                query[bit // 64] |= np.uint64(1 << (bit % 64))
+        if query.any():
+            score += (self.concern_bits & query).any(axis=1) * 10
+
+        if current_routine_product_ids:
+            score -= np.isin(self.ids, list(current_routine_product_ids)) * 20
+        return score
+
+    def best_row(self, score, active_ing, type_filter):
+        """
+        Highest scoring row among products matching the step's category OR ingredient.
+        Ties resolve to the lowest row id; returns None when nothing matches.
+        """
+        best = None
+        category_rows = self.index.postings_containing('category', type_filter.split(' ')[0])
+        for rows in (category_rows, self.index.postings('active_ing', active_ing)):
+            if len(rows) == 0:
+                continue
+            row = int(rows[np.argmax(score[rows])])
+            if best is None or score[row] > score[best] or (score[row] == score[best] and row < best):
+                best = row
+        return best
+
+    def match_steps(self, steps, concern, budget, current_routine_product_ids):
+        """
+        Batched match: scores the catalog once and returns the best product for each
+        (active_ing, type_filter) step, using argmax instead of a full sort.
+        """
+        score = self.base_scores(concern, budget, current_routine_product_ids)
+        results = []
+        for active_ing, type_filter in steps:
+            row = self.best_row(score, active_ing, type_filter)
+            if row is None:
+                results.append({"name": f"Recommended Product (AI: {active_ing} {type_filter})", "id": 0, "price": 0, "rating": 5.0})
+                continue
+            best_match = self.catalog.record(row)
+            best_match['score'] = score[row]
+            results.append(best_match)
+        return results
+
+def catalog_fingerprint(product_df):
+    """Content hash of the catalog, used as its version by every derived cache."""
+    import pandas as pd
+    digest = hashlib.sha1()
+    for col in product_df.columns:
+        digest.update(col.encode())
+        digest.update(pd.util.hash_pandas_object(product_df[col].astype(str), index=False).to_numpy().tobytes())
+    return digest.hexdigest()[:16]
+
+class ListColumn:
+    """
+    Integer-coded list column (ingredients, concerns): every value is a code into a
+    shared vocabulary, stored flat with CSR offsets, so row i owns
+    codes[offsets[i]:offsets[i + 1]] instead of a Python list per product.
+    """
+
+    def __init__(self, lists):
+        vocabulary, codes, offsets = {}, [], [0]
+        for items in lists:
+            codes.extend(vocabulary.setdefault(item, len(vocabulary)) for item in items)
+            offsets.append(len(codes))
+        self.vocabulary = list(vocabulary)
+        self.codes = _frozen(np.asarray(codes, dtype=np.int32))
+        self.offsets = _frozen(np.asarray(offsets, dtype=np.int64))
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def __getitem__(self, row):
+        """Decoded values of one row."""
+        return [self.vocabulary[code] for code in self.codes[self.offsets[row]:self.offsets[row + 1]]]
+
+    def row_ids(self):
+        """Row id of every entry in codes."""
+        return np.repeat(np.arange(len(self), dtype=np.int64), np.diff(self.offsets))
+
+class Catalog:
+    """
+    One immutable product catalog plus everything derived from it: the content
+    version, the inverted index and the matcher. Engine functions take a Catalog
+    explicitly instead of reading module globals.
+
+    Storage is columnar: category, budget and type are pandas categoricals, the list
+    columns are ListColumns, and ids map to rows through a dense array. Nothing is
+    mutated after construction, so one instance is shared by every session and thread.
+    """
+
+    def __init__(self, product_df):
+        import pandas as pd
+        product_df = product_df.reset_index(drop=True)
+        self.version = catalog_fingerprint(product_df)
+        self.columns = list(product_df.columns)
+        self.lists = {col: ListColumn(product_df[col]) for col in LIST_COLUMNS}
+
+        df = product_df.drop(columns=list(LIST_COLUMNS))
+        for col in CATEGORICAL_COLUMNS:
+            # Categories in first-seen order, so vocabularies read in catalog order
+            df[col] = pd.Categorical(df[col], categories=pd.unique(df[col].dropna()))
+        self.df = df
+        self.ids = _frozen(df['id'].to_numpy(dtype=np.int64))
+        self._build_id_index()
+        # Best-rated first (ties by row), so "top unused product" is a walk rather than a sort
+        self.rating_order = _frozen(np.argsort(-df['rating'].to_numpy(dtype=float), kind='stable'))
+        self._readers = [(col, self._column_reader(col)) for col in self.columns]
+
+        self.index = CatalogIndex(self)
+        self.matcher = ProductMatcher(self)
+        self._search_index = None
+        self._search_lock = threading.Lock()
+
+    @classmethod
+    def from_records(cls, records):
+        import pandas as pd
+        return cls(pd.DataFrame(records))
+
+    def __len__(self):
+        return len(self.df)
+
+    @property
+    def search_index(self):
+        """Full-text SearchIndex over this catalog, built on first use and then shared."""
+        if self._search_index is None:
+            with self._search_lock:
+                if self._search_index is None:
+                    from .search import SearchIndex
+                    self._search_index = SearchIndex(self)
+        return self._search_index
+
+    def _build_id_index(self):
+        """id -> row: a dense array over the id range when ids are compact, else a sorted id array."""
+        n = len(self.ids)
+        self._id_base = int(self.ids.min()) if n else 0
+        span = int(self.ids.max()) - self._id_base + 1 if n else 0
+        if span <= 4 * n + 1024:
+            row_by_id = np.full(span, -1, dtype=np.int64)
+            # Assign in reverse so a duplicated id resolves to its first row
+            row_by_id[self.ids[::-1] - self._id_base] = np.arange(n - 1, -1, -1, dtype=np.int64)
+            self._row_by_id, self._id_order = _frozen(row_by_id), None
+        else:
+            self._row_by_id = None
+            self._id_order = _frozen(np.argsort(self.ids, kind='stable'))
+            self._sorted_ids = _frozen(self.ids[self._id_order])
+
+    def row_of(self, product_id):
+        """Row position of a product id, or None if the catalog has no such product."""
+        try:
+            product_id = int(product_id)
+        except (TypeError, ValueError):
+            return None
+        if self._row_by_id is not None:
+            offset = product_id - self._id_base
+            if 0 <= offset < len(self._row_by_id) and self._row_by_id[offset] >= 0:
+                return int(self._row_by_id[offset])
+            return None
+        position = int(np.searchsorted(self._sorted_ids, product_id))
+        if position < len(self._sorted_ids) and self._sorted_ids[position] == product_id:
+            return int(self._id_order[position])
+        return None
+
+    def get(self, product_id):
+        """Product record for an id, or None (e.g. the synthetic id 0 of an unmatched routine step)."""
+        row = self.row_of(product_id)
+        return None if row is None else self.record(row)
+
+    def _column_reader(self, col):
+        if col in self.lists:
+            return self.lists[col].__getitem__
+        if col in CATEGORICAL_COLUMNS:
+            codes = self.df[col].cat.codes.to_numpy()
+            categories = self.df[col].cat.categories.to_numpy()
+            return lambda row: categories[codes[row]] if codes[row] >= 0 else None
+        return self.df[col].to_numpy().__getitem__
+
+    def record(self, row):
+        """Catalog row as a plain dict (list columns decoded), in the source column order."""
+        return {col: read(row) for col, read in self._readers}
+
+    def coded(self, field):
+        """(row ids, codes, vocabulary) for a categorical or list column, as the index consumes them."""
+        if field in self.lists:
+            column = self.lists[field]
+            return column.row_ids(), column.codes, column.vocabulary
+        codes = self.df[field].cat.codes.to_numpy()
+        present = np.flatnonzero(codes >= 0)
+        return present, codes[present], list(self.df[field].cat.categories)
+
+def _split_list(value):
+    if isinstance(value, str):
+        return [item.strip() for item in value.split(';') if item.strip()]
+    if value is None or (isinstance(value, float) and np.isnan(value)):
+        return []
+    return list(value)
+
+def load_catalog(path):
+    """
+    Reads a product catalog file into a Catalog. Supports .jsonl (one product per
+    line), .csv (list columns ';'-separated) and .parquet (list columns as lists).
+    """
+    import pandas as pd
+    extension = os.path.splitext(path)[1].lower()
+    if extension in ('.jsonl', '.ndjson'):
+        with open(path, encoding='utf-8') as handle:
+            product_df = pd.DataFrame([json.loads(line) for line in handle if line.strip()])
+    elif extension == '.csv':
+        product_df = pd.read_csv(path)
+    elif extension == '.parquet':
+        product_df = pd.read_parquet(path)
+    else:
+        raise ValueError(f"Unsupported catalog format: {path}")
+    for col in LIST_COLUMNS:
+        product_df[col] = product_df[col].map(_split_list)
+    return Catalog(product_df)
+
+def marketplace_result_rows(catalog, search_query, category_filter, concern_filter, sort_by):
+    """Catalog row positions matching the marketplace filters, in display order."""
+    # Apply Filters (combined as posting-list set operations on the catalog and search indexes)
+    matching_rows = []
+    relevance = None
+    searched = catalog.search_index.search(search_query) if search_query else None
+    if searched is not None:
+        search_rows, relevance = searched
+        matching_rows.append(search_rows)
+    
+    if category_filter != 'All':
+        matching_rows.append(catalog.index.postings('category', category_filter))
+        
+    if concern_filter != 'All':
+        matching_rows.append(catalog.index.postings('concern_match', concern_filter))
+
+    rows = CatalogIndex.intersect(*matching_rows) if matching_rows else np.arange(len(catalog))
+
+    # Sort Products (stable, on the matching rows only; relevance is ranked lazily, page by page)
+    if sort_by == 'Relevance':
+        from .search import RankedRows
+        if relevance is None:
+            return RankedRows(rows, catalog.df['rating'].to_numpy()[rows])
+        if len(rows) != len(search_rows):
+            relevance = relevance[np.searchsorted(search_rows, rows)]
+        return RankedRows(rows, relevance)
+    elif sort_by == 'Rating (High to Low)':
+        rows = rows[np.argsort(-catalog.df['rating'].to_numpy()[rows], kind='stable')]
+    elif sort_by == 'Price (Low to High)':
+        rows = rows[np.argsort(catalog.df['price'].to_numpy()[rows], kind='stable')]
+    elif sort_by == 'Name (A-Z)':
+        rows = rows[np.argsort(catalog.df['name'].to_numpy()[rows], kind='stable')]
+    return rows
@@ -0,0 +1,37 @@
+"""
+SkinovaAI daily checklist: which routine steps a session has ticked today.
+Session-only UI state (nothing here is persisted). Standard library only.
+"""
+
+class DailyChecklist:
+    """
+    Today's routine step check-ins for one user, as one bitmask per ritual
+    (bit i = i-th step of that ritual ticked). Rolling over to a new day and
+    testing whether a whole ritual is done are O(1), however long the session lives.
+    """
+    __slots__ = ('username', 'day', 'morning', 'evening')
+
+    def __init__(self, username, day=0):
+        self.username = username
+        self.day = day
+        self.morning = 0
+        self.evening = 0
+
+    def roll(self, day):
+        """Starts `day` (date ordinal) with nothing ticked; returns True if that was a new day."""
+        if day == self.day:
+            return False
+        self.day, self.morning, self.evening = day, 0, 0
+        return True
+
+    def is_done(self, ritual, index):
+        return bool(getattr(self, ritual) >> index & 1)
+
+    def mark(self, ritual, index, done=True):
+        mask = getattr(self, ritual)
+        setattr(self, ritual, mask | 1 << index if done else mask & ~(1 << index))
+
+    def all_done(self, ritual, steps):
+        """True once all `steps` steps of the ritual ('morning' or 'evening') are ticked."""
+        full = (1 << steps) - 1
+        return getattr(self, ritual) & full == full
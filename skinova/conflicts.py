@@ -0,0 +1,171 @@
+"""
+SkinovaAI ingredient-conflict rules, compiled into integer bitsets.
+"""
+from .data import ACTIVE_INGREDIENT_PROFILES
+
+# Short names used inside the free-text 'conflict' entries of ACTIVE_INGREDIENT_PROFILES
+CONFLICT_ALIASES = {
+    "Vitamin C": "L-Ascorbic Acid (Vitamin C)",
+    "L-AA": "L-Ascorbic Acid (Vitamin C)",
+    "AHA": "Glycolic Acid (AHA 10%)",
+    "BHA": "Salicylic Acid (BHA 2%)",
+    "Retinoid": "Retinol (0.5% Encapsulated)",
+    "Retinol": "Retinol (0.5% Encapsulated)",
+    "Benzoyl Peroxide": "Benzoyl Peroxide (BP 5%)",
+    "Niacinamide": "Niacinamide (Vitamin B3)"
+}
+
+# Expert pair rules layered on top of the profile matrix (message overrides for known pairs)
+SUPPLEMENTAL_CONFLICT_RULES = [
+    ("Retinol (0.5% Encapsulated)", "L-Ascorbic Acid (Vitamin C)", "caution",
+     "⚠️ Retinol and L-AA should NEVER be used in the same routine (different pH, high irritation risk). Separate to Night (Retinol) and Morning (L-AA)."),
+    ("Benzoyl Peroxide (BP 5%)", "Retinol (0.5% Encapsulated)", "severe",
+     "🚨 Severe Conflict: BP inactivates Retinol/L-AA and causes excessive irritation. AVOID using BP in the routine unless specifically targeted and separated."),
+    ("Benzoyl Peroxide (BP 5%)", "L-Ascorbic Acid (Vitamin C)", "severe",
+     "🚨 Severe Conflict: BP inactivates Retinol/L-AA and causes excessive irritation. AVOID using BP in the routine unless specifically targeted and separated.")
+]
+
+EXFOLIATING_ACTIVES = ["Retinol (0.5% Encapsulated)", "Glycolic Acid (AHA 10%)", "Salicylic Acid (BHA 2%)"]
+REDUNDANT_SERUM_ACTIVES = ["Niacinamide (Vitamin B3)"]
+
+class ConflictEngine:
+    """
+    Hyper-Logic 1.1 (Engine): Ingredient-conflict rules compiled into integer bitsets.
+    Every profiled ingredient gets a bit; each ingredient's row is the OR of the bits it
+    conflicts with, so a set of steps is evaluated with one AND per ingredient present.
+
+    Pair rules only apply to steps used together: the same ritual (the part of a step's
+    'time' before any parenthesis, e.g. Morning or Evening), and within a ritual the same
+    skin-cycling night ('Evening (NIGHT 1 - ...)'); untagged steps belong to every night.
+    Vitamin C in the morning and Retinol at night are therefore already separated.
+    """
+    SEVERITY_ORDER = {'severe': 0, 'caution': 1}
+
+    def __init__(self, profiles, aliases=CONFLICT_ALIASES, pair_rules=SUPPLEMENTAL_CONFLICT_RULES,
+                 exfoliants=EXFOLIATING_ACTIVES, redundant_serums=REDUNDANT_SERUM_ACTIVES):
+        self.ingredients = list(profiles)
+        self.bit = {name: i for i, name in enumerate(self.ingredients)}
+        self.aliases = {alias: self.bit[name] for alias, name in aliases.items() if name in self.bit}
+        self.conflict_rows = [0] * len(self.ingredients)
+        self.pair_rules = {}
+
+        # 1. Compile the free-text conflict lists of the profile matrix
+        for name, profile in profiles.items():
+            for entry in profile.get('conflict', []):
+                for clause in entry.split(', '):
+                    severity = 'severe' if 'NEVER' in clause else 'caution'
+                    for other in self._resolve(clause):
+                        if other != self.bit[name]:
+                            self._add_rule(self.bit[name], other, severity,
+                                           f"{'🚨' if severity == 'severe' else '⚠️'} {self._short(name)} + {self._short(self.ingredients[other])}: {clause}.")
+
+        # 2. Supplemental expert pairs (override the generated message for the same pair)
+        for first, second, severity, message in pair_rules:
+            if first in self.bit and second in self.bit:
+                self._add_rule(self.bit[first], self.bit[second], severity, message, override=True)
+
+        self.exfoliant_mask = sum(1 << self.bit[name] for name in exfoliants if name in self.bit)
+        self.redundancy_mask = sum(1 << self.bit[name] for name in redundant_serums if name in self.bit)
+
+    @staticmethod
+    def _short(name):
+        return name.split(' (')[0]
+
+    def _resolve(self, text):
+        """Ingredient bits mentioned in a conflict clause (full names or known aliases)."""
+        found = {i for name, i in self.bit.items() if self._short(name) in text}
+        found.update(i for alias, i in self.aliases.items() if alias in text)
+        return found
+
+    def _add_rule(self, i, j, severity, message, override=False):
+        self.conflict_rows[i] |= 1 << j
+        self.conflict_rows[j] |= 1 << i
+        pair = (min(i, j), max(i, j))
+        existing = self.pair_rules.get(pair)
+        if override or existing is None or self.SEVERITY_ORDER[severity] < self.SEVERITY_ORDER[existing[0]]:
+            self.pair_rules[pair] = (severity, message)
+
+    @staticmethod
+    def _sessions(step_bits):
+        """Ingredient masks of the step groups applied together, from (step, bit) pairs."""
+        rituals = {}
+        for step, i in step_bits:
+            ritual, _, night = step.get('time', '').partition(' (')
+            nights = rituals.setdefault(ritual, {})
+            nights[night or None] = nights.get(night or None, 0) | 1 << i
+        masks = []
+        for nights in rituals.values():
+            shared = nights.pop(None, 0)
+            masks.extend([shared | mask for mask in nights.values()] or [shared])
+        return masks
+
+    def ingredient_id(self, ingredient_key):
+        """Bit of a routine step's ingredient_key, or None when it is not a profiled active."""
+        if ingredient_key in self.bit:
+            return self.bit[ingredient_key]
+        return self.aliases.get(ingredient_key)
+
+    def evaluate(self, routine_steps):
+        """
+        Evaluates a whole routine at once. Returns a dict with the display 'messages',
+        the structured 'conflicts' (pairs used together, with severity) and
+        'by_ingredient' (step ingredient_key -> messages) for per-step lookups.
+        Group rules (over-exfoliation, redundant serums) look at the whole routine.
+        """
+        routine_mask = 0
+        step_counts = {}
+        keys_by_bit = {}
+        step_bits = []
+        for step in routine_steps:
+            i = self.ingredient_id(step.get('ingredient_key', ''))
+            if i is None:
+                continue
+            routine_mask |= 1 << i
+            step_counts[i] = step_counts.get(i, 0) + 1
+            keys_by_bit.setdefault(i, set()).add(step['ingredient_key'])
+            step_bits.append((step, i))
+
+        pairs = set()
+        for session_mask in self._sessions(step_bits):
+            present = session_mask
+            while present:
+                i = (present & -present).bit_length() - 1
+                present &= present - 1
+                hits = self.conflict_rows[i] & session_mask & ~((2 << i) - 1) # Only j > i: each pair once
+                while hits:
+                    j = (hits & -hits).bit_length() - 1
+                    hits &= hits - 1
+                    pairs.add((i, j))
+        conflicts = []
+        for i, j in sorted(pairs):
+            severity, message = self.pair_rules[(i, j)]
+            conflicts.append({'ingredients': (self.ingredients[i], self.ingredients[j]), 'severity': severity, 'message': message})
+        conflicts.sort(key=lambda c: self.SEVERITY_ORDER[c['severity']])
+
+        by_ingredient = {}
+        for conflict in conflicts:
+            for name in conflict['ingredients']:
+                for key in keys_by_bit[self.bit[name]]:
+                    by_ingredient.setdefault(key, []).append(conflict['message'])
+
+        messages = list(dict.fromkeys(c['message'] for c in conflicts))
+
+        # Group rules: over-exfoliation risk (AHA + BHA + Retinoid is the highest risk)
+        if bin(routine_mask & self.exfoliant_mask).count('1') > 2:
+            messages.append("🔥 Hyper-Warning: High risk of over-exfoliation. Ensure these are used on ALTERNATE nights (Skin Cycling protocol is mandatory).")
+
+        # Redundancy: the same serum active in several steps
+        for i, count in step_counts.items():
+            if count > 1 and self.redundancy_mask >> i & 1:
+                messages.append(f"📌 Optimization: You have multiple {self._short(self.ingredients[i])} products. Consider using only one high-concentration serum to save budget and avoid redundancy.")
+
+        return {'messages': messages, 'conflicts': conflicts, 'by_ingredient': by_ingredient}
+
+CONFLICT_ENGINE = ConflictEngine(ACTIVE_INGREDIENT_PROFILES)
+
+def check_ingredient_conflict(routine_steps):
+    """
+    Hyper-Logic 1.1: Checks for ingredient conflicts within the current routine.
+    Rules are compiled from the ACTIVE_INGREDIENT_PROFILES matrix (see ConflictEngine).
+    """
+    return CONFLICT_ENGINE.evaluate(routine_steps)['messages']
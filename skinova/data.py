@@ -0,0 +1,21 @@
+"""
+SkinovaAI reference data: the active-ingredient profile matrix and the location of the product catalog file.
+"""
+import os
+
+# Active Ingredient Profile Matrix (Expanded Conflicts and Delivery Systems)
+ACTIVE_INGREDIENT_PROFILES = {
+    "Hyaluronic Acid (HA)": {"function": "Hydration", "concerns": ["Dryness"], "conflict": [], "system": "Vehicle-Aqueous", "notes": "Multi-molecular weights used for deeper penetration."},
+    "Niacinamide (Vitamin B3)": {"function": "Barrier, Oil Control", "concerns": ["Acne", "Redness"], "conflict": ["High concentration Vitamin C (use 30 min apart)"], "system": "Vehicle-Emulsion", "notes": "Minimizes pores and reduces inflammation."},
+    "L-Ascorbic Acid (Vitamin C)": {"function": "Antioxidant, Brightening", "concerns": ["Pigmentation", "Aging"], "conflict": ["AHA/BHA (alternate), Benzoyl Peroxide (NEVER)"], "system": "Vehicle-LowPHSerum", "notes": "Crucial for morning routine. Highly unstable."},
+    "Retinol (0.5% Encapsulated)": {"function": "Cell Turnover, Anti-Aging", "concerns": ["Aging", "Acne"], "conflict": ["AHA/BHA (Skin Cycling ONLY)", "Benzoyl Peroxide (NEVER)"], "system": "Vehicle-Oil", "notes": "Night use only. Encapsulation reduces irritation."},
+    "Salicylic Acid (BHA 2%)": {"function": "Exfoliation (Oil-soluble)", "concerns": ["Acne", "Blackheads"], "conflict": ["Retinoids (alternate nights)"], "system": "Vehicle-Toner", "notes": "Deeply cleanses pores. Targets oil/clogged pores."},
+    "Glycolic Acid (AHA 10%)": {"function": "Exfoliation (Water-soluble)", "concerns": ["Dullness", "Texture"], "conflict": ["Retinoids (alternate nights)"], "system": "Vehicle-Gel", "notes": "Increases sun sensitivity. Night use only."},
+    "Benzoyl Peroxide (BP 5%)": {"function": "Acne Treatment", "concerns": ["Acne (Inflammatory)"], "conflict": ["Retinoids", "Vitamin C"], "system": "Vehicle-SpotTreatment", "notes": "Spot treatment. Mandatory patch test."},
+    "Azelaic Acid (10%)": {"function": "Redness, Acne, Pigmentation", "concerns": ["Rosacea", "PIH"], "conflict": [], "system": "Vehicle-Cream", "notes": "Gentle, multi-tasking active. Can be used with Retinoids (if tolerant)."},
+    "Ceramides (NP, AP, EOP)": {"function": "Barrier Repair", "concerns": ["Dryness", "Sensitive"], "conflict": [], "system": "Vehicle-Moisturizer", "notes": "Mimics skin's natural lipids for deep repair."}
+}
+
+# Hyper-Product Catalog: one product per line in products.jsonl, loaded once per
+# process by skinova.catalog.load_catalog (CSV and Parquet exports load the same way)
+DEFAULT_CATALOG_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'products.jsonl')
@@ -0,0 +1,344 @@
+"""
+SkinovaAI engine: routine generation, skin scoring, analysis reports and kits.
+Every function takes the profile, history and Catalog it works on explicitly and
+returns its result; persisting it (and any session state) is the caller's job.
+"""
+import copy
+import random
+import threading
+from collections import OrderedDict
+from datetime import date, datetime
+
+from .conflicts import check_ingredient_conflict
+from .metrics import METRICS
+from .store import ComplianceCounter
+
+@METRICS.timed('engine.get_product_for_routine_step')
+def get_product_for_routine_step(concern, active_ing, budget, type_filter, current_routine_product_ids, catalog):
+    """
+    Hyper-Logic 1.2: Finds the best product match based on multiple criteria.
+    Prioritizes products the user hasn't used yet to expand options.
+    """
+    return catalog.matcher.match_steps([(active_ing, type_filter)], concern, budget, current_routine_product_ids)[0]
+
+class RoutineCache:
+    """
+    Hyper-Logic 2.1 (Engine): Bounded, thread-safe LRU cache of generated routines.
+    Entries are keyed on the normalized profile plus the catalog version, and the whole
+    cache is dropped as soon as a lookup arrives with a newer catalog version.
+    """
+
+    def __init__(self, maxsize=4096):
+        self.maxsize = maxsize
+        self.catalog_version = None
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def get_or_compute(self, key, catalog_version, compute):
+        """Returns the cached value for (key, catalog_version), computing and storing it on a miss."""
+        full_key = (catalog_version, key)
+        with self._lock:
+            if catalog_version != self.catalog_version:
+                if self._entries:
+                    self.invalidations += 1
+                self._entries.clear()
+                self.catalog_version = catalog_version
+            if full_key in self._entries:
+                self._entries.move_to_end(full_key)
+                self.hits += 1
+                return self._entries[full_key]
+            self.misses += 1
+
+        value = compute()
+
+        with self._lock:
+            if catalog_version == self.catalog_version:
+                self._entries[full_key] = value
+                self._entries.move_to_end(full_key)
+                while len(self._entries) > self.maxsize:
+                    self._entries.popitem(last=False)
+                    self.evictions += 1
+        return value
+
+    def stats(self):
+        """Hit/miss/eviction counters for monitoring."""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'invalidations': self.invalidations,
+                'size': len(self._entries),
+                'hit_rate': round(self.hits / lookups, 4) if lookups else 0.0,
+                'catalog_version': self.catalog_version
+            }
+
+def routine_cache_key(profile, current_routine_product_ids):
+    """Canonical tuple of every profile field generate_hyper_routine depends on."""
+    return (
+        profile.get('skin_type', 'Normal'),
+        tuple(sorted(profile.get('primary_concerns', []))),
+        profile.get('climate', 'Temperate'),
+        profile.get('budget', 'Mid'),
+        profile.get('skin_sensitivity', 'Low'),
+        profile.get('fitzpatrick_type'),
+        tuple(sorted(set(current_routine_product_ids)))
+    )
+
+@METRICS.timed('engine.generate_hyper_routine')
+def generate_hyper_routine(profile, current_routine_product_ids, catalog, cache=None):
+    """
+    Hyper-Logic 2: Generates a highly customized routine based on 10+ profile parameters.
+    With a RoutineCache, results are memoized per normalized profile and catalog version.
+    """
+    if cache is None:
+        return build_hyper_routine(profile, current_routine_product_ids, catalog)
+
+    key = routine_cache_key(profile, current_routine_product_ids)
+    result = cache.get_or_compute(key, catalog.version, lambda: build_hyper_routine(profile, current_routine_product_ids, catalog))
+    # Callers own (and may mutate) their copy; the cached entry stays pristine
+    return copy.deepcopy(result)
+
+
+def build_hyper_routine(profile, current_routine_product_ids, catalog):
+    """
+    Hyper-Logic 2 (Uncached): Builds the routine from scratch.
+    Implements Skin Cycling, Climate Adjustment, and Budget Optimization.
+    """
+    # 1. Extract Profile Data
+    skin_type = profile.get('skin_type', 'Normal')
+    concerns = profile.get('primary_concerns', [])
+    climate = profile.get('climate', 'Temperate')
+    budget = profile.get('budget', 'Mid')
+    sensitivity = profile.get('skin_sensitivity', 'Low')
+    
+    # 2. Routine Initialization
+    morning_routine = []
+    evening_routine = []
+    
+    # 3. Logic for Cleansing (MANDATORY STEPS)
+    cleanser_active = "Ceramides"
+    cleanser_type = "Creamy Cleanser" if skin_type in ['Dry', 'Sensitive'] else "Gel Cleanser"
+    
+    # Morning Cleanser (Adjusted for climate)
+    if climate in ['Cold/Dry', 'Temperate']:
+        morning_routine.append({"step": 1, "time": "Morning", "type": cleanser_type, "ingredient_key": cleanser_active, 
+                                "product_query": (cleanser_active, "Cleanser"), 
+                                "notes": "Gentle rinse with water or use a light cleanser."})
+    else: # Hot/Humid
+        morning_routine.append({"step": 1, "time": "Morning", "type": "Foaming Cleanser", "ingredient_key": "Salicylic Acid (BHA 2%)" if 'Oiliness' in skin_type else "Glycerin", 
+                                "product_query": ("Cleanser", "Cleanser"),
+                                "notes": "Use a deep, but non-stripping cleanse to manage morning oil."})
+    
+    # Evening Double Cleansing
+    evening_routine.append({"step": 1, "time": "Evening", "type": "Oil Cleanser", "ingredient_key": "Squalane", 
+                            "product_query": ("Oil Cleanser", "Oil Cleanser"), 
+                            "notes": "MANDATORY first step to remove SPF/Makeup/Pollution."})
+    evening_routine.append({"step": 2, "time": "Evening", "type": cleanser_type, "ingredient_key": cleanser_active, 
+                            "product_query": ("Ceramides", "Cleanser"), 
+                            "notes": "Second cleanse for skin purification."})
+
+    # 4. Active Treatment (The Skin Cycling Protocol - Night Steps are 3-6)
+    
+    # Day Active (Morning - Antioxidant/Brightening)
+    if 'Pigmentation' in concerns or 'Aging' in concerns:
+        active_ing = "L-Ascorbic Acid (Vitamin C)"
+    elif 'Redness' in concerns or 'Barrier' in concerns:
+        active_ing = "Niacinamide (Vitamin B3)"
+    else:
+        active_ing = "Hyaluronic Acid (HA)"
+
+    morning_routine.append({"step": 2, "time": "Morning", "type": "Antioxidant/Treatment Serum", "ingredient_key": active_ing, 
+                            "product_query": (active_ing, "Serum"), 
+                            "notes": "Shield against environmental damage. Apply to dry skin."})
+    
+    # Night Actives (Skin Cycling Logic)
+    
+    # NIGHT 1: Exfoliation (BHA/AHA)
+    exfoliant_ing = "Salicylic Acid (BHA 2%)" if 'Acne' in concerns else "Glycolic Acid (AHA 10%)"
+    if sensitivity == 'High': exfoliant_ing = "Azelaic Acid (10%)" # Gentle substitute
+
+    evening_routine.append({"step": 3, "time": "Evening (NIGHT 1 - Exfoliation)", "type": "Exfoliant", "ingredient_key": exfoliant_ing, 
+                            "product_query": (exfoliant_ing, "Exfoliant"), 
+                            "notes": f"**Use only once every 4 nights.** Removes dead skin. Follow with a calming moisturizer."})
+
+    # NIGHT 2: Retinoid
+    retinoid_ing = "Retinol (0.5% Encapsulated)"
+    if 'Acne' in concerns and sensitivity == 'Low': retinoid_ing = "Retinol (0.5% Encapsulated)"
+    elif 'Aging' in concerns and sensitivity == 'High': retinoid_ing = "Azelaic Acid (10%)" # Gentler Retinoid Alternative
+
+    evening_routine.append({"step": 4, "time": "Evening (NIGHT 2 - Retinoid)", "type": "Regenerative Treatment", "ingredient_key": retinoid_ing, 
+                            "product_query": (retinoid_ing, "Active Night"), 
+                            "notes": "**Use only once every 4 nights.** Anti-aging/Acne control. Apply pea-sized amount to dry skin."})
+    
+    # NIGHTS 3 & 4: Recovery/Hydration
+    evening_routine.append({"step": 5, "time": "Evening (NIGHT 3 & 4 - Recovery)", "type": "Hydration/Barrier Serum", "ingredient_key": "Ceramides (NP, AP, EOP)", 
+                            "product_query": ("Ceramides", "Serum"), 
+                            "notes": "**Use on the 2 nights following Retinoid.** Focus on repairing the skin barrier after actives."})
+
+    # 5. Moisturizer & Sunscreen (MANDATORY STEPS)
+    moisturizer_ing = "Ceramides (NP, AP, EOP)"
+    if skin_type in ['Dry', 'Sensitive']: moisturizer_type = "Barrier Repair Cream"
+    else: moisturizer_type = "Lightweight Gel-Cream"
+
+    # Morning Moisturizer
+    morning_routine.append({"step": 3, "time": "Morning", "type": moisturizer_type, "ingredient_key": moisturizer_ing, 
+                            "product_query": (moisturizer_ing, "Moisturizer"), 
+                            "notes": "Locks in hydration. Apply before SPF."})
+    
+    # Evening Moisturizer (Last Step)
+    evening_routine.append({"step": 6, "time": "Evening", "type": "Restorative Night Cream", "ingredient_key": "Peptides", 
+                            "product_query": ("Moisturizer", "Moisturizer"), 
+                            "notes": "Heavy occlusive layer to prevent trans-epidermal water loss (TEWL)."})
+    
+    # Sunscreen (Always last in AM)
+    sunscreen_ing = "Zinc Oxide"
+    if profile.get('fitzpatrick_type') in ['IV', 'V', 'VI']: sunscreen_type = "Tinted Mineral SPF 50+"
+    else: sunscreen_type = "Mineral Zinc Oxide SPF 50+"
+    
+    morning_routine.append({"step": 4, "time": "Morning", "type": sunscreen_type, "ingredient_key": sunscreen_ing, 
+                            "product_query": (sunscreen_ing, "Sunscreen"), 
+                            "notes": "CRUCIAL. Apply liberally and reapply every 2 hours."})
+
+    # 6. Final Routine Assembly and Conflict Check
+    full_routine = morning_routine + evening_routine
+    matched_products = catalog.matcher.match_steps([step.pop('product_query') for step in full_routine], concerns, budget, current_routine_product_ids)
+    for step, product in zip(full_routine, matched_products):
+        step['product'] = product
+    conflicts = check_ingredient_conflict(full_routine)
+    
+    return full_routine, conflicts
+
+
+@METRICS.timed('engine.calculate_skin_score')
+def calculate_skin_score(profile, score_log, compliance=None, routine_streak=0, today=None):
+    """
+    Hyper-Logic 3: Calculates a detailed Skin Score out of 100 based on complex factors.
+    Includes compliance history, lifestyle weighting, and concern penalties.
+    Returns (score, score_entry); score_entry is the new score_log entry to append,
+    or None when today's score is already logged.
+    """
+    score = 100 
+    
+    # 1. Base Penalties (Weighted by Severity)
+    concern_penalties = {
+        'Acne': 12, 'Pigmentation': 10, 'Aging': 8, 'Rosacea': 15, 'Texture': 5
+    }
+    for concern in profile.get('primary_concerns', []):
+        score -= concern_penalties.get(concern, 0)
+    
+    # 2. Lifestyle Penalty/Bonus (Up to 15 points impact)
+    stress_level = profile.get('lifestyle', {}).get('stress_level', 3) # 1 (Low) to 4 (High)
+    sleep_quality = profile.get('lifestyle', {}).get('sleep_quality', 3) # 1 (Excellent) to 4 (Poor)
+    
+    score -= (stress_level - 1) * 3  # High stress -> max -9 penalty
+    score -= (sleep_quality - 1) * 2 # Poor sleep -> max -6 penalty
+    
+    # 3. Compliance/Streak Bonus (Dynamic Impact - Up to 20 points impact)
+    today = today or date.today()
+    compliance = compliance or ComplianceCounter()
+    
+    compliance_score = compliance.compliant_days(today.toordinal()) * 0.75
+    score += min(15, int(compliance_score)) # Max 15 points
+    
+    score += min(5, routine_streak // 7) # Max 5 points for long streak
+    
+    # 4. Seasonal/Environmental Multiplier
+    current_season = profile.get('climate', 'Temperate')
+    if current_season in ['Hot/Humid'] and 'Oiliness' in profile.get('skin_type', 'Normal'):
+        score *= 0.98 # Small penalty for climate challenge
+    elif current_season in ['Cold/Dry'] and 'Dry' in profile.get('skin_type', 'Normal'):
+        score *= 0.95 # Small penalty for climate challenge
+
+    # 5. Final Clamping and Logging
+    final_score = max(40, min(98, int(score))) 
+    
+    last_score = score_log[-1]['score'] if score_log else 75
+    
+    score_entry = None
+    if not score_log or score_log[-1]['date'] != today.isoformat():
+        score_entry = {
+            'date': today.isoformat(),
+            'score': final_score,
+            'delta': f"{'+' if final_score >= last_score else '-'}{abs(final_score - last_score)}"
+        }
+    
+    return final_score, score_entry
+
+
+def generate_mock_analysis_report(profile, now=None, photo_analysis=None):
+    """
+    Hyper-Logic 4: Generates a highly detailed, mock Skin Analyzer report (Dermato-Pathology Simulation).
+    With `photo_analysis` (skinova.imaging.analyze_skin_photo output) the biometric
+    markers are the ones measured from the photo instead of simulated ones.
+    """
+    now = now or datetime.now()
+    report_date = now.date().isoformat()
+    analysis_data = {
+        "report_id": f"SR-{now.strftime('%Y%m%d%H%M%S')}",
+        "date": report_date,
+        "assessment_summary": "Comprehensive AI assessment combining self-reported data, visual markers, and active treatment plan efficacy.",
+        "metrics": {
+            "hydration_level_pct": random.randint(30, 70), 
+            "sebum_production_rate": random.randint(40, 90) if profile['skin_type'] == 'Oiliness' else random.randint(20, 50),
+            "collagen_integrity_score_pct": random.randint(55, 85) if profile.get('age_group') == '30+' else random.randint(80, 95),
+            "pigmentation_index": random.randint(10, 40) if 'Pigmentation' in profile['primary_concerns'] else random.randint(5, 15),
+            "barrier_strength_index": random.randint(60, 95)
+        },
+        "pathology_breakdown": [],
+        "environmental_impact": {
+            "uv_exposure_risk": "High (Mandatory SPF use. Fitzpatrick Type V is highly susceptible to PIH).",
+            "pollution_stress_index": 8.1,
+            "climate_factor": f"{profile['climate']} - Requires adaptation for humidity/dryness."
+        },
+        "actionable_recommendations": [
+            "Re-evaluate current active strength (may need to increase Retinoid concentration after 6 months).",
+            "Implement **Facial Massage** daily for lymph drainage.",
+            "Use only **non-comedogenic** products."
+        ]
+    }
+    
+    if photo_analysis is not None:
+        analysis_data["metrics"] = dict(photo_analysis["metrics"])
+        analysis_data["photo_indices"] = dict(photo_analysis["indices"])
+        analysis_data["assessment_summary"] = "Comprehensive AI assessment combining self-reported data, markers measured from your photo, and active treatment plan efficacy."
+
+    # Detailed Pathology Generation based on Concerns
+    if 'Acne' in profile['primary_concerns']:
+        analysis_data["pathology_breakdown"].append({
+            "area": "Jawline & Cheeks",
+            "finding": "High density of closed comedones and microcysts. Possible hormonal link (Simulated).",
+            "severity": "Moderate-Severe",
+            "root_cause": "Hormonal fluctuations and inflammation (elevated P. acnes)."
+        })
+    if 'Pigmentation' in profile['primary_concerns']:
+        analysis_data["pathology_breakdown"].append({
+            "area": "Forehead and Upper Lip",
+            "finding": "Melasma-like patches with deep dermal component (AI Visual Assessment).",
+            "severity": "High",
+            "root_cause": "Historic UV damage and hormonal triggers."
+        })
+    if profile.get('age_group') == '30+':
+        analysis_data["pathology_breakdown"].append({
+            "area": "Periorbital Region",
+            "finding": "Fine lines (static and dynamic) visible. Loss of elasticity.",
+            "severity": "Mild-Moderate",
+            "root_cause": "Natural aging and collagen degradation."
+        })
+    
+    return analysis_data
+
+@METRICS.timed('engine.generate_personalized_kit')
+def generate_personalized_kit(profile, routine, catalog):
+    """
+    Hyper-Logic 5: The "Essential Kit" for a routine: one product per kit slot, chosen
+    by the budget-constrained optimizer (skinova.kit) so the kit stays within the
+    profile's monthly budget.
+    """
+    from .kit import optimize_kit
+    return optimize_kit(profile, routine, catalog)['products']
@@ -0,0 +1,140 @@
+"""
+SkinovaAI community forum: a process-wide thread store shared by every session.
+Standard library only. Writers serialize on one lock; readers never take it.
+"""
+import threading
+from contextlib import contextmanager
+from datetime import date
+
+FORUM_ORDERS = ('views', 'recent')
+# Optimistic read attempts before a reader falls back to taking the write lock
+READ_RETRIES = 8
+
+class ThreadStore:
+    """
+    Hyper-Logic 7.1 (Forum): Thread store with atomic id allocation and two orders
+    kept up to date on every write, so listing a page costs O(page) at any size:
+
+      * by views, descending: views only ever grow by one, so a view swaps the thread
+        with the first thread of its view count and moves that group's boundary (O(1));
+      * by recency: posts arrive newest-last, so it is an append-only list.
+
+    Thread records are never mutated in place; a view replaces the record. Readers
+    copy a slice of an order under a sequence counter (a seqlock) and retry if a
+    write ran meanwhile, so a page read never waits on a writer.
+    """
+
+    def __init__(self, threads=()):
+        self._lock = threading.Lock()
+        self._seq = 0 # Odd while a write is in progress
+        self._threads = {}
+        self._next_id = 1
+        self._by_views = []
+        self._position = {} # thread id -> index in _by_views
+        self._group_start = {} # view count -> index of its first thread in _by_views
+        self._by_recency = []
+        self.load(threads)
+
+    def load(self, threads):
+        """Bulk-adds existing threads (e.g. seed data), keeping their ids, views and dates."""
+        with self._writing():
+            for thread in threads:
+                record = dict(thread)
+                record.setdefault('content', '')
+                record['tags'] = tuple(record.get('tags', ()))
+                self._threads[record['id']] = record
+                self._next_id = max(self._next_id, record['id'] + 1)
+            self._by_recency = sorted(self._threads, key=lambda i: (self._threads[i]['date'], i))
+            self._reindex_views()
+
+    @contextmanager
+    def _writing(self):
+        with self._lock:
+            self._seq += 1
+            try:
+                yield
+            finally:
+                self._seq += 1
+
+    def _reindex_views(self):
+        """Full re-sort of the views order; only for bulk loads and out-of-order inserts."""
+        self._by_views = sorted(self._threads, key=lambda i: -self._threads[i]['views'])
+        self._position = {thread_id: i for i, thread_id in enumerate(self._by_views)}
+        self._group_start = {}
+        for i, thread_id in enumerate(self._by_views):
+            self._group_start.setdefault(self._threads[thread_id]['views'], i)
+
+    def post(self, title, user, content='', tags=(), day=None):
+        """Publishes a new thread and returns its record; ids are allocated under the write lock."""
+        with self._writing():
+            record = {
+                'id': self._next_id,
+                'title': title,
+                'user': user,
+                'date': (day or date.today()).isoformat(),
+                'replies': 0,
+                'tags': tuple(tags),
+                'views': 1,
+                'content': content,
+            }
+            self._next_id += 1
+            self._threads[record['id']] = record
+            self._by_recency.append(record['id'])
+            if self._by_views and self._threads[self._by_views[-1]]['views'] < record['views']:
+                # Only reachable when older threads have fewer views than a new one starts with
+                self._reindex_views()
+            else:
+                self._position[record['id']] = len(self._by_views)
+                self._group_start.setdefault(record['views'], len(self._by_views))
+                self._by_views.append(record['id'])
+        return record
+
+    def record_view(self, thread_id):
+        """Counts one view of a thread and returns its updated record (None if unknown)."""
+        with self._writing():
+            record = self._threads.get(thread_id)
+            if record is None:
+                return None
+            views = record['views']
+            position, start = self._position[thread_id], self._group_start[views]
+            # Swap to the front of its view-count group, then shrink that group by one
+            other = self._by_views[start]
+            self._by_views[start], self._by_views[position] = thread_id, other
+            self._position[thread_id], self._position[other] = start, position
+            following = start + 1
+            if following < len(self._by_views) and self._threads[self._by_views[following]]['views'] == views:
+                self._group_start[views] = following
+            else:
+                del self._group_start[views]
+            self._group_start.setdefault(views + 1, start)
+            record = dict(record, views=views + 1)
+            self._threads[thread_id] = record
+        return record
+
+    def get(self, thread_id):
+        """The current record of a thread, or None."""
+        return self._threads.get(thread_id)
+
+    def __len__(self):
+        return len(self._by_recency)
+
+    def page(self, order='views', start=0, count=10):
+        """Threads start..start+count in the given order ('views': most viewed first, 'recent': newest first)."""
+        if order not in FORUM_ORDERS:
+            raise ValueError(f"Unknown forum order {order!r}; expected one of {FORUM_ORDERS}")
+        for _ in range(READ_RETRIES):
+            seq = self._seq
+            if seq % 2 == 0:
+                threads = self._read_page(order, start, count)
+                if self._seq == seq:
+                    return threads
+        with self._lock:
+            return self._read_page(order, start, count)
+
+    def _read_page(self, order, start, count):
+        if order == 'views':
+            ids = self._by_views[start:start + count]
+        else:
+            total = len(self._by_recency)
+            ids = self._by_recency[max(total - start - count, 0):max(total - start, 0)][::-1]
+        return [self._threads[thread_id] for thread_id in ids]
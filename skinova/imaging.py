@@ -0,0 +1,168 @@
+"""
+SkinovaAI photo analysis: skin metrics computed from the pixels of a face photo.
+PIL is only imported when a photo is actually analyzed.
+"""
+import io
+
+import numpy as np
+
+# Bump whenever the pipeline's output for the same photo changes (it keys cached results)
+ANALYSIS_ENGINE_VERSION = 'photo-metrics-1'
+# Photos are downscaled so the long side is at most this many pixels before analysis
+ANALYSIS_MAX_SIDE = 512
+# Rows per processing tile: bounds the float working set to TILE_ROWS x width x 3
+TILE_ROWS = 64
+# Below this fraction of skin pixels the photo is rejected (no face, too dark, ...)
+MIN_SKIN_FRACTION = 0.05
+# |dL*| between neighbouring pixels above this counts as a fine-line / texture edge
+EDGE_THRESHOLD = 8.0
+
+# sRGB (D65) -> XYZ, each row divided by the reference white so Xn = Yn = Zn = 1
+_RGB_TO_XYZ = (np.array([
+    [0.4124564, 0.3575761, 0.1804375],
+    [0.2126729, 0.7151522, 0.0721750],
+    [0.0193339, 0.1191920, 0.9503041],
+]) / np.array([[0.95047], [1.0], [1.08883]])).T.astype(np.float32)
+
+def _linear_lut():
+    """sRGB gamma expansion for all 256 channel values (a lookup replaces the per-pixel power)."""
+    c = np.arange(256, dtype=np.float64) / 255
+    return np.where(c <= 0.04045, c / 12.92, ((c + 0.055) / 1.055) ** 2.4).astype(np.float32)
+
+_LINEAR = _linear_lut()
+
+def rgb_to_lab(rgb):
+    """uint8 sRGB (..., 3) -> float32 CIE L*, a*, b* arrays (D65)."""
+    xyz = _LINEAR[rgb] @ _RGB_TO_XYZ
+    f = np.where(xyz > 216 / 24389, np.cbrt(xyz), xyz * (24389 / 27 / 116) + 16 / 116)
+    return 116 * f[..., 1] - 16, 500 * (f[..., 0] - f[..., 1]), 200 * (f[..., 1] - f[..., 2])
+
+def rgb_to_sv(rgb):
+    """uint8 sRGB (..., 3) -> float32 HSV saturation and value (hue is tested separately)."""
+    high = rgb.max(axis=-1)
+    low = rgb.min(axis=-1)
+    value = high.astype(np.float32) / 255
+    saturation = (high - low).astype(np.float32) / np.maximum(high, 1)
+    return saturation, value
+
+def warm_hue(rgb):
+    """
+    HSV hue in [340°, 360°) or [0°, 50°]: red is the largest channel and the hue
+    ratio stays in range. Integer arithmetic only, no angle is computed.
+    """
+    r, g, b = (rgb[..., i].astype(np.int16) for i in range(3))
+    red_max = (r >= g) & (r >= b) & (r > 0)
+    toward_yellow = (g >= b) & (6 * (g - b) <= 5 * (r - b))
+    toward_magenta = (b > g) & (3 * (b - g) <= r - g)
+    return red_max & (toward_yellow | toward_magenta)
+
+def _scale(value, low, high, out_low, out_high):
+    """Linear map of value from [low, high] onto [out_low, out_high], clamped, rounded."""
+    t = min(max((value - low) / (high - low), 0.0), 1.0)
+    return int(round(out_low + t * (out_high - out_low)))
+
+def load_photo(source, max_side=ANALYSIS_MAX_SIDE):
+    """
+    Decodes a photo (bytes, file-like or PIL image) to a uint8 RGB array whose long
+    side is at most max_side. JPEGs are decoded at reduced scale (DCT draft mode),
+    so a 12 MP phone photo never materializes at full size; other formats are
+    decoded in full, box-reduced by an integer factor in their own mode and only
+    then converted and resampled. Raises ValueError for files PIL cannot read and
+    for decompression bombs.
+    """
+    from PIL import Image, UnidentifiedImageError
+
+    if isinstance(source, (bytes, bytearray)):
+        source = io.BytesIO(source)
+    try:
+        image = source if isinstance(source, Image.Image) else Image.open(source)
+        image.draft('RGB', (max_side, max_side))
+        image.load()
+    except (UnidentifiedImageError, Image.DecompressionBombError, OSError, SyntaxError) as exc:
+        raise ValueError(f"Could not read the photo: {exc}") from exc
+    factor = max(image.size) // max_side
+    if factor >= 2 and image.mode in ('L', 'RGB', 'RGBA', 'RGBX'):
+        image = image.reduce(factor)
+    image = image.convert('RGB')
+    if max(image.size) > max_side:
+        image.thumbnail((max_side, max_side), Image.Resampling.BILINEAR, reducing_gap=2.0)
+    return np.asarray(image)
+
+def skin_photo_indices(rgb, tile_rows=TILE_ROWS):
+    """
+    Raw optical indices of the skin in a uint8 RGB array, accumulated tile by tile:
+
+      * redness_index: mean a* of skin pixels (erythema);
+      * pigmentation_unevenness: standard deviation of L* over skin pixels;
+      * shine_fraction: share of specular highlights (bright, desaturated, warm) in the skin area;
+      * texture: mean |dL*| between neighbouring skin pixels;
+      * edge_density: share of those neighbour steps above EDGE_THRESHOLD (fine lines);
+      * skin_fraction: share of the photo classified as skin.
+
+    Skin is a warm hue with moderate saturation and brightness.
+    """
+    height, width = rgb.shape[:2]
+    skin_count = shine_count = edge_count = step_count = 0
+    sum_a = sum_l = sum_l2 = sum_step = 0.0
+    previous_l = previous_skin = None
+    for top in range(0, height, tile_rows):
+        tile = rgb[top:top + tile_rows]
+        lightness, a_star, _ = rgb_to_lab(tile)
+        saturation, value = rgb_to_sv(tile)
+        warm = warm_hue(tile)
+        skin = warm & (saturation >= 0.12) & (saturation <= 0.75) & (value >= 0.25)
+        shine = warm & (saturation < 0.12) & (value >= 0.9)
+
+        skin_count += int(skin.sum())
+        shine_count += int(shine.sum())
+        sum_a += float(a_star[skin].sum())
+        skin_l = lightness[skin].astype(np.float64)
+        sum_l += float(skin_l.sum())
+        sum_l2 += float(np.dot(skin_l, skin_l))
+
+        # Horizontal steps inside the tile, vertical steps including the seam with the tile above
+        column_l, column_skin = lightness, skin
+        if previous_l is not None:
+            column_l, column_skin = np.concatenate((previous_l, lightness)), np.concatenate((previous_skin, skin))
+        for step, both in ((np.abs(np.diff(lightness, axis=1)), skin[:, 1:] & skin[:, :-1]),
+                           (np.abs(np.diff(column_l, axis=0)), column_skin[1:] & column_skin[:-1])):
+            steps = step[both]
+            step_count += len(steps)
+            sum_step += float(steps.sum())
+            edge_count += int(np.count_nonzero(steps > EDGE_THRESHOLD))
+        previous_l, previous_skin = lightness[-1:], skin[-1:]
+
+    mean_l = sum_l / skin_count if skin_count else 0.0
+    return {
+        'skin_fraction': skin_count / (height * width) if height * width else 0.0,
+        'redness_index': sum_a / skin_count if skin_count else 0.0,
+        'pigmentation_unevenness': float(np.sqrt(max(sum_l2 / skin_count - mean_l ** 2, 0.0))) if skin_count else 0.0,
+        'shine_fraction': shine_count / (skin_count + shine_count) if skin_count + shine_count else 0.0,
+        'texture': sum_step / step_count if step_count else 0.0,
+        'edge_density': edge_count / step_count if step_count else 0.0,
+    }
+
+def analyze_skin_photo(source, max_side=ANALYSIS_MAX_SIDE):
+    """
+    Hyper-Logic 4.2 (Vision): Photo -> the Hyper-Analyzer report metrics, on the same
+    scales as the simulated ones. Optical proxies, not clinical measurements:
+    redness -> barrier strength, L* unevenness -> pigmentation index, specular shine
+    -> sebum rate, fine texture -> hydration, fine-line edges -> collagen integrity.
+    Raises ValueError when too little skin is visible.
+    """
+    rgb = load_photo(source, max_side)
+    indices = skin_photo_indices(rgb)
+    if indices['skin_fraction'] < MIN_SKIN_FRACTION:
+        raise ValueError("Not enough skin visible in the photo; use a well-lit, front-facing picture.")
+    metrics = {
+        'hydration_level_pct': _scale(indices['texture'], 1.0, 5.0, 70, 30),
+        'sebum_production_rate': _scale(indices['shine_fraction'], 0.0, 0.12, 20, 90),
+        'collagen_integrity_score_pct': _scale(indices['edge_density'], 0.0, 0.2, 95, 55),
+        'pigmentation_index': _scale(indices['pigmentation_unevenness'], 4.0, 16.0, 5, 40),
+        'barrier_strength_index': _scale(indices['redness_index'], 10.0, 25.0, 95, 60),
+    }
+    return {
+        'metrics': metrics,
+        'indices': {name: round(value, 4) for name, value in indices.items()},
+        'analyzed_size': [int(rgb.shape[1]), int(rgb.shape[0])],
+    }
@@ -0,0 +1,153 @@
+"""
+SkinovaAI background jobs: long-running work (Hyper-Analyzer runs) taken off the
+Streamlit script thread and run on a bounded pool. Standard library only.
+"""
+import itertools
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+JOB_STATES = ('queued', 'running', 'done', 'failed')
+
+class JobRejected(RuntimeError):
+    """Raised by JobQueue.submit when the queue or the user's concurrency limit is full."""
+
+
+def _timed_call(fn, args):
+    """Runs in the pool: fn(*args) plus the wall-clock time it started (module-level so it pickles)."""
+    started_at = time.time()
+    try:
+        return started_at, fn(*args)
+    except Exception as exc:
+        exc.started_at = started_at
+        raise
+
+
+class JobQueue:
+    """
+    Hyper-Logic 4.1 (Jobs): Bounded background job queue.
+
+    Jobs run on a fixed-size executor (a ThreadPoolExecutor by default; any
+    concurrent.futures executor works if the job and its arguments pickle). Admission
+    is bounded twice, so a burst of submissions cannot starve the rest of the app:
+    at most `max_pending` jobs queued or running overall, and at most
+    `per_user_limit` per user. `on_complete(result)` runs once the job succeeds,
+    before it is reported done. Finished jobs are kept for polling, oldest dropped first.
+    """
+
+    def __init__(self, max_workers=2, max_pending=32, per_user_limit=1, max_finished=1024, executor=None):
+        self.max_pending = max_pending
+        self.per_user_limit = per_user_limit
+        self.max_finished = max_finished
+        self._executor = executor or ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='skinova-job')
+        self._lock = threading.Lock()
+        self._ids = itertools.count(1)
+        self._jobs = {} # job id -> job record (queued/running)
+        self._finished = OrderedDict() # job id -> job record (done/failed), oldest first
+        self._active_by_user = {}
+        self.submitted = 0
+        self.completed = 0
+        self.failed = 0
+        self.rejected = 0
+        self.peak_depth = 0
+        self._wait_total = 0.0
+        self._run_total = 0.0
+
+    def submit(self, username, kind, fn, *args, on_complete=None):
+        """Queues fn(*args) for `username`; returns the job id, or raises JobRejected."""
+        with self._lock:
+            if len(self._jobs) >= self.max_pending:
+                self.rejected += 1
+                raise JobRejected(f"Job queue is full ({self.max_pending} pending)")
+            if self._active_by_user.get(username, 0) >= self.per_user_limit:
+                self.rejected += 1
+                raise JobRejected(f"{username} already has {self.per_user_limit} job(s) in progress")
+            job_id = next(self._ids)
+            self._jobs[job_id] = {
+                'id': job_id, 'username': username, 'kind': kind, 'state': 'queued', 'future': None,
+                'submitted_at': time.time(), 'started_at': None, 'finished_at': None,
+                'result': None, 'error': None,
+            }
+            self._active_by_user[username] = self._active_by_user.get(username, 0) + 1
+            self.submitted += 1
+            self.peak_depth = max(self.peak_depth, len(self._jobs))
+        try:
+            future = self._executor.submit(_timed_call, fn, args)
+        except RuntimeError as exc: # Executor shut down
+            self._finish(job_id, 'failed', None, error=str(exc))
+            raise JobRejected(str(exc)) from exc
+        with self._lock:
+            self._jobs[job_id]['future'] = future
+        future.add_done_callback(lambda done: self._complete(job_id, done, on_complete))
+        return job_id
+
+    def _complete(self, job_id, future, on_complete):
+        try:
+            started_at, result = future.result()
+            if on_complete is not None:
+                on_complete(result)
+        except Exception as exc:
+            self._finish(job_id, 'failed', getattr(exc, 'started_at', None), error=f"{type(exc).__name__}: {exc}")
+        else:
+            self._finish(job_id, 'done', started_at, result=result)
+
+    def _finish(self, job_id, state, started_at, result=None, error=None):
+        with self._lock:
+            job = self._jobs.pop(job_id)
+            job.pop('future', None)
+            job.update(state=state, result=result, error=error, finished_at=time.time())
+            job['started_at'] = started_at or job['started_at'] or job['submitted_at']
+            self._active_by_user[job['username']] -= 1
+            if not self._active_by_user[job['username']]:
+                del self._active_by_user[job['username']]
+            self._wait_total += job['started_at'] - job['submitted_at']
+            self._run_total += job['finished_at'] - job['started_at']
+            if state == 'done':
+                self.completed += 1
+            else:
+                self.failed += 1
+            self._finished[job_id] = job
+            while len(self._finished) > self.max_finished:
+                self._finished.popitem(last=False)
+
+    @staticmethod
+    def _snapshot(job):
+        snapshot = {key: value for key, value in job.items() if key != 'future'}
+        future = job.get('future')
+        if snapshot['state'] == 'queued' and future is not None and (future.running() or future.done()):
+            snapshot['state'] = 'running'
+        return snapshot
+
+    def status(self, job_id):
+        """A snapshot of the job record (state, timestamps, result or error), or None if unknown/expired."""
+        with self._lock:
+            job = self._jobs.get(job_id) or self._finished.get(job_id)
+            return self._snapshot(job) if job is not None else None
+
+    def active_jobs(self, username):
+        """Snapshots of the user's queued and running jobs, oldest first."""
+        with self._lock:
+            return [self._snapshot(job) for job in self._jobs.values() if job['username'] == username]
+
+    def stats(self):
+        """Queue-depth and throughput counters for monitoring."""
+        with self._lock:
+            finished = self.completed + self.failed
+            states = [self._snapshot(job)['state'] for job in self._jobs.values()]
+            return {
+                'queued': states.count('queued'),
+                'running': states.count('running'),
+                'depth': len(self._jobs),
+                'peak_depth': self.peak_depth,
+                'max_pending': self.max_pending,
+                'submitted': self.submitted,
+                'completed': self.completed,
+                'failed': self.failed,
+                'rejected': self.rejected,
+                'mean_wait_ms': round(self._wait_total / finished * 1000, 1) if finished else 0.0,
+                'mean_run_ms': round(self._run_total / finished * 1000, 1) if finished else 0.0,
+            }
+
+    def shutdown(self, wait=True):
+        self._executor.shutdown(wait=wait)
@@ -0,0 +1,215 @@
+"""
+SkinovaAI kit optimizer: one product per kit slot, chosen so the summed match score
+is as high as possible while the kit's total price stays under the user's budget
+ceiling (a multiple-choice knapsack over the matcher's candidate sets).
+"""
+import numpy as np
+
+from .metrics import METRICS
+
+# Onboarding stores labels like 'Low (Below ₹1500)'; the first word is the tier
+BUDGET_CEILINGS = {'Low': 1500, 'Mid': 4000, 'High': None}
+
+# (kit slot, catalog category filter, routine step types whose ingredient seeds the slot).
+# Step types are matched exactly: 'Cream' is a substring of 'Creamy Cleanser' too.
+KIT_SLOTS = (
+    ('Cleanser', 'Cleanser', ('Gel Cleanser', 'Creamy Cleanser', 'Foaming Cleanser')),
+    ('Sunscreen', 'Sunscreen', ('Mineral Zinc Oxide SPF 50+', 'Tinted Mineral SPF 50+')),
+    ('Moisturizer', 'Moisturizer', ('Barrier Repair Cream', 'Lightweight Gel-Cream')),
+    ('Active Serum', 'Serum', ('Antioxidant/Treatment Serum',)),
+    ('Active Night', 'Active Night', ('Regenerative Treatment',)),
+    ('Exfoliant', 'Exfoliant', ('Exfoliant',)),
+)
+KIT_SIZE = len(KIT_SLOTS)
+
+# Bounds that keep the solver inside its latency budget on large catalogs. Below them
+# the search is exact; above them frontiers and partial kits are thinned by score band.
+MAX_SLOT_CANDIDATES = 64
+MAX_STATES = 256
+
+def budget_tier(budget):
+    """'Low (Below ₹1500)' -> 'Low'."""
+    return str(budget or 'Mid').split(' ')[0]
+
+def budget_ceiling(budget):
+    """Kit price ceiling for a budget label; None means no ceiling."""
+    return BUDGET_CEILINGS.get(budget_tier(budget), BUDGET_CEILINGS['Mid'])
+
+def slot_candidates(routine, catalog, ceiling=None):
+    """
+    Candidate rows per kit slot: products in the slot's category, narrowed to those
+    carrying the ingredient of the routine step that fills it when any of them fits
+    under the ceiling. Products of other categories never fill a slot, whatever
+    ingredient they carry.
+    """
+    price = catalog.df['price'].to_numpy(dtype=float)
+    candidates = []
+    for slot, category, step_types in KIT_SLOTS:
+        rows = catalog.index.postings_containing('category', category)
+        ingredient = next((step.get('ingredient_key') for step in routine if step.get('type') in step_types), None)
+        if ingredient:
+            # Boolean-mask intersection: linear in the catalog, no sort of the concatenated postings
+            carries = np.zeros(len(catalog), dtype=bool)
+            carries[catalog.index.postings('active_ing', ingredient)] = True
+            seeded = rows[carries[rows]]
+            if len(seeded) and (ceiling is None or price[seeded].min() <= ceiling):
+                rows = seeded
+        candidates.append((slot, rows))
+    return candidates
+
+def _frontier_layers(cost, score, depth):
+    """
+    Positions of the points dominated (cheaper-or-equal and better-or-equal) by fewer
+    than `depth` others, cheapest first. A point with `depth` dominators is never
+    needed: at most depth - 1 of them can be taken by other slots.
+    """
+    candidates = np.arange(len(cost))
+    # O(n) cut first: anything pricier than the depth-th cheapest top-scoring point already
+    # has depth dominators, which on large catalogs leaves only a small cheap tail to sort
+    top_costs = cost[score == score.max()] if len(score) else cost
+    if len(top_costs) >= depth:
+        candidates = np.flatnonzero(cost <= np.partition(top_costs, depth - 1)[depth - 1])
+    order = candidates[np.lexsort((-score[candidates], cost[candidates]))]
+    keep = np.zeros(len(order), dtype=bool)
+    remaining = np.arange(len(order))
+    for _ in range(depth):
+        if len(remaining) == 0:
+            break
+        remaining_score = score[order[remaining]]
+        best_before = np.concatenate(([-np.inf], np.maximum.accumulate(remaining_score)[:-1]))
+        layer = remaining_score > best_before
+        keep[remaining[layer]] = True
+        remaining = remaining[~layer]
+    return order[keep]
+
+def _grouped_pareto(group, cost, score):
+    """Positions of the (cost, score) Pareto points within each group, cheapest first."""
+    order = np.lexsort((-score, cost, group))
+    sorted_group = group[order]
+    dense_group = np.cumsum(np.concatenate(([True], sorted_group[1:] != sorted_group[:-1]))) - 1
+    # Offset scores by group so one running max serves every group in turn
+    span = score.max() - score.min() + 1 if len(score) else 1
+    shifted = score[order] - score.min() + dense_group * span
+    best_before = np.concatenate(([-np.inf], np.maximum.accumulate(shifted)[:-1]))
+    kept = order[shifted > best_before]
+    return kept[np.argsort(cost[kept], kind='stable')]
+
+def _blocking_key(picks, later_rows):
+    """
+    One int64 per partial kit identifying which candidates of later slots it has used
+    (mixed radix over the later rows' positions); kits with equal keys are interchangeable.
+    """
+    later_rows = np.unique(later_rows)
+    if len(later_rows) == 0:
+        return np.zeros(len(picks), dtype=np.int64)
+    position = np.minimum(np.searchsorted(later_rows, picks), len(later_rows) - 1)
+    digit = np.where(later_rows[position] == picks, position + 1, 0)
+    digit = digit[:, digit.any(axis=0)]
+    radix = len(later_rows) + 1
+    if digit.shape[1] == 0:
+        return np.zeros(len(picks), dtype=np.int64)
+    if digit.shape[1] * np.log2(radix) >= 62:
+        return np.unique(digit, axis=0, return_inverse=True)[1].ravel()
+    return digit @ (radix ** np.arange(digit.shape[1], dtype=np.int64))
+
+def _thin(cost, score, buckets):
+    """
+    Positions of the cheapest point in each of `buckets` equal score bands, cheapest
+    first. Rounding scores rather than prices never makes a kit infeasible, and loses
+    at most one band width of score per merge.
+    """
+    width = max((score.max() - score.min()) / buckets, 1e-9)
+    band = np.floor((score - score.min()) / width).astype(np.int64)
+    order = np.lexsort((cost, band))
+    first_in_band = np.concatenate(([True], band[order][1:] != band[order][:-1]))
+    kept = order[first_in_band]
+    return kept[np.argsort(cost[kept], kind='stable')]
+
+@METRICS.timed('engine.optimize_kit')
+def optimize_kit(profile, routine, catalog, max_states=MAX_STATES, max_slot_candidates=MAX_SLOT_CANDIDATES):
+    """
+    Hyper-Logic 5.1: Budget-constrained kit. Picks at most one product per kit slot
+    (a slot is left empty when nothing fits) to maximize the summed match score with
+    total price <= the profile's budget ceiling. No product fills two slots.
+
+    Each slot is reduced to the few price/score frontier layers that can matter, then
+    slots are merged one at a time keeping only non-dominated partial kits (compared
+    among kits that hold the same products later slots could also use). That is exact
+    while frontiers and partial kits stay under the bounds; past them both are thinned
+    to the cheapest point per score band and the result is flagged approximate.
+    """
+    budget = profile.get('budget', 'Mid')
+    ceiling = budget_ceiling(budget)
+    score = catalog.matcher.base_scores(profile.get('primary_concerns', []), budget_tier(budget), [])
+    price = catalog.df['price'].to_numpy(dtype=float)
+
+    frontiers, unstocked, exact = [], [], True
+    for slot, rows in slot_candidates(routine, catalog, ceiling):
+        if len(rows) == 0:
+            unstocked.append(slot)
+        if ceiling is not None:
+            rows = rows[price[rows] <= ceiling]
+        rows = rows[_frontier_layers(price[rows], score[rows], KIT_SIZE)]
+        if len(rows) > max_slot_candidates:
+            rows = rows[_thin(price[rows], score[rows], max_slot_candidates)]
+            exact = False
+        frontiers.append((slot, rows))
+    limit = ceiling if ceiling is not None else np.inf
+
+    # Partial kits: total cost, total score and the row picked per slot so far (-1 = empty)
+    costs, scores = np.zeros(1), np.zeros(1)
+    picks = np.empty((1, 0), dtype=np.int64)
+    for i, (slot, rows) in enumerate(frontiers):
+        options = np.concatenate(([-1], rows))
+        option_cost = np.concatenate(([0.0], price[rows]))
+        option_score = np.concatenate(([0.0], score[rows]))
+        parent = np.repeat(np.arange(len(costs)), len(options))
+        option = np.tile(options, len(costs))
+        cost = (costs[:, None] + option_cost).ravel()
+        total = (scores[:, None] + option_score).ravel()
+        merged = np.column_stack((picks[parent], option))
+
+        feasible = cost <= limit
+        if picks.shape[1]:
+            feasible &= ~((picks[parent] == option[:, None]).any(axis=1) & (option >= 0))
+        kept = np.flatnonzero(feasible)
+
+        # Kits only compete when they block the same candidates of the slots still to fill
+        later = np.concatenate([rows for _, rows in frontiers[i + 1:]] + [np.empty(0, dtype=np.int64)])
+        group = _blocking_key(merged[kept], later)
+        kept = kept[_grouped_pareto(group, cost[kept], total[kept])]
+        if len(kept) > max_states:
+            kept = kept[_thin(cost[kept], total[kept], max_states)]
+            exact = False
+        costs, scores, picks = cost[kept], total[kept], merged[kept]
+
+    best = int(np.argmax(scores))
+    products, empty_slots = [], []
+    for (slot, _), row in zip(frontiers, picks[best]):
+        if row >= 0:
+            products.append(dict(catalog.record(int(row)), kit_slot=slot))
+        elif slot not in unstocked:
+            empty_slots.append(slot)
+    total_price, match_score = float(costs[best]), float(scores[best])
+
+    # Slots the catalog has no products for at all get the best-rated product that still fits
+    used_ids = {product['id'] for product in products}
+    for slot in unstocked:
+        affordable = catalog.rating_order[price[catalog.rating_order] <= limit - total_price]
+        row = next((int(row) for row in affordable if catalog.ids[row] not in used_ids), None)
+        if row is None:
+            empty_slots.append(slot)
+            continue
+        products.append(dict(catalog.record(row), kit_slot=slot))
+        used_ids.add(products[-1]['id'])
+        total_price += float(price[row])
+        match_score += float(score[row])
+
+    return {
+        'products': products,
+        'total_price': total_price,
+        'match_score': match_score,
+        'budget_ceiling': ceiling,
+        'empty_slots': empty_slots,
+        'exact': exact,
+    }
@@ -0,0 +1,222 @@
+"""
+SkinovaAI metrics: timing spans, counters and gauges for the hot paths, served as
+Prometheus text or JSON by an optional sidecar HTTP thread. Standard library only;
+http.server is only imported when the sidecar is started.
+"""
+import functools
+import json
+import os
+import threading
+import time
+from collections import deque
+
+# Latest samples kept per span; quantiles are computed over these when read
+METRICS_RESERVOIR = 1024
+QUANTILES = (0.5, 0.95)
+DEFAULT_METRICS_PORT = 9464
+
+class _Span:
+    __slots__ = ('registry', 'name', 'started')
+
+    def __init__(self, registry, name):
+        self.registry = registry
+        self.name = name
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.registry.observe(self.name, time.perf_counter() - self.started)
+        return False
+
+
+class _NoSpan:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+_NO_SPAN = _NoSpan()
+
+
+class Metrics:
+    """
+    Hyper-Logic 7 (Observability): Thread-safe in-process metrics registry.
+
+      * spans: durations per name (count, total and the latest METRICS_RESERVOIR
+        samples, from which p50/p95 are computed only when the metrics are read);
+      * counters (monotonic) and gauges (last value) by name;
+      * sources: callables returning a dict of numbers (e.g. JobQueue.stats),
+        sampled when the metrics are read.
+
+    Recording costs a perf_counter pair and one short lock; with `enabled` False,
+    span() returns a shared no-op and counters are skipped.
+    """
+
+    def __init__(self, reservoir=METRICS_RESERVOIR, enabled=True):
+        self.reservoir = reservoir
+        self.enabled = enabled
+        self._lock = threading.Lock()
+        self._spans = {} # name -> [count, total seconds, deque of recent samples]
+        self._counters = {}
+        self._gauges = {}
+        self._sources = {}
+
+    def span(self, name):
+        """Context manager timing its block under `name`."""
+        return _Span(self, name) if self.enabled else _NO_SPAN
+
+    def timed(self, name):
+        """Decorator timing every call of the function under `name`."""
+        def decorate(fn):
+            @functools.wraps(fn)
+            def wrapper(*args, **kwargs):
+                if not self.enabled:
+                    return fn(*args, **kwargs)
+                started = time.perf_counter()
+                try:
+                    return fn(*args, **kwargs)
+                finally:
+                    self.observe(name, time.perf_counter() - started)
+            return wrapper
+        return decorate
+
+    def observe(self, name, seconds):
+        with self._lock:
+            span = self._spans.get(name)
+            if span is None:
+                span = self._spans[name] = [0, 0.0, deque(maxlen=self.reservoir)]
+            span[0] += 1
+            span[1] += seconds
+            span[2].append(seconds)
+
+    def increment(self, name, amount=1):
+        if not self.enabled:
+            return
+        with self._lock:
+            self._counters[name] = self._counters.get(name, 0) + amount
+
+    def set_gauge(self, name, value):
+        if not self.enabled:
+            return
+        with self._lock:
+            self._gauges[name] = value
+
+    def register_source(self, name, stats):
+        """Adds (or replaces) a source whose stats() dict is sampled on every read."""
+        with self._lock:
+            self._sources[name] = stats
+
+    def reset(self):
+        with self._lock:
+            self._spans.clear()
+            self._counters.clear()
+            self._gauges.clear()
+
+    @staticmethod
+    def _quantile(ordered, q):
+        return ordered[min(int(q * len(ordered)), len(ordered) - 1)]
+
+    def snapshot(self):
+        """All metrics as plain data: spans (count, total/mean/p50/p95 ms), counters, gauges and source stats."""
+        with self._lock:
+            spans = {name: (count, total, sorted(samples)) for name, (count, total, samples) in self._spans.items()}
+            counters = dict(self._counters)
+            gauges = dict(self._gauges)
+            sources = dict(self._sources)
+        snapshot = {'spans': {}, 'counters': counters, 'gauges': gauges, 'sources': {}}
+        for name, (count, total, ordered) in sorted(spans.items()):
+            entry = {'count': count, 'total_ms': round(total * 1000, 3), 'mean_ms': round(total / count * 1000, 3)}
+            for q in QUANTILES:
+                entry[f"p{int(q * 100)}_ms"] = round(self._quantile(ordered, q) * 1000, 3)
+            snapshot['spans'][name] = entry
+        for name, stats in sources.items():
+            try:
+                values = stats()
+            except Exception as exc: # A failing source must not take the endpoint down
+                values = {'error': f"{type(exc).__name__}: {exc}"}
+            snapshot['sources'][name] = values
+        return snapshot
+
+    def to_json(self):
+        return json.dumps(self.snapshot(), sort_keys=True)
+
+    def to_prometheus(self, prefix='skinova'):
+        """The snapshot in the Prometheus text exposition format (version 0.0.4)."""
+        snapshot = self.snapshot()
+        lines = [f"# TYPE {prefix}_span_seconds summary"]
+        for name, entry in snapshot['spans'].items():
+            label = _label(name)
+            for q in QUANTILES:
+                lines.append(f'{prefix}_span_seconds{{span="{label}",quantile="{q}"}} {round(entry[f"p{int(q * 100)}_ms"] / 1000, 6)}')
+            lines.append(f'{prefix}_span_seconds_sum{{span="{label}"}} {round(entry["total_ms"] / 1000, 6)}')
+            lines.append(f'{prefix}_span_seconds_count{{span="{label}"}} {entry["count"]}')
+        lines.append(f"# TYPE {prefix}_events_total counter")
+        lines.extend(f'{prefix}_events_total{{name="{_label(name)}"}} {value}' for name, value in sorted(snapshot['counters'].items()))
+        lines.append(f"# TYPE {prefix}_gauge gauge")
+        lines.extend(f'{prefix}_gauge{{name="{_label(name)}"}} {value}' for name, value in sorted(snapshot['gauges'].items()))
+        lines.append(f"# TYPE {prefix}_source gauge")
+        for source, values in sorted(snapshot['sources'].items()):
+            for stat, value in sorted(values.items()):
+                # Only plain numbers are exported; nested or textual stats stay JSON-only
+                if isinstance(value, (int, float)) and not isinstance(value, bool):
+                    lines.append(f'{prefix}_source{{source="{_label(source)}",stat="{_label(stat)}"}} {value}')
+        return "\n".join(lines) + "\n"
+
+
+def _label(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+class MetricsServer:
+    """
+    Sidecar HTTP thread serving a Metrics registry:
+    GET /metrics (Prometheus text) and GET /metrics.json. Binds to localhost by default.
+    """
+
+    def __init__(self, registry, host='127.0.0.1', port=DEFAULT_METRICS_PORT):
+        from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                path = self.path.split('?')[0]
+                if path == '/metrics':
+                    body, content_type = registry.to_prometheus(), 'text/plain; version=0.0.4'
+                elif path == '/metrics.json':
+                    body, content_type = registry.to_json(), 'application/json'
+                else:
+                    self.send_error(404)
+                    return
+                payload = body.encode('utf-8')
+                self.send_response(200)
+                self.send_header('Content-Type', content_type)
+                self.send_header('Content-Length', str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def log_message(self, *args):
+                pass # Scrapes are too frequent to log
+
+        self._server = ThreadingHTTPServer((host, port), Handler) # Raises OSError if the port is taken
+        self._server.daemon_threads = True
+        self._thread = threading.Thread(target=self._server.serve_forever, name='skinova-metrics', daemon=True)
+
+    @property
+    def address(self):
+        return self._server.server_address
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+
+# Process-wide registry used by the engine and the app; SKINOVA_METRICS=0 turns recording off
+METRICS = Metrics(enabled=os.environ.get('SKINOVA_METRICS', '1') != '0')
@@ -0,0 +1,183 @@
+"""
+SkinovaAI result cache: content-addressed analysis results, shared by every session
+in the process (memory tier) and by every worker on the host (disk tier).
+Standard library only.
+"""
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+
+def content_key(data, version):
+    """sha256 over the engine version and the input bytes; same photo + same engine -> same key."""
+    digest = hashlib.sha256(f"{version}\0".encode())
+    digest.update(data)
+    return digest.hexdigest()
+
+
+class ResultCache:
+    """
+    Hyper-Database: Two-tier cache of JSON-serializable results keyed by content hash.
+
+      * memory: an LRU of up to `memory_entries` results;
+      * disk (optional): one JSON file per key under `directory`, written atomically
+        and evicted oldest-used first once the tier exceeds `disk_bytes`. Hits touch
+        the file, so recency is shared by every process using the directory.
+
+    Concurrent misses on the same key are computed once; the other callers wait for
+    that result. Counters report hits per tier, misses, input bytes and compute time
+    that hits saved.
+    """
+
+    def __init__(self, directory=None, memory_entries=256, disk_bytes=256 * 1024 * 1024):
+        self.directory = directory
+        self.memory_entries = memory_entries
+        self.disk_bytes = disk_bytes
+        self._memory = OrderedDict() # key -> (result, compute seconds)
+        self._lock = threading.Lock()
+        self._in_flight = {} # key -> Event set when its computation finishes
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.bytes_saved = 0
+        self.seconds_saved = 0.0
+        self.disk_evictions = 0
+        self._disk_usage = None
+        if directory is not None:
+            os.makedirs(directory, exist_ok=True)
+
+    def _path(self, key):
+        return os.path.join(self.directory, key[:2], f"{key}.json")
+
+    def _remember(self, key, entry):
+        with self._lock:
+            self._memory[key] = entry
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.memory_entries:
+                self._memory.popitem(last=False)
+
+    def _hit(self, tier, size, seconds):
+        with self._lock:
+            setattr(self, tier, getattr(self, tier) + 1)
+            self.bytes_saved += size
+            self.seconds_saved += seconds
+
+    def _read_disk(self, key):
+        if self.directory is None:
+            return None
+        path = self._path(key)
+        try:
+            with open(path, encoding='utf-8') as handle:
+                stored = json.load(handle)
+            os.utime(path)
+        except (OSError, ValueError):
+            return None
+        return stored['result'], stored['seconds']
+
+    def _write_disk(self, key, entry):
+        if self.directory is None:
+            return
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        payload = json.dumps({'result': entry[0], 'seconds': entry[1]}).encode('utf-8')
+        handle, temp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+        try:
+            with os.fdopen(handle, 'wb') as temp:
+                temp.write(payload)
+            os.replace(temp_path, path) # Atomic: readers see the old file or the whole new one
+        except OSError:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            return
+        with self._lock:
+            over_budget = self._disk_usage is None or self._disk_usage + len(payload) > self.disk_bytes
+            if not over_budget:
+                self._disk_usage += len(payload)
+        if over_budget:
+            self.evict_disk()
+
+    def evict_disk(self):
+        """Rescans the disk tier and deletes least recently used files until it fits in disk_bytes."""
+        if self.directory is None:
+            return
+        files = []
+        for shard in os.scandir(self.directory):
+            if not shard.is_dir():
+                continue
+            for entry in os.scandir(shard.path):
+                if entry.name.endswith('.json'):
+                    try:
+                        stat = entry.stat()
+                    except OSError:
+                        continue # Removed by another worker meanwhile
+                    files.append((stat.st_mtime, stat.st_size, entry.path))
+        usage = sum(size for _, size, _ in files)
+        evicted = 0
+        for _, size, path in sorted(files):
+            if usage <= self.disk_bytes:
+                break
+            try:
+                os.remove(path)
+                evicted += 1
+            except OSError:
+                pass
+            usage -= size
+        with self._lock:
+            self._disk_usage = usage
+            self.disk_evictions += evicted
+
+    def get_or_compute(self, data, version, compute):
+        """The result for (data, version): from memory, then disk, else compute() (once per key at a time)."""
+        key = content_key(data, version)
+        while True:
+            with self._lock:
+                entry = self._memory.get(key)
+                if entry is not None:
+                    self._memory.move_to_end(key)
+                else:
+                    waiting = self._in_flight.get(key)
+                    if waiting is None:
+                        self._in_flight[key] = threading.Event()
+            if entry is not None:
+                self._hit('memory_hits', len(data), entry[1])
+                return entry[0]
+            if waiting is None:
+                break
+            waiting.wait() # Another session is computing this key; its result lands in memory
+
+        try:
+            entry = self._read_disk(key)
+            if entry is not None:
+                self._remember(key, entry)
+                self._hit('disk_hits', len(data), entry[1])
+                return entry[0]
+            started = time.perf_counter()
+            result = compute()
+            entry = (result, time.perf_counter() - started)
+            with self._lock:
+                self.misses += 1
+            self._remember(key, entry)
+            self._write_disk(key, entry)
+            return result
+        finally:
+            with self._lock:
+                self._in_flight.pop(key).set()
+
+    def stats(self):
+        """Hit/miss counters, hit rate and what the hits saved, for monitoring."""
+        with self._lock:
+            hits = self.memory_hits + self.disk_hits
+            lookups = hits + self.misses
+            return {
+                'memory_hits': self.memory_hits,
+                'disk_hits': self.disk_hits,
+                'misses': self.misses,
+                'hit_rate': round(hits / lookups, 3) if lookups else 0.0,
+                'bytes_saved': self.bytes_saved,
+                'seconds_saved': round(self.seconds_saved, 3),
+                'memory_entries': len(self._memory),
+                'disk_evictions': self.disk_evictions,
+            }
@@ -0,0 +1,279 @@
+"""
+SkinovaAI marketplace search: a token index over product names, ingredients,
+categories and concerns with BM25 ranking, prefix matching and trigram-based typo
+tolerance. Built once per catalog (see Catalog.search_index) and shared by every
+session: the postings are read-only, and the one mutable part (the dense-score LRU)
+is guarded by a lock.
+"""
+import bisect
+import re
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+TOKEN_PATTERN = re.compile(r'[a-z0-9]+')
+
+# Per-field term-frequency weights (BM25F-style): a name hit counts more than a concern tag
+FIELD_WEIGHTS = {'name': 1.0, 'active_ing': 1.0, 'category': 0.7, 'concern_match': 0.5}
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+# Final score = BM25 relevance + RATING_WEIGHT * rating
+RATING_WEIGHT = 0.25
+
+# Query term expansion: prefix and typo matches count less than an exact token
+PREFIX_WEIGHT = 0.8
+FUZZY_WEIGHT = 0.7
+MIN_PREFIX_LENGTH = 2
+MIN_FUZZY_LENGTH = 4
+MAX_EXPANSIONS = 32
+
+# Terms in more than 1/HOT_TERM_FRACTION of the catalog keep a dense per-row score array
+# (LRU of DENSE_CACHE_SIZE), so intersecting with them is a gather instead of a scatter
+HOT_TERM_FRACTION = 8
+DENSE_CACHE_SIZE = 8
+
+def tokenize(text):
+    """Lowercase alphanumeric tokens."""
+    return TOKEN_PATTERN.findall(str(text).lower())
+
+def trigrams(term):
+    """Character trigrams of a term, padded so its first and last letters get their own."""
+    padded = f" {term} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+def edit_distance(a, b, limit):
+    """Levenshtein distance between a and b, or limit + 1 once it is known to exceed limit."""
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+    previous = list(range(len(b) + 1))
+    for i, char_a in enumerate(a, start=1):
+        current = [i]
+        for j, char_b in enumerate(b, start=1):
+            current.append(min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (char_a != char_b)))
+        if min(current) > limit:
+            return limit + 1
+        previous = current
+    return previous[-1]
+
+class SearchIndex:
+    """
+    Inverted index from tokens to (row, BM25 weight) postings, plus a sorted vocabulary
+    for prefix lookups and trigram postings over the vocabulary for typo tolerance.
+    Per-posting BM25 weights are precomputed, so a query only gathers and adds.
+    Safe to share across threads: everything but the dense-score LRU is immutable.
+    """
+
+    def __init__(self, catalog):
+        self.num_rows = n = len(catalog)
+        term_ids = {}
+        docs, terms, weights = [], [], []
+
+        # Names are free text: tokenized product by product
+        name_docs, name_terms = [], []
+        for row, name in enumerate(catalog.df['name'].to_numpy()):
+            for token in tokenize(name):
+                name_docs.append(row)
+                name_terms.append(term_ids.setdefault(token, len(term_ids)))
+        docs.append(np.asarray(name_docs, dtype=np.int64))
+        terms.append(np.asarray(name_terms, dtype=np.int64))
+        weights.append(np.full(len(name_docs), FIELD_WEIGHTS['name']))
+
+        # Coded fields: tokenize each distinct value once, then expand through the row codes
+        for field in ('active_ing', 'category', 'concern_match'):
+            rows, codes, vocabulary = catalog.coded(field)
+            value_tokens = [[term_ids.setdefault(token, len(term_ids)) for token in tokenize(value)] for value in vocabulary]
+            lengths = np.array([len(tokens) for tokens in value_tokens], dtype=np.int64)
+            flat = np.array([token for tokens in value_tokens for token in tokens], dtype=np.int64)
+            starts = np.cumsum(lengths) - lengths
+            counts = lengths[codes]
+            within = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+            docs.append(np.repeat(rows, counts))
+            terms.append(flat[np.repeat(starts[codes], counts) + within])
+            weights.append(np.full(int(counts.sum()), FIELD_WEIGHTS[field]))
+
+        docs, terms, weights = np.concatenate(docs), np.concatenate(terms), np.concatenate(weights)
+
+        # Weighted term frequency per (term, row), grouped by term with rows ascending
+        key = terms * max(n, 1) + docs
+        order = np.argsort(key, kind='stable')
+        key = key[order]
+        starts = np.flatnonzero(np.concatenate(([True], key[1:] != key[:-1]))) if len(key) else np.empty(0, dtype=np.int64)
+        tf = np.add.reduceat(weights[order], starts) if len(key) else np.empty(0)
+        pair_term, pair_doc = key[starts] // max(n, 1), key[starts] % max(n, 1)
+
+        doc_len = np.bincount(docs, weights=weights, minlength=n)
+        avg_len = doc_len.mean() if n and doc_len.mean() > 0 else 1.0
+        df = np.bincount(pair_term, minlength=len(term_ids))
+        idf = np.log1p((n - df + 0.5) / (df + 0.5))
+        bm25 = idf[pair_term] * tf * (BM25_K1 + 1) / (tf + BM25_K1 * (1 - BM25_B + BM25_B * doc_len[pair_doc] / avg_len))
+
+        self.term_offsets = np.searchsorted(pair_term, np.arange(len(term_ids) + 1))
+        self.posting_rows = pair_doc.astype(np.int32 if n < 2 ** 31 else np.int64)
+        self.posting_scores = bm25.astype(np.float32)
+        self.rating = catalog.df['rating'].to_numpy(dtype=np.float32)
+
+        self.terms = list(term_ids)
+        self._term_ids = term_ids
+        self._sorted_terms = sorted(term_ids)
+
+        # Trigram -> term ids, over alphabetic terms only (numbers are matched exactly or by prefix)
+        trigram_terms = {}
+        for term, term_id in term_ids.items():
+            if len(term) >= 3 and not term.isdigit():
+                for gram in trigrams(term):
+                    trigram_terms.setdefault(gram, []).append(term_id)
+        self._trigram_terms = {gram: np.asarray(ids, dtype=np.int64) for gram, ids in trigram_terms.items()}
+
+        for array in (self.term_offsets, self.posting_rows, self.posting_scores, self.rating):
+            array.flags.writeable = False
+        # Shared by every session using the index: an LRU guarded by a lock
+        self._dense_cache = OrderedDict()
+        self._dense_lock = threading.Lock()
+
+    def expand(self, token):
+        """
+        Vocabulary terms a query token stands for, as (term id, weight): the exact term,
+        terms it is a prefix of and, when neither exists, terms within a small edit distance.
+        """
+        expansions = []
+        exact = self._term_ids.get(token)
+        if exact is not None:
+            expansions.append((exact, 1.0))
+        if len(token) >= MIN_PREFIX_LENGTH:
+            i = bisect.bisect_right(self._sorted_terms, token)
+            while i < len(self._sorted_terms) and self._sorted_terms[i].startswith(token) and len(expansions) < MAX_EXPANSIONS:
+                expansions.append((self._term_ids[self._sorted_terms[i]], PREFIX_WEIGHT))
+                i += 1
+        if not expansions and len(token) >= MIN_FUZZY_LENGTH:
+            expansions = self._fuzzy(token)
+        return expansions
+
+    def _fuzzy(self, token):
+        limit = 1 if len(token) < 8 else 2
+        grams = trigrams(token)
+        hits = [self._trigram_terms[gram] for gram in grams if gram in self._trigram_terms]
+        if not hits:
+            return []
+        candidates, shared = np.unique(np.concatenate(hits), return_counts=True)
+        # One edit changes at most three trigrams, so anything sharing fewer cannot be within limit
+        plausible = shared >= len(grams) - 3 * limit
+        candidates, shared = candidates[plausible], shared[plausible]
+        expansions = []
+        for term_id in candidates[np.argsort(-shared, kind='stable')][:MAX_EXPANSIONS * 4]:
+            term = self.terms[term_id]
+            distance = edit_distance(token, term, limit)
+            if distance <= limit:
+                expansions.append((int(term_id), FUZZY_WEIGHT * (1 - distance / max(len(token), len(term)))))
+        return expansions[:MAX_EXPANSIONS]
+
+    def _dense_scores(self, term):
+        """BM25 weight of term for every row (0 where absent), cached for hot terms."""
+        with self._dense_lock:
+            dense = self._dense_cache.get(term)
+            if dense is not None:
+                self._dense_cache.move_to_end(term)
+                return dense
+        # Built outside the lock; a concurrent miss on the same term just builds the same array
+        dense = np.zeros(self.num_rows, dtype=np.float32)
+        start, end = self.term_offsets[term], self.term_offsets[term + 1]
+        dense[self.posting_rows[start:end]] = self.posting_scores[start:end]
+        dense.flags.writeable = False
+        with self._dense_lock:
+            self._dense_cache[term] = dense
+            self._dense_cache.move_to_end(term)
+            while len(self._dense_cache) > DENSE_CACHE_SIZE:
+                self._dense_cache.popitem(last=False)
+        return dense
+
+    def _token_postings(self, token):
+        """(rows ascending, best weighted BM25 per row, expansions) for one query token."""
+        expansions = self.expand(token)
+        if len(expansions) == 1:
+            term, weight = expansions[0]
+            start, end = self.term_offsets[term], self.term_offsets[term + 1]
+            scores = self.posting_scores[start:end]
+            return self.posting_rows[start:end], scores if weight == 1.0 else scores * np.float32(weight), expansions
+        parts = [(self.posting_rows[self.term_offsets[t]:self.term_offsets[t + 1]],
+                  self.posting_scores[self.term_offsets[t]:self.term_offsets[t + 1]] * np.float32(w)) for t, w in expansions]
+        rows = np.concatenate([p[0] for p in parts] + [np.empty(0, dtype=np.int64)])
+        scores = np.concatenate([p[1] for p in parts] + [np.empty(0, dtype=np.float32)])
+        # A row hit by several expansions keeps its best one
+        order = np.lexsort((-scores, rows))
+        rows, scores = rows[order], scores[order]
+        first = np.concatenate(([True], rows[1:] != rows[:-1])) if len(rows) else np.empty(0, dtype=bool)
+        return rows[first], scores[first], expansions
+
+    def search(self, query):
+        """
+        Rows matching every token of query (exactly, by prefix or by a near spelling),
+        ascending, with their relevance + rating score. None when the query has no tokens.
+        """
+        tokens = list(dict.fromkeys(tokenize(query)))
+        if not tokens:
+            return None
+        postings = sorted((self._token_postings(token) for token in tokens), key=lambda p: len(p[0]))
+        rows, relevance, _ = postings[0]
+        for token_rows, token_scores, expansions in postings[1:]:
+            if len(rows) == 0:
+                break
+            if len(expansions) == 1 and len(token_rows) * HOT_TERM_FRACTION > self.num_rows:
+                term, weight = expansions[0]
+                gathered = self._dense_scores(term)[rows] * np.float32(weight)
+            elif len(rows) * 16 < len(token_rows):
+                # Few survivors: binary-search them in the longer posting
+                position = np.minimum(np.searchsorted(token_rows, rows), max(len(token_rows) - 1, 0))
+                hit = token_rows[position] == rows if len(token_rows) else np.zeros(len(rows), dtype=bool)
+                gathered = np.where(hit, token_scores[position] if len(token_rows) else 0, 0)
+            else:
+                # Comparable sizes: scatter the posting into a dense score array and gather
+                dense = np.zeros(self.num_rows, dtype=np.float32)
+                dense[token_rows] = token_scores
+                gathered = dense[rows]
+            hit = gathered > 0
+            rows, relevance = rows.compress(hit), relevance.compress(hit) + gathered.compress(hit)
+        return rows, relevance + np.float32(RATING_WEIGHT) * self.rating[rows]
+
+class RankedRows:
+    """
+    Rows (ascending on input) in descending score order, ties by row, ranked lazily:
+    only the prefix that has been read is sorted, so paging through the top of a huge
+    result set costs a partition per page instead of a full sort. Supports len() and slicing.
+    """
+    RANK_AHEAD = 240
+
+    def __init__(self, rows, scores):
+        self._rest_rows, self._rest_scores = np.asarray(rows), np.asarray(scores)
+        self._ranked = np.empty(0, dtype=self._rest_rows.dtype)
+        self._length = len(self._rest_rows)
+
+    def __len__(self):
+        return self._length
+
+    def _rank_through(self, stop):
+        needed = min(stop, self._length) - len(self._ranked)
+        if needed <= 0:
+            return
+        take = min(max(needed, self.RANK_AHEAD), len(self._rest_rows))
+        if take < len(self._rest_rows):
+            # Everything above the take-th best score, then the lowest rows tied at it
+            kth = -np.partition(-self._rest_scores, take - 1)[take - 1]
+            above = np.flatnonzero(self._rest_scores > kth)
+            tied = np.flatnonzero(self._rest_scores == kth)[:take - len(above)]
+            chosen = np.concatenate((above, tied))
+        else:
+            chosen = np.arange(len(self._rest_rows))
+        chosen = chosen[np.lexsort((self._rest_rows[chosen], -self._rest_scores[chosen]))]
+        self._ranked = np.concatenate((self._ranked, self._rest_rows[chosen]))
+        remaining = np.ones(len(self._rest_rows), dtype=bool)
+        remaining[chosen] = False
+        self._rest_rows, self._rest_scores = self._rest_rows[remaining], self._rest_scores[remaining]
+
+    def __getitem__(self, key):
+        if isinstance(key, slice):
+            self._rank_through(key.indices(self._length)[1])
+            return self._ranked[key]
+        index = key + self._length if key < 0 else key
+        self._rank_through(index + 1)
+        return self._ranked[index]
@@ -0,0 +1,156 @@
+"""
+SkinovaAI score time series: each user's skin-score history as typed NumPy columns,
+with the dashboard's trend line maintained incrementally instead of refit per view.
+"""
+import threading
+from collections import OrderedDict
+from datetime import date
+
+import numpy as np
+
+# The dashboard charts (and fits its trend over) the last TREND_WINDOW scores
+TREND_WINDOW = 30
+PROJECTION_DAYS = 7
+PROJECTION_CEILING = 98
+
+class ScoreSeries:
+    """
+    Hyper-Logic 3.1 (Analytics): Append-only score history of one user.
+
+    Day ordinals (int32) and scores (int8) live in parallel arrays that double in
+    capacity when full, so appends are amortized O(1). The least-squares trend over
+    the last TREND_WINDOW points (x = position in the series, as np.polyfit over the
+    chart's points would see it) is kept as running sums that move with the window,
+    so the slope and projection cost O(1) no matter how long the history is.
+    """
+
+    def __init__(self, capacity=64, window=TREND_WINDOW):
+        self.window = window
+        self._days = np.empty(capacity, dtype=np.int32)
+        self._scores = np.empty(capacity, dtype=np.int8)
+        self._length = 0
+        # Sums over the window: y, x*y (exact Python ints; x sums follow from the bounds)
+        self._sum_y = 0
+        self._sum_xy = 0
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_points(cls, points, window=TREND_WINDOW):
+        """Builds a series from (day ordinal, score) pairs, oldest first."""
+        points = np.asarray(list(points), dtype=np.int64).reshape(-1, 2)
+        series = cls(capacity=max(64, 1 << int(len(points)).bit_length()), window=window)
+        series._days[:len(points)] = points[:, 0]
+        series._scores[:len(points)] = points[:, 1]
+        series._length = len(points)
+        start = max(len(points) - window, 0)
+        x = np.arange(start, len(points), dtype=np.int64)
+        y = points[start:, 1]
+        series._sum_y, series._sum_xy = int(y.sum()), int((x * y).sum())
+        return series
+
+    @classmethod
+    def from_log(cls, score_log, window=TREND_WINDOW):
+        """Builds a series from score_log entries ({'date': ISO date, 'score': int}), oldest first."""
+        return cls.from_points(((date.fromisoformat(entry['date']).toordinal(), entry['score'])
+                                for entry in score_log if entry.get('score') is not None), window)
+
+    def __len__(self):
+        return self._length
+
+    def append(self, day, score):
+        """Adds one score (day as a date ordinal); amortized O(1)."""
+        with self._lock:
+            n = self._length
+            if n == len(self._days):
+                self._days = np.concatenate((self._days, np.empty_like(self._days)))
+                self._scores = np.concatenate((self._scores, np.empty_like(self._scores)))
+            self._days[n], self._scores[n] = day, score
+            self._sum_y += int(score)
+            self._sum_xy += n * int(score)
+            if n >= self.window:
+                dropped = n - self.window
+                self._sum_y -= int(self._scores[dropped])
+                self._sum_xy -= dropped * int(self._scores[dropped])
+            self._length = n + 1
+
+    @property
+    def last(self):
+        """(day ordinal, score) of the newest point, or None."""
+        n = self._length
+        return (int(self._days[n - 1]), int(self._scores[n - 1])) if n else None
+
+    @property
+    def version(self):
+        """Changes whenever a point is added; suitable as a cache key."""
+        return (self._length, self.last)
+
+    def tail(self, count=TREND_WINDOW):
+        """(days, scores) of the newest `count` points as datetime64[D] and int arrays (copies)."""
+        n = self._length
+        start = max(n - count, 0)
+        days = (self._days[start:n].astype(np.int64) - date(1970, 1, 1).toordinal()).astype('datetime64[D]')
+        return days, self._scores[start:n].astype(np.int64)
+
+    def trend(self):
+        """(slope, intercept) of the least-squares line over the window, x = series position; None below 2 points."""
+        n = self._length
+        count = min(n, self.window)
+        if count < 2:
+            return None
+        first = n - count
+        sum_x = count * (first + n - 1) // 2
+        sum_xx = (n - 1) * n * (2 * n - 1) // 6 - (first - 1) * first * (2 * first - 1) // 6
+        denominator = count * sum_xx - sum_x * sum_x
+        slope = (count * self._sum_xy - sum_x * self._sum_y) / denominator
+        intercept = (self._sum_y - slope * sum_x) / count
+        return slope, intercept
+
+    def projection(self, days=PROJECTION_DAYS, ceiling=PROJECTION_CEILING):
+        """(dates, scores) of the trend extended `days` points past the newest one; None below 2 points."""
+        fit = self.trend()
+        if fit is None:
+            return None
+        slope, intercept = fit
+        n = self._length
+        future_x = np.arange(n, n + days)
+        last_day = (int(self._days[n - 1]) - date(1970, 1, 1).toordinal())
+        dates = np.arange(last_day + 1, last_day + days + 1).astype('datetime64[D]')
+        return dates, np.minimum(intercept + slope * future_x, ceiling)
+
+
+class ScoreSeriesCache:
+    """
+    Bounded, thread-safe LRU of ScoreSeries by username. A series is loaded once from
+    the store and then kept current with O(1) appends; a lookup whose newest logged
+    score disagrees with the cached series (written by another process) reloads it.
+    """
+
+    def __init__(self, maxsize=4096):
+        self.maxsize = maxsize
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, username, load, last=None):
+        """
+        The user's series. `load()` returns (day, score) points when it must be (re)built;
+        `last` is the newest (day, score) the caller knows of, if any.
+        """
+        with self._lock:
+            series = self._entries.get(username)
+            if series is not None and (last is None or series.last == last):
+                self._entries.move_to_end(username)
+                return series
+        series = ScoreSeries.from_points(load())
+        with self._lock:
+            self._entries[username] = series
+            self._entries.move_to_end(username)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+        return series
+
+    def append(self, username, day, score):
+        """Appends to the user's series if it is loaded (otherwise the next get() loads it)."""
+        with self._lock:
+            series = self._entries.get(username)
+        if series is not None:
+            series.append(day, score)
@@ -0,0 +1,527 @@
+"""
+SkinovaAI user store: durable users, rolling compliance and partitioned history.
+Standard library only (sqlite3), so it imports in a few milliseconds.
+"""
+import atexit
+import hashlib
+import heapq
+import hmac
+import json
+import logging
+import os
+import sqlite3
+import struct
+import threading
+import time
+from contextlib import contextmanager
+from datetime import date, datetime
+
+logger = logging.getLogger(__name__)
+
+USER_STORE_SCHEMA = """
+    CREATE TABLE IF NOT EXISTS users (
+        username TEXT PRIMARY KEY,
+        password TEXT NOT NULL,
+        profile TEXT NOT NULL DEFAULT '{}',
+        onboarding_complete INTEGER NOT NULL DEFAULT 0,
+        current_routine TEXT NOT NULL DEFAULT '[]',
+        skin_score INTEGER NOT NULL DEFAULT 75,
+        routine_streak INTEGER NOT NULL DEFAULT 0,
+        last_checkin_date TEXT,
+        compliance_ring BLOB,
+        profile_version INTEGER NOT NULL DEFAULT 0,
+        routine_version INTEGER NOT NULL DEFAULT 0
+    );
+    CREATE TABLE IF NOT EXISTS user_events (
+        seq INTEGER PRIMARY KEY,
+        username TEXT NOT NULL,
+        kind TEXT NOT NULL,
+        payload TEXT NOT NULL
+    );
+    CREATE INDEX IF NOT EXISTS idx_user_events_user ON user_events (username, kind, seq);
+"""
+
+HISTORY_LOG_SCHEMA = """
+    CREATE TABLE IF NOT EXISTS history_events (
+        username TEXT NOT NULL,
+        kind INTEGER NOT NULL,
+        month INTEGER NOT NULL,
+        day INTEGER NOT NULL,
+        seq INTEGER NOT NULL,
+        activity TEXT,
+        m_done INTEGER,
+        e_done INTEGER,
+        score INTEGER,
+        delta INTEGER,
+        ts REAL,
+        extra TEXT,
+        PRIMARY KEY (username, kind, month, day, seq)
+    ) WITHOUT ROWID;
+    CREATE INDEX IF NOT EXISTS idx_history_events_age ON history_events (kind, month);
+    CREATE TABLE IF NOT EXISTS history_daily (
+        username TEXT NOT NULL,
+        kind INTEGER NOT NULL,
+        month INTEGER NOT NULL,
+        day INTEGER NOT NULL,
+        events INTEGER NOT NULL,
+        m_done INTEGER NOT NULL,
+        e_done INTEGER NOT NULL,
+        score INTEGER,
+        delta INTEGER,
+        PRIMARY KEY (username, kind, month, day)
+    ) WITHOUT ROWID;
+"""
+
+# Raw events older than this many days are rolled up into daily summaries (None keeps them forever)
+HISTORY_RETENTION_DAYS = {'compliance_log': 180, 'score_log': 365, 'routine_history': 365, 'analytics_reports': None}
+# How much history get_user loads for the pages
+HISTORY_WINDOW_DAYS = 90
+
+def json_default(value):
+    """Lets NumPy scalars coming from the catalog serialize as plain JSON numbers."""
+    if hasattr(value, 'item'):
+        return value.item()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+# Passwords are stored as salted scrypt hashes: 'scrypt$n$r$p$salt$digest' (hex)
+PASSWORD_SCRYPT_PARAMS = {'n': 2 ** 14, 'r': 8, 'p': 1}
+
+def hash_password(password, salt=None, **params):
+    """Salted scrypt hash of a password, with its parameters, as one string."""
+    params = {**PASSWORD_SCRYPT_PARAMS, **params}
+    salt = os.urandom(16) if salt is None else salt
+    digest = hashlib.scrypt(password.encode('utf-8'), salt=salt, dklen=32, **params)
+    return f"scrypt${params['n']}${params['r']}${params['p']}${salt.hex()}${digest.hex()}"
+
+def verify_password(password, stored):
+    """True if password matches a hash_password() string; the digests are compared in constant time."""
+    try:
+        scheme, n, r, p, salt, digest = stored.split('$')
+        if scheme != 'scrypt':
+            return False
+        expected = bytes.fromhex(digest)
+        candidate = hashlib.scrypt(password.encode('utf-8'), salt=bytes.fromhex(salt), n=int(n), r=int(r), p=int(p), dklen=len(expected))
+    except ValueError:
+        return False
+    return hmac.compare_digest(candidate, expected)
+
+COMPLIANCE_WINDOW_DAYS = 14
+
+class ComplianceCounter:
+    """
+    Rolling daily compliance aggregate for one user.
+    A day-indexed ring of m_done/e_done flags covering today and the previous
+    COMPLIANCE_WINDOW_DAYS days, plus a running count of fully compliant days,
+    so check-ins and reads cost O(1) regardless of how long the history is.
+    """
+    SLOTS = COMPLIANCE_WINDOW_DAYS + 1
+    MORNING, EVENING, FULL = 1, 2, 3
+
+    def __init__(self, last_day=0, flags=None):
+        self.last_day = last_day
+        self.flags = bytearray(flags) if flags is not None else bytearray(self.SLOTS)
+        self.full_days = sum(1 for f in self.flags if f == self.FULL)
+
+    def advance(self, day):
+        """Rolls the window forward to `day` (date ordinal), clearing slots that fall out of it."""
+        if day <= self.last_day:
+            return
+        for d in range(max(self.last_day + 1, day - self.SLOTS + 1), day + 1):
+            slot = d % self.SLOTS
+            if self.flags[slot] == self.FULL:
+                self.full_days -= 1
+            self.flags[slot] = 0
+        self.last_day = day
+
+    def record(self, day, m_done, e_done):
+        """Marks the morning/evening ritual of `day` as done."""
+        if day <= self.last_day - self.SLOTS:
+            return # Older than the window
+        self.advance(day)
+        slot = day % self.SLOTS
+        was_full = self.flags[slot] == self.FULL
+        self.flags[slot] |= (self.MORNING if m_done else 0) | (self.EVENING if e_done else 0)
+        if not was_full and self.flags[slot] == self.FULL:
+            self.full_days += 1
+
+    def compliant_days(self, today):
+        """Fully compliant days in [today - COMPLIANCE_WINDOW_DAYS, today]."""
+        if today >= self.last_day + self.SLOTS:
+            return 0
+        if today <= self.last_day:
+            return self.full_days
+        window = ComplianceCounter(self.last_day, self.flags)
+        window.advance(today)
+        return window.full_days
+
+    def to_bytes(self):
+        return struct.pack('<i', self.last_day) + bytes(self.flags)
+
+    @classmethod
+    def from_bytes(cls, blob):
+        return cls(struct.unpack_from('<i', blob)[0], blob[4:])
+
+    @classmethod
+    def from_log(cls, compliance_log):
+        """One-off rebuild from a legacy compliance_log."""
+        counter = cls()
+        for log in compliance_log:
+            if log.get('m_done') or log.get('e_done'):
+                counter.record(date.fromisoformat(log['date']).toordinal(), log.get('m_done'), log.get('e_done'))
+        return counter
+
+class HistoryLog:
+    """
+    Hyper-Database: Time-partitioned user history log.
+    Events are stored as typed rows clustered by (user, kind, month), so range
+    queries only read the month partitions they cover. Raw events older than the
+    per-kind retention are rolled up into one summary row per day.
+    """
+    KIND_CODES = {'score_log': 1, 'compliance_log': 2, 'analytics_reports': 3, 'routine_history': 4}
+    TYPED_KEYS = ('date', 'activity', 'm_done', 'e_done', 'score', 'delta', 'timestamp')
+    COLUMNS = 'day, seq, activity, m_done, e_done, score, delta, ts, extra'
+
+    def __init__(self, retention_days=HISTORY_RETENTION_DAYS):
+        self.retention_days = dict(retention_days)
+        self._seq = 0
+        self._seq_lock = threading.Lock()
+
+    @staticmethod
+    def month_of(day):
+        d = date.fromordinal(day)
+        return d.year * 100 + d.month
+
+    def _next_seq(self):
+        """Monotonic event sequence (nanosecond clock, never repeating within the process)."""
+        with self._seq_lock:
+            self._seq = max(self._seq + 1, time.time_ns())
+            return self._seq
+
+    def encode(self, username, kind, entry):
+        """History dict -> typed history_events row."""
+        day = date.fromisoformat(entry.get('date') or date.today().isoformat()).toordinal()
+        extra = {k: v for k, v in entry.items() if k not in self.TYPED_KEYS}
+        flag = lambda key: None if entry.get(key) is None else int(bool(entry[key]))
+        return (
+            username, self.KIND_CODES[kind], self.month_of(day), day, self._next_seq(),
+            entry.get('activity'), flag('m_done'), flag('e_done'), entry.get('score'),
+            None if entry.get('delta') is None else int(entry['delta']),
+            datetime.fromisoformat(entry['timestamp']).timestamp() if entry.get('timestamp') else None,
+            json.dumps(extra, default=json_default) if extra else None
+        )
+
+    @staticmethod
+    def decode(row):
+        """Typed history_events row -> history dict (classic shape)."""
+        day, _, activity, m_done, e_done, score, delta, ts, extra = row
+        entry = {'date': date.fromordinal(day).isoformat()}
+        if activity is not None:
+            entry['activity'] = activity
+        if m_done is not None:
+            entry['m_done'] = bool(m_done)
+        if e_done is not None:
+            entry['e_done'] = bool(e_done)
+        if score is not None:
+            entry['score'] = score
+        if delta is not None:
+            entry['delta'] = f"{'+' if delta >= 0 else '-'}{abs(delta)}"
+        if ts is not None:
+            entry['timestamp'] = datetime.fromtimestamp(ts).isoformat()
+        if extra:
+            entry.update(json.loads(extra))
+        return entry
+
+    @staticmethod
+    def decode_summary(kind, row):
+        """history_daily row -> one synthetic entry for that day."""
+        day, events, m_done, e_done, score, delta = row
+        entry = {'date': date.fromordinal(day).isoformat()}
+        if kind == 'score_log' and score is not None:
+            entry.update(score=score, delta=f"{'+' if (delta or 0) >= 0 else '-'}{abs(delta or 0)}")
+        else:
+            entry.update(activity=f'Daily Summary ({events} events)', m_done=bool(m_done), e_done=bool(e_done))
+        return entry
+
+    def insert(self, conn, rows):
+        conn.executemany(f"INSERT INTO history_events (username, kind, month, {self.COLUMNS}) VALUES ({', '.join('?' * 12)})", rows)
+
+    def range(self, conn, username, kind, start_day=None, end_day=None):
+        """Entries of one log between two date ordinals (inclusive), oldest first; touches only the covered months."""
+        start_day = start_day if start_day is not None else 1
+        end_day = end_day if end_day is not None else date.max.toordinal()
+        bounds = (username, self.KIND_CODES[kind], self.month_of(start_day), self.month_of(end_day), start_day, end_day)
+        where = 'username = ? AND kind = ? AND month BETWEEN ? AND ? AND day BETWEEN ? AND ?'
+        summaries = ((row[0], self.decode_summary(kind, row)) for row in conn.execute(
+            f"SELECT day, events, m_done, e_done, score, delta FROM history_daily WHERE {where} ORDER BY month, day", bounds))
+        raw = ((row[0], self.decode(row)) for row in conn.execute(
+            f"SELECT {self.COLUMNS} FROM history_events WHERE {where} ORDER BY month, day, seq", bounds))
+        return [entry for _, entry in heapq.merge(summaries, raw, key=lambda item: item[0])]
+
+    def score_points(self, conn, username):
+        """(day ordinal, score) of every logged score, oldest first, without building entry dicts."""
+        kind = self.KIND_CODES['score_log']
+        return conn.execute(
+            "SELECT day, score FROM (SELECT month, day, 0 AS seq, score FROM history_daily WHERE username = ? AND kind = ? AND score IS NOT NULL"
+            " UNION ALL SELECT month, day, seq, score FROM history_events WHERE username = ? AND kind = ? AND score IS NOT NULL)"
+            " ORDER BY month, day, seq", (username, kind, username, kind)
+        ).fetchall()
+
+    def compact(self, conn, today=None):
+        """Rolls raw events past their retention into daily summaries and drops them."""
+        today = (today or date.today()).toordinal()
+        for kind, days in self.retention_days.items():
+            if days is None:
+                continue
+            cutoff = today - days
+            bounds = (self.KIND_CODES[kind], self.month_of(cutoff), cutoff)
+            last_of_day = lambda col: (f"(SELECT {col} FROM history_events AS last WHERE last.username = h.username AND last.kind = h.kind "
+                                       f"AND last.month = h.month AND last.day = h.day AND last.{col} IS NOT NULL ORDER BY last.seq DESC LIMIT 1)")
+            conn.execute(f"""
+                INSERT INTO history_daily (username, kind, month, day, events, m_done, e_done, score, delta)
+                SELECT username, kind, month, day, COUNT(*), SUM(COALESCE(m_done, 0)) > 0, SUM(COALESCE(e_done, 0)) > 0,
+                       {last_of_day('score')}, {last_of_day('delta')}
+                FROM history_events AS h
+                WHERE kind = ? AND month <= ? AND day < ?
+                GROUP BY username, kind, month, day
+                ON CONFLICT (username, kind, month, day) DO UPDATE SET
+                    events = events + excluded.events,
+                    m_done = MAX(m_done, excluded.m_done),
+                    e_done = MAX(e_done, excluded.e_done),
+                    score = COALESCE(excluded.score, score),
+                    delta = COALESCE(excluded.delta, delta)
+            """, bounds)
+            conn.execute('DELETE FROM history_events WHERE kind = ? AND month <= ? AND day < ?', bounds)
+
+    def migrate_legacy(self, conn):
+        """Moves JSON history rows written before the partitioned log existed."""
+        kinds = tuple(self.KIND_CODES)
+        legacy = conn.execute(
+            f"SELECT username, kind, payload FROM user_events WHERE kind IN ({', '.join('?' * len(kinds))}) ORDER BY seq", kinds
+        ).fetchall()
+        if legacy:
+            self.insert(conn, [self.encode(username, kind, json.loads(payload)) for username, kind, payload in legacy])
+            conn.execute(f"DELETE FROM user_events WHERE kind IN ({', '.join('?' * len(kinds))})", kinds)
+
+class UserStore:
+    """
+    Hyper-Database: Durable user store backed by SQLite (WAL mode).
+    One row per user holds the scalar/JSON fields; the history logs live in the
+    partitioned HistoryLog and the consultation history in an append-only event table.
+    compliance_log and score_log appends are buffered and group-committed by a
+    background flusher (which also runs history compaction), and reads flush first
+    so a session always sees its own writes.
+    """
+    FIELDS = ('password', 'profile', 'onboarding_complete', 'current_routine', 'skin_score', 'routine_streak', 'last_checkin_date',
+              'profile_version', 'routine_version')
+    JSON_FIELDS = ('profile', 'current_routine')
+    HISTORY_KINDS = ('score_log', 'compliance_log', 'analytics_reports', 'routine_history')
+    EVENT_KINDS = HISTORY_KINDS + ('consultation_history',)
+    BATCHED_KINDS = ('compliance_log', 'score_log')
+    LOCK_STRIPES = 64
+
+    def __init__(self, path, flush_interval=0.05, max_batch=256,
+                 retention_days=HISTORY_RETENTION_DAYS, compaction_interval=3600):
+        self.path = path
+        self.flush_interval = flush_interval
+        self.max_batch = max_batch
+        self.history = HistoryLog(retention_days)
+        self.compaction_interval = compaction_interval
+        self._next_compaction = 0
+        self._local = threading.local()
+        self._user_locks = [threading.RLock() for _ in range(self.LOCK_STRIPES)]
+        self._pending = []
+        self._pending_lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        conn = self._conn()
+        conn.executescript(USER_STORE_SCHEMA)
+        conn.executescript(HISTORY_LOG_SCHEMA)
+        columns = {row[1] for row in conn.execute('PRAGMA table_info(users)')}
+        if 'compliance_ring' not in columns:
+            conn.execute('ALTER TABLE users ADD COLUMN compliance_ring BLOB')
+        for column in ('profile_version', 'routine_version'):
+            if column not in columns:
+                conn.execute(f'ALTER TABLE users ADD COLUMN {column} INTEGER NOT NULL DEFAULT 0')
+        with self._transaction() as migration:
+            self.history.migrate_legacy(migration)
+            # Databases written before passwords were hashed: hash the plaintext ones in place
+            for username, password in migration.execute("SELECT username, password FROM users WHERE password NOT LIKE 'scrypt$%'").fetchall():
+                migration.execute('UPDATE users SET password = ? WHERE username = ?', (hash_password(password), username))
+        self.flush_failures = 0
+        threading.Thread(target=self._flush_loop, name='user-store-flusher', daemon=True).start()
+        atexit.register(self.flush)
+
+    def _conn(self):
+        """One connection per thread (Streamlit runs each session on its own thread)."""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5.0, isolation_level=None)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            conn.execute('PRAGMA busy_timeout=5000')
+            self._local.conn = conn
+        return conn
+
+    @contextmanager
+    def _transaction(self, mode='IMMEDIATE'):
+        conn = self._conn()
+        conn.execute(f'BEGIN {mode}')
+        try:
+            yield conn
+        except BaseException:
+            conn.execute('ROLLBACK')
+            raise
+        conn.execute('COMMIT')
+
+    def user_lock(self, username):
+        """Per-user lock (striped) guarding read-modify-write sequences on one user."""
+        return self._user_locks[hash(username) % self.LOCK_STRIPES]
+
+    def user_exists(self, username):
+        return self._conn().execute('SELECT 1 FROM users WHERE username = ?', (username,)).fetchone() is not None
+
+    def check_password(self, username, password):
+        row = self._conn().execute('SELECT password FROM users WHERE username = ?', (username,)).fetchone()
+        return row is not None and verify_password(password, row[0])
+
+    def create_user(self, username, password, skin_score=75, score_log=()):
+        """Atomically creates a user with its initial score log. Returns False if the username is taken."""
+        if self.user_exists(username):
+            return False # Skip the (deliberately slow) hash; the insert below still guards races
+        password_hash = hash_password(password)
+        with self._transaction() as conn:
+            created = conn.execute(
+                'INSERT OR IGNORE INTO users (username, password, skin_score) VALUES (?, ?, ?)',
+                (username, password_hash, skin_score)
+            ).rowcount == 1
+            if created:
+                self.history.insert(conn, [self.history.encode(username, 'score_log', entry) for entry in score_log])
+        return created
+
+    def get_user(self, username, with_history=True, history_days=HISTORY_WINDOW_DAYS):
+        """
+        Loads a user record in the classic user_db shape, or None if the user does not exist.
+        History logs are limited to the last `history_days` days (None loads everything).
+        """
+        if with_history:
+            self.flush() # Always: a batch the flusher has taken but not committed is not in _pending
+        with self._transaction('DEFERRED') as conn:
+            row = conn.execute(f"SELECT {', '.join(self.FIELDS)}, compliance_ring FROM users WHERE username = ?", (username,)).fetchone()
+            if row is None:
+                return None
+            user = {'username': username, **dict(zip(self.FIELDS, row))}
+            user['compliance'] = self._compliance_counter(conn, username, row[-1])
+            for field in self.JSON_FIELDS:
+                user[field] = json.loads(user[field])
+            user['onboarding_complete'] = bool(user['onboarding_complete'])
+            if with_history:
+                start_day = date.today().toordinal() - history_days if history_days is not None else None
+                user['history'] = {kind: self.history.range(conn, username, kind, start_day) for kind in self.HISTORY_KINDS}
+                user['consultation_history'] = [json.loads(payload) for (payload,) in conn.execute(
+                    "SELECT payload FROM user_events WHERE username = ? AND kind = 'consultation_history' ORDER BY seq", (username,))]
+        return user
+
+    def history_range(self, username, kind, start_day=None, end_day=None):
+        """Entries of one history log between two date ordinals (inclusive)."""
+        self.flush()
+        with self._transaction('DEFERRED') as conn:
+            return self.history.range(conn, username, kind, start_day, end_day)
+
+    def score_points(self, username):
+        """The user's full score history as (day ordinal, score) pairs, oldest first."""
+        self.flush()
+        with self._transaction('DEFERRED') as conn:
+            return self.history.score_points(conn, username)
+
+    def _compliance_counter(self, conn, username, blob):
+        if blob is not None:
+            return ComplianceCounter.from_bytes(blob)
+        # Users created before the rolling aggregate existed: rebuild it once from the log
+        window_start = date.today().toordinal() - COMPLIANCE_WINDOW_DAYS
+        return ComplianceCounter.from_log(self.history.range(conn, username, 'compliance_log', window_start))
+
+    def record_compliance(self, username, day, m_done=True, e_done=True):
+        """O(1) check-in update of the user's rolling compliance aggregate."""
+        with self.user_lock(username), self._transaction() as conn:
+            row = conn.execute('SELECT compliance_ring FROM users WHERE username = ?', (username,)).fetchone()
+            if row is None:
+                return
+            counter = self._compliance_counter(conn, username, row[0])
+            counter.record(date.fromisoformat(day).toordinal(), m_done, e_done)
+            conn.execute('UPDATE users SET compliance_ring = ? WHERE username = ?', (counter.to_bytes(), username))
+
+    def update_user(self, username, **fields):
+        """
+        Overwrites scalar/JSON fields of one user in a single short transaction.
+        Writing the profile also bumps profile_version, which versions everything derived from it.
+        """
+        unknown = set(fields) - set(self.FIELDS)
+        if unknown:
+            raise ValueError(f"Unknown user fields: {sorted(unknown)}")
+        assignments = ', '.join(f"{field} = ?" for field in fields)
+        if 'profile' in fields and 'profile_version' not in fields:
+            assignments += ', profile_version = profile_version + 1'
+        if 'password' in fields:
+            fields['password'] = hash_password(fields['password'])
+        values = [json.dumps(v, default=json_default) if k in self.JSON_FIELDS else v for k, v in fields.items()]
+        with self._transaction() as conn:
+            conn.execute(f"UPDATE users SET {assignments} WHERE username = ?", (*values, username))
+
+    def append_history(self, username, kind, entry):
+        """Appends one history entry; compliance/score entries are group-committed in the background."""
+        if kind not in self.EVENT_KINDS:
+            raise ValueError(f"Unknown history log: {kind}")
+        if kind not in self.HISTORY_KINDS:
+            with self._transaction() as conn:
+                conn.execute('INSERT INTO user_events (username, kind, payload) VALUES (?, ?, ?)',
+                             (username, kind, json.dumps(entry, default=json_default)))
+            return
+        row = self.history.encode(username, kind, entry)
+        if kind in self.BATCHED_KINDS:
+            with self._pending_lock:
+                self._pending.append(row)
+                batch_full = len(self._pending) >= self.max_batch
+            if batch_full:
+                self._wakeup.set()
+            return
+        with self._transaction() as conn:
+            self.history.insert(conn, [row])
+
+    def flush(self):
+        """
+        Commits every buffered append in one transaction (order preserved). Returns only
+        once any batch already taken by another flush is committed too, so a read after
+        flush() sees every append made before it.
+        """
+        with self._flush_lock:
+            with self._pending_lock:
+                batch, self._pending = self._pending, []
+            if not batch:
+                return
+            try:
+                with self._transaction() as conn:
+                    self.history.insert(conn, batch)
+            except sqlite3.Error:
+                with self._pending_lock:
+                    self._pending[:0] = batch
+                raise
+
+    def compact_history(self, today=None):
+        """Applies history retention (roll-up of old raw events into daily summaries)."""
+        self.flush()
+        with self._transaction() as conn:
+            self.history.compact(conn, today)
+
+    def _flush_loop(self):
+        while True:
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            try:
+                self.flush()
+                if time.monotonic() >= self._next_compaction:
+                    self._next_compaction = time.monotonic() + self.compaction_interval
+                    self.compact_history()
+            except sqlite3.Error:
+                # flush() re-queued the batch, so it is retried on the next tick rather than lost
+                self.flush_failures += 1
+                logger.exception("User store background flush failed (%d pending rows kept for retry)", len(self._pending))
@@ -0,0 +1,194 @@
+"""
+SkinovaAI derived views: per-user results (routine, conflicts, kit, score, ...)
+materialized once per input version and read by every page without recomputation.
+Standard library only.
+"""
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+
+class DerivedViews:
+    """An immutable, versioned snapshot of one user's derived views."""
+
+    def __init__(self, version, values, started_at=None):
+        self.version = version
+        self._values = dict(values)
+        self.started_at = started_at if started_at is not None else time.monotonic() # When its inputs were read
+
+    def __getitem__(self, name):
+        return self._values[name]
+
+    def __contains__(self, name):
+        return name in self._values
+
+    def get(self, name, default=None):
+        return self._values.get(name, default)
+
+    def as_dict(self):
+        return dict(self._values)
+
+
+class ViewMaterializer:
+    """
+    Hyper-Logic 6 (Views): Materializes named derivations per key (username) and version.
+
+    `derivations` maps a view name to (dependencies, fn); fn(context, inputs) gets the
+    caller's context and the values of its dependencies. A materialization submits
+    every derivation to a shared thread pool as soon as its dependencies are done, so
+    it takes as long as the slowest dependency chain, not the sum of all derivations.
+
+    get() returns the cached snapshot while its version matches and materializes
+    otherwise (concurrent callers for the same key and version share one run).
+    Snapshots of older versions are never served, so nothing stale outlives a bump.
+    refresh() recomputes chosen views (and what depends on them) within a version.
+    """
+
+    def __init__(self, derivations, max_workers=4, maxsize=4096):
+        self.derivations = dict(derivations)
+        self.maxsize = maxsize
+        self._order = self._topological_order()
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='skinova-views')
+        self._views = OrderedDict()
+        self._in_flight = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.materializations = 0
+        self.last_ms = {}
+        self.last_materialize_ms = None
+
+    def _topological_order(self):
+        order, state = [], {}
+
+        def visit(name):
+            if state.get(name) == 'done':
+                return
+            if state.get(name) == 'visiting':
+                raise ValueError(f"Derived view dependency cycle through {name!r}")
+            state[name] = 'visiting'
+            for dependency in self.derivations[name][0]:
+                visit(dependency)
+            state[name] = 'done'
+            order.append(name)
+        for name in self.derivations:
+            visit(name)
+        return order
+
+    def _dependents_closure(self, names):
+        selected = set(names)
+        for name in self._order:
+            if any(dependency in selected for dependency in self.derivations[name][0]):
+                selected.add(name)
+        return [name for name in self._order if name in selected]
+
+    def _timed(self, name, fn, context, inputs):
+        started = time.perf_counter()
+        try:
+            return fn(context, inputs)
+        finally:
+            self.last_ms[name] = round((time.perf_counter() - started) * 1000, 2)
+
+    def _schedule(self, name, context, futures, known):
+        """Future for one derivation, started on the pool once its dependencies resolve."""
+        dependencies, fn = self.derivations[name]
+        waiting_on = [futures[d] for d in dependencies if d in futures]
+        result = Future()
+        remaining = [len(waiting_on)]
+        remaining_lock = threading.Lock()
+
+        def start(_=None):
+            with remaining_lock:
+                remaining[0] -= 1
+                if remaining[0] > 0:
+                    return
+            failed = next((f for f in waiting_on if f.exception() is not None), None)
+            if failed is not None:
+                result.set_exception(failed.exception())
+                return
+            inputs = {d: futures[d].result() if d in futures else known[d] for d in dependencies}
+            job = self._executor.submit(self._timed, name, fn, context, inputs)
+            job.add_done_callback(lambda done: result.set_exception(done.exception()) if done.exception() is not None
+                                  else result.set_result(done.result()))
+
+        if waiting_on:
+            for future in waiting_on:
+                future.add_done_callback(start)
+        else:
+            start() # Counter goes 0 -> -1: nothing to wait for
+        return result
+
+    def _materialize(self, context, names, known):
+        started = time.perf_counter()
+        futures = {}
+        for name in names:
+            futures[name] = self._schedule(name, context, futures, known)
+        values = dict(known)
+        values.update((name, future.result()) for name, future in futures.items())
+        self.last_materialize_ms = round((time.perf_counter() - started) * 1000, 2)
+        return values
+
+    def _store(self, key, views):
+        with self._lock:
+            self.materializations += 1
+            current = self._views.get(key)
+            # A slow run that read older inputs never replaces a newer snapshot
+            if current is None or current.started_at <= views.started_at:
+                self._views[key] = views
+            self._views.move_to_end(key)
+            while len(self._views) > self.maxsize:
+                self._views.popitem(last=False)
+
+    def get(self, key, version, context):
+        """The key's views at `version`, materializing them (all derivations) if missing or stale."""
+        with self._lock:
+            views = self._views.get(key)
+            if views is not None and views.version == version:
+                self._views.move_to_end(key)
+                self.hits += 1
+                return views
+            flight = self._in_flight.get((key, version))
+            owner = flight is None
+            if owner:
+                flight = self._in_flight[(key, version)] = Future()
+        if not owner:
+            return flight.result()
+        try:
+            started_at = time.monotonic()
+            views = DerivedViews(version, self._materialize(context, self._order, {}), started_at)
+            self._store(key, views)
+            flight.set_result(views)
+            return views
+        except BaseException as exc:
+            flight.set_exception(exc)
+            raise
+        finally:
+            with self._lock:
+                self._in_flight.pop((key, version), None)
+
+    def refresh(self, key, version, context, names):
+        """Recomputes `names` and the views depending on them; everything else is reused if current."""
+        with self._lock:
+            views = self._views.get(key)
+        if views is None or views.version != version:
+            return self.get(key, version, context)
+        names = self._dependents_closure(names)
+        known = {name: value for name, value in views.as_dict().items() if name not in names}
+        started_at = time.monotonic()
+        views = DerivedViews(version, self._materialize(context, names, known), started_at)
+        self._store(key, views)
+        return views
+
+    def invalidate(self, key):
+        with self._lock:
+            self._views.pop(key, None)
+
+    def stats(self):
+        """Hit/materialization counters and the latest per-view timings, for monitoring."""
+        with self._lock:
+            return {
+                'hits': self.hits,
+                'materializations': self.materializations,
+                'cached_keys': len(self._views),
+                'last_materialize_ms': self.last_materialize_ms,
+                'last_view_ms': dict(self.last_ms),
+            }
@@ -0,0 +1,159 @@
+"""
+SkinovaAI Startup & Rerun Timing Report
+
+Measures what a fresh process pays before the first page is on screen, and what
+every Streamlit rerun of the login page costs afterwards:
+
+  * cold start: `python -X importtime` on a bare-mode import of app.py (which runs
+    the login page once), broken down by top-level import, plus the same for a
+    headless engine worker (skinova only);
+  * reruns: the login page run repeatedly through streamlit.testing's AppTest,
+    reporting the first (cold) run and the median/p90 of the warm reruns;
+  * which heavy modules (pandas, numpy, matplotlib, PIL) a cold start loaded.
+
+    python startup_report.py --reruns 20 --json startup-report.json
+"""
+import argparse
+import json
+import os
+import re
+import subprocess
+import sys
+import tempfile
+import time
+
+APP_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'app.py')
+HEAVY_MODULES = ('pandas', 'numpy', 'matplotlib', 'PIL', 'pyarrow')
+IMPORTTIME_LINE = re.compile(r'^import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)')
+
+APP_PROBE = f"""
+import sys, time
+started = time.perf_counter()
+sys.path.insert(0, {os.path.dirname(APP_PATH)!r})
+import app
+print('WALL_MS', (time.perf_counter() - started) * 1000)
+print('HEAVY', ','.join(m for m in {HEAVY_MODULES!r} if m in sys.modules))
+"""
+
+WORKER_PROBE = f"""
+import sys, time
+started = time.perf_counter()
+sys.path.insert(0, {os.path.dirname(APP_PATH)!r})
+import skinova.engine, skinova.catalog, skinova.store
+print('WALL_MS', (time.perf_counter() - started) * 1000)
+print('HEAVY', ','.join(m for m in {HEAVY_MODULES!r} if m in sys.modules))
+"""
+
+
+def _probe_env(db_path):
+    env = dict(os.environ, SKINOVA_DB_PATH=db_path, STREAMLIT_LOGGER_LEVEL='error')
+    env.pop('PYTHONPROFILEIMPORTTIME', None)
+    return env
+
+
+def cold_start(probe, targets, db_path, top=12):
+    """
+    Runs probe in a fresh interpreter under -X importtime; returns wall time and the
+    cost of every import made directly by the target modules (and by the interpreter
+    itself), grouped by top-level package.
+    """
+    started = time.perf_counter()
+    proc = subprocess.run([sys.executable, '-X', 'importtime', '-c', probe], capture_output=True, text=True, env=_probe_env(db_path))
+    process_ms = (time.perf_counter() - started) * 1000
+    if proc.returncode != 0:
+        raise RuntimeError(proc.stderr[-2000:])
+
+    by_import = {}
+    children = [] # importtime prints an import's children right before the import itself
+    for line in proc.stderr.splitlines():
+        match = IMPORTTIME_LINE.match(line)
+        if not match:
+            continue
+        self_us, cumulative_us, indent, name = int(match.group(1)), int(match.group(2)), match.group(3), match.group(4)
+        depth = (len(indent) - 1) // 2
+        if depth == 1:
+            children.append((name, cumulative_us))
+        elif depth == 0:
+            root = name.split('.')[0]
+            if root in targets:
+                # Attribute the target's own imports to their packages, and its module body to itself
+                entries = children + [(f"{name} (module body)", self_us)]
+            else:
+                entries = [(name, cumulative_us)]
+            for child, us in entries:
+                key = child if child.endswith('(module body)') else child.split('.')[0]
+                by_import[key] = by_import.get(key, 0) + us / 1000
+            children = []
+    fields = dict(line.split(' ', 1) for line in proc.stdout.splitlines() if line.startswith(('WALL_MS', 'HEAVY')))
+    return {
+        'process_ms': round(process_ms, 1),
+        'import_and_first_run_ms': round(float(fields.get('WALL_MS', 'nan')), 1),
+        'heavy_modules_loaded': [m for m in fields.get('HEAVY', '').strip().split(',') if m],
+        'by_import_ms': {name: round(ms, 1) for name, ms in sorted(by_import.items(), key=lambda item: -item[1])[:top]},
+    }
+
+
+def login_reruns(db_path, reruns):
+    """Times the login page through AppTest: one cold run, then `reruns` warm reruns."""
+    os.environ.update(SKINOVA_DB_PATH=db_path, STREAMLIT_LOGGER_LEVEL='error')
+    from streamlit.testing.v1 import AppTest
+
+    at = AppTest.from_file(APP_PATH, default_timeout=60)
+    started = time.perf_counter()
+    at.run()
+    first_ms = (time.perf_counter() - started) * 1000
+
+    samples = []
+    for _ in range(reruns):
+        started = time.perf_counter()
+        at.run()
+        samples.append((time.perf_counter() - started) * 1000)
+    samples.sort()
+    return {
+        'first_run_ms': round(first_ms, 1),
+        'rerun_median_ms': round(samples[len(samples) // 2], 2) if samples else None,
+        'rerun_p90_ms': round(samples[int(len(samples) * 0.9)], 2) if samples else None,
+        'reruns': len(samples),
+        'exceptions': [str(e.value) for e in at.exception],
+    }
+
+
+def _print_section(title, result):
+    print(f"\n{title}", file=sys.stderr)
+    for key, value in result.items():
+        if key == 'by_import_ms':
+            print("  cost by import (cumulative ms):", file=sys.stderr)
+            for name, ms in value.items():
+                print(f"    {name:<28} {ms:>8.1f}", file=sys.stderr)
+        else:
+            print(f"  {key:<28} {value}", file=sys.stderr)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Report cold-start and per-rerun cost of the SkinovaAI app.")
+    parser.add_argument('--reruns', type=int, default=20, help="Warm reruns of the login page to time")
+    parser.add_argument('--json', default=None, help="Also write the report to this JSON file")
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory(prefix='skinova-startup-') as tmp:
+        db_path = os.path.join(tmp, 'startup_users.db')
+        report = {
+            'app_cold_start': cold_start(APP_PROBE, {'app'}, db_path),
+            'engine_worker_cold_start': cold_start(WORKER_PROBE, {'skinova'}, db_path),
+            'login_page': login_reruns(db_path, args.reruns),
+        }
+
+    for title, key in (("App cold start (bare import of app.py, login page)", 'app_cold_start'),
+                       ("Engine worker cold start (skinova only)", 'engine_worker_cold_start'),
+                       ("Login page reruns (AppTest)", 'login_page')):
+        _print_section(title, report[key])
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as handle:
+            json.dump(report, handle, indent=2)
+        print(f"\nreport written to {args.json}", file=sys.stderr)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
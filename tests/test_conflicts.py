@@ -0,0 +1,35 @@
+from skinova.conflicts import CONFLICT_ENGINE
+
+RETINOL = "Retinol (0.5% Encapsulated)"
+VITAMIN_C = "L-Ascorbic Acid (Vitamin C)"
+BENZOYL_PEROXIDE = "Benzoyl Peroxide (BP 5%)"
+
+
+def step(time, ingredient):
+    return {'time': time, 'ingredient_key': ingredient}
+
+
+def conflict_pairs(steps):
+    return {frozenset(c['ingredients']) for c in CONFLICT_ENGINE.evaluate(steps)['conflicts']}
+
+
+def test_morning_and_evening_actives_are_separated():
+    assert conflict_pairs([step('Morning', VITAMIN_C), step('Evening', RETINOL)]) == set()
+
+
+def test_same_ritual_pair_is_flagged():
+    assert frozenset((RETINOL, VITAMIN_C)) in conflict_pairs([step('Morning', VITAMIN_C), step('Morning', RETINOL)])
+
+
+def test_skin_cycling_nights_are_separated():
+    steps = [step('Evening (NIGHT 1 - Exfoliation)', BENZOYL_PEROXIDE), step('Evening (NIGHT 2 - Retinoid)', RETINOL)]
+    assert conflict_pairs(steps) == set()
+
+
+def test_untagged_evening_step_meets_every_night():
+    steps = [step('Evening', BENZOYL_PEROXIDE), step('Evening (NIGHT 2 - Retinoid)', RETINOL)]
+    assert frozenset((BENZOYL_PEROXIDE, RETINOL)) in conflict_pairs(steps)
+
+
+def test_steps_without_time_form_one_session():
+    assert frozenset((RETINOL, VITAMIN_C)) in conflict_pairs([{'ingredient_key': VITAMIN_C}, {'ingredient_key': RETINOL}])
@@ -0,0 +1,53 @@
+import random
+import threading
+from datetime import date
+
+from skinova import ThreadStore
+
+SEED_THREADS = [
+    {'id': i, 'title': f"Seed {i}", 'user': 'seed', 'date': date(2024, 1, i).isoformat(), 'replies': 0, 'views': 1 + i % 5}
+    for i in range(1, 21)
+]
+
+
+def test_concurrent_posts_and_views_stay_consistent():
+    store = ThreadStore(SEED_THREADS)
+    expected_views = {thread['id']: thread['views'] for thread in SEED_THREADS}
+    views_lock = threading.Lock()
+    posted = []
+    errors = []
+
+    def writer(worker):
+        rng = random.Random(worker)
+        for i in range(200):
+            if i % 10 == 0:
+                record = store.post(f"Thread {worker}-{i}", f"user{worker}")
+                with views_lock:
+                    posted.append(record['id'])
+                    expected_views[record['id']] = record['views']
+            else:
+                thread_id = rng.randint(1, len(SEED_THREADS))
+                store.record_view(thread_id)
+                with views_lock:
+                    expected_views[thread_id] += 1
+
+    def reader():
+        for _ in range(300):
+            page = store.page('views', 0, 10)
+            views = [thread['views'] for thread in page]
+            if views != sorted(views, reverse=True) or len({thread['id'] for thread in page}) != len(page):
+                errors.append(views)
+
+    threads = [threading.Thread(target=writer, args=(w,)) for w in range(4)] + [threading.Thread(target=reader) for _ in range(2)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert errors == []
+    assert len(posted) == len(set(posted)) == 80
+    assert len(store) == len(SEED_THREADS) + 80
+    everything = store.page('views', 0, len(store))
+    assert [thread['views'] for thread in everything] == sorted((thread['views'] for thread in everything), reverse=True)
+    assert {thread['id']: thread['views'] for thread in everything} == expected_views
+    assert [thread['id'] for thread in store.page('recent', 0, 80)] == sorted(posted, reverse=True)
@@ -0,0 +1,39 @@
+import io
+
+import numpy as np
+import pytest
+
+Image = pytest.importorskip('PIL.Image')
+
+from skinova.imaging import load_photo
+
+
+def encode(image, fmt):
+    buffer = io.BytesIO()
+    image.save(buffer, fmt)
+    return buffer.getvalue()
+
+
+def test_unreadable_bytes_raise_value_error():
+    with pytest.raises(ValueError):
+        load_photo(b'not an image')
+
+
+def test_truncated_photo_raises_value_error():
+    data = encode(Image.new('RGB', (640, 480), (200, 150, 125)), 'PNG')
+    with pytest.raises(ValueError):
+        load_photo(data[:len(data) // 2])
+
+
+def test_decompression_bomb_raises_value_error(monkeypatch):
+    monkeypatch.setattr(Image, 'MAX_IMAGE_PIXELS', 1000)
+    # More than twice MAX_IMAGE_PIXELS: Pillow raises DecompressionBombError on open
+    with pytest.raises(ValueError):
+        load_photo(encode(Image.new('RGB', (100, 100)), 'PNG'))
+
+
+@pytest.mark.parametrize('fmt', ['JPEG', 'PNG'])
+def test_large_photo_is_downscaled(fmt):
+    data = encode(Image.new('RGB', (2000, 1500), (200, 150, 125)), fmt)
+    rgb = load_photo(data, max_side=512)
+    assert rgb.dtype == np.uint8 and rgb.shape == (384, 512, 3)
@@ -0,0 +1,56 @@
+import threading
+import time
+
+import pytest
+
+from skinova import JobQueue, JobRejected
+
+
+def wait_for(queue, job_id, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        status = queue.status(job_id)
+        if status['state'] in ('done', 'failed'):
+            return status
+        time.sleep(0.01)
+    raise AssertionError(f"job {job_id} did not finish")
+
+
+def test_job_result_and_on_complete():
+    queue = JobQueue(max_workers=1)
+    completed = []
+    job_id = queue.submit('alice', 'analysis', lambda x: x * 2, 21, on_complete=completed.append)
+    status = wait_for(queue, job_id)
+    assert status['state'] == 'done' and status['result'] == 42
+    assert completed == [42]
+    queue.shutdown()
+
+
+def test_failed_job_reports_its_error():
+    queue = JobQueue(max_workers=1)
+
+    def fail():
+        raise ValueError("bad photo")
+    status = wait_for(queue, queue.submit('alice', 'analysis', fail))
+    assert status['state'] == 'failed' and status['error'] == "ValueError: bad photo"
+    queue.shutdown()
+
+
+def test_admission_is_bounded_per_user_and_overall():
+    queue = JobQueue(max_workers=1, max_pending=2, per_user_limit=1)
+    release = threading.Event()
+    first = queue.submit('alice', 'analysis', release.wait)
+    with pytest.raises(JobRejected):
+        queue.submit('alice', 'analysis', release.wait)
+    queue.submit('bob', 'analysis', release.wait)
+    with pytest.raises(JobRejected):
+        queue.submit('carol', 'analysis', release.wait)
+    assert queue.stats()['rejected'] == 2
+
+    release.set()
+    wait_for(queue, first)
+    # A finished job frees the user's slot
+    wait_for(queue, queue.submit('alice', 'analysis', lambda: 'again'))
+    stats = queue.stats()
+    assert stats['depth'] == 0 and stats['completed'] == 3
+    queue.shutdown()
@@ -0,0 +1,79 @@
+import itertools
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from skinova import DEFAULT_CATALOG_PATH, Catalog, build_hyper_routine, load_catalog, optimize_kit
+from skinova.kit import budget_ceiling, budget_tier, slot_candidates
+
+CATEGORIES = ["Cleanser", "Sunscreen", "Moisturizer", "Serum", "Active Night", "Exfoliant"]
+INGREDIENTS = ["Niacinamide (Vitamin B3)", "Retinol (0.5% Encapsulated)", "Salicylic Acid (BHA 2%)", "Hyaluronic Acid (HA)"]
+CONCERNS = ["Acne", "Aging", "Dryness", "Pigmentation"]
+ROUTINE = [
+    {'type': 'Antioxidant/Treatment Serum', 'ingredient_key': "Niacinamide (Vitamin B3)"},
+    {'type': 'Regenerative Treatment', 'ingredient_key': "Retinol (0.5% Encapsulated)"},
+    {'type': 'Exfoliant', 'ingredient_key': "Salicylic Acid (BHA 2%)"},
+]
+
+
+def small_catalog(n_products, seed):
+    rng = np.random.default_rng(seed)
+    # Every slot's category is stocked, so no slot takes the unstocked fallback
+    categories = CATEGORIES + [CATEGORIES[i] for i in rng.integers(0, len(CATEGORIES), n_products - len(CATEGORIES))]
+    return Catalog(pd.DataFrame({
+        'id': np.arange(1, n_products + 1),
+        'name': [f"Product {i}" for i in range(n_products)],
+        'category': categories,
+        'active_ing': [[INGREDIENTS[i]] for i in rng.integers(0, len(INGREDIENTS), n_products)],
+        'concern_match': [[CONCERNS[i]] for i in rng.integers(0, len(CONCERNS), n_products)],
+        'budget': np.array(['Low', 'Mid', 'High'], dtype=object)[rng.integers(0, 3, n_products)],
+        'price': rng.integers(100, 900, n_products),
+        'rating': np.round(rng.uniform(4.0, 5.0, n_products), 1),
+        'volume': ["50ml"] * n_products,
+        'type': ["Serum"] * n_products,
+    }))
+
+
+def brute_force(profile, routine, catalog):
+    """Best summed score over every assignment of distinct products (or nothing) to the slots."""
+    ceiling = budget_ceiling(profile['budget'])
+    score = catalog.matcher.base_scores(profile['primary_concerns'], budget_tier(profile['budget']), [])
+    price = catalog.df['price'].to_numpy(dtype=float)
+    options = [[-1] + rows.tolist() for _, rows in slot_candidates(routine, catalog, ceiling)]
+    best = 0.0
+    for picks in itertools.product(*options):
+        chosen = [row for row in picks if row >= 0]
+        if len(set(chosen)) < len(chosen):
+            continue
+        if ceiling is not None and price[chosen].sum() > ceiling:
+            continue
+        best = max(best, float(score[chosen].sum()))
+    return best
+
+
+@pytest.mark.parametrize('seed', range(8))
+@pytest.mark.parametrize('budget', ['Low (Below ₹1500)', 'Mid'])
+def test_optimize_kit_matches_brute_force(seed, budget):
+    catalog = small_catalog(12, seed)
+    profile = {'budget': budget, 'primary_concerns': [CONCERNS[seed % len(CONCERNS)]]}
+    kit = optimize_kit(profile, ROUTINE, catalog)
+
+    assert kit['exact']
+    assert kit['match_score'] == pytest.approx(brute_force(profile, ROUTINE, catalog))
+    ids = [product['id'] for product in kit['products']]
+    assert len(ids) == len(set(ids))
+    if kit['budget_ceiling'] is not None:
+        assert kit['total_price'] <= kit['budget_ceiling']
+
+
+@pytest.mark.parametrize('skin_type', ['Dry', 'Sensitive'])
+def test_moisturizer_slot_is_not_seeded_by_the_creamy_cleanser(skin_type):
+    catalog = load_catalog(DEFAULT_CATALOG_PATH)
+    profile = {'skin_type': skin_type, 'primary_concerns': ['Aging'], 'budget': 'Mid', 'climate': 'Temperate', 'age_group': '25-34'}
+    routine, _ = build_hyper_routine(profile, [], catalog)
+    assert any(step['type'] == 'Creamy Cleanser' for step in routine)
+
+    rows = dict(slot_candidates(routine, catalog, budget_ceiling(profile['budget'])))['Moisturizer']
+    assert len(rows)
+    assert set(catalog.df['category'].iloc[rows].astype(str)) == {'Moisturizer'}
@@ -0,0 +1,31 @@
+import numpy as np
+import pytest
+
+from skinova import TREND_WINDOW, ScoreSeries
+
+
+def direct_fit(scores):
+    """np.polyfit over the last TREND_WINDOW points, x = position in the whole series."""
+    x = np.arange(len(scores))[-TREND_WINDOW:]
+    return np.polyfit(x, np.asarray(scores[-TREND_WINDOW:], dtype=float), 1)
+
+
+@pytest.mark.parametrize('length', [2, 3, TREND_WINDOW - 1, TREND_WINDOW, TREND_WINDOW + 1, 200])
+def test_incremental_trend_matches_least_squares(length):
+    rng = np.random.default_rng(length)
+    scores = rng.integers(40, 99, length).tolist()
+    series = ScoreSeries()
+    for day, score in enumerate(scores, start=738000):
+        series.append(day, score)
+        count = day - 738000 + 1
+        if count >= 2:
+            assert series.trend() == pytest.approx(tuple(direct_fit(scores[:count])))
+    loaded = ScoreSeries.from_points(enumerate(scores, start=738000))
+    assert loaded.trend() == pytest.approx(tuple(direct_fit(scores)))
+
+
+def test_trend_needs_two_points():
+    series = ScoreSeries()
+    assert series.trend() is None
+    series.append(738000, 70)
+    assert series.trend() is None
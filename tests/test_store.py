@@ -0,0 +1,43 @@
+import threading
+import time
+from datetime import date
+
+from skinova import UserStore
+
+
+def test_reads_see_appends_made_just_before_them(tmp_path):
+    # A tiny flush interval keeps the background flusher racing the readers for each batch
+    store = UserStore(str(tmp_path / 'users.db'), flush_interval=0.0001)
+    insert = store.history.insert
+
+    def slow_insert(conn, rows):
+        time.sleep(0.002) # A slow disk: widens the window between taking a batch and committing it
+        insert(conn, rows)
+
+    store.history.insert = slow_insert
+    first_day = date(2024, 1, 1).toordinal()
+    errors = []
+
+    def writer(worker):
+        username = f"user{worker}"
+        store.create_user(username, 'secret')
+        for i in range(150):
+            day = date.fromordinal(first_day + i).isoformat()
+            store.append_history(username, 'score_log', {'date': day, 'score': 50 + i % 40, 'delta': '+0'})
+            time.sleep(0.0005) # Lets the flusher take the batch before this thread reads
+            if i % 2:
+                seen = [point[0] for point in store.score_points(username)]
+            else:
+                seen = [date.fromisoformat(entry['date']).toordinal() for entry in store.history_range(username, 'score_log')]
+            if not seen or seen[-1] != first_day + i:
+                errors.append((worker, i, seen[-1:] if seen else None))
+
+    threads = [threading.Thread(target=writer, args=(w,)) for w in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert errors == []
+    for worker in range(4):
+        assert [day for day, _ in store.score_points(f"user{worker}")] == list(range(first_day, first_day + 150))